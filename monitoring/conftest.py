@@ -0,0 +1,8 @@
+import os
+
+
+# Configuration required to import mock_uss in its unit tests
+os.environ.setdefault('MOCK_USS_AUTH_SPEC', 'NoAuth()')
+os.environ.setdefault('MOCK_USS_DSS_URL', 'http://localhost:8082')
+os.environ.setdefault('MOCK_USS_BASE_URL', 'http://localhost:8071')
+os.environ.setdefault('MOCK_USS_VIRTUAL_USSS', 'uss1,uss2')
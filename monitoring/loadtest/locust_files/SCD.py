@@ -0,0 +1,269 @@
+#!env/bin/python3
+
+import client
+import datetime
+import math
+import os
+import random
+import typing
+from monitoring.monitorlib import scd
+from locust import task, between
+
+# Spatial density of the generated volumes: every volume is placed uniformly at
+# random within a circular area, so a smaller area or larger volumes produce
+# more overlapping volumes (and more contention in the DSS).
+AREA_CENTER = [float(v) for v in os.environ.get("SCD_AREA_CENTER", "46.97,7.47").split(",")]
+AREA_RADIUS_M = float(os.environ.get("SCD_AREA_RADIUS_M", "5000"))
+VOLUME_RADIUS_M = float(os.environ.get("SCD_VOLUME_RADIUS_M", "200"))
+# Volumes start within this many minutes from now
+TIME_WINDOW_MIN = float(os.environ.get("SCD_TIME_WINDOW_MIN", "60"))
+
+BASE_URL = "https://example.com/uss"
+
+
+def random_point() -> typing.Tuple[float, float]:
+    # Uniformly distributed within the area
+    r = AREA_RADIUS_M * math.sqrt(random.random())
+    theta = random.uniform(0, 2 * math.pi)
+    lat = AREA_CENTER[0] + scd.latitude_degrees(r * math.cos(theta))
+    lng = AREA_CENTER[1] + scd.latitude_degrees(r * math.sin(theta)) / math.cos(math.radians(lat))
+    return lat, lng
+
+
+def make_volume() -> scd.Volume4D:
+    """Returns a random 4D volume (circle or quadrilateral) of about VOLUME_RADIUS_M in the area"""
+    lat, lng = random_point()
+    t0 = datetime.datetime.utcnow() + datetime.timedelta(minutes=random.uniform(1, TIME_WINDOW_MIN))
+    t1 = t0 + datetime.timedelta(minutes=random.uniform(5, 30))
+    alt0 = random.randint(0, 60) * 2
+    alt1 = alt0 + random.randint(15, 60) * 2
+    if random.random() < 0.5:
+        return scd.make_vol4(t0, t1, alt0, alt1, circle=scd.make_circle(lat, lng, VOLUME_RADIUS_M))
+    dlat = scd.latitude_degrees(VOLUME_RADIUS_M)
+    dlng = dlat / math.cos(math.radians(lat))
+    # Counter-clockwise quadrilateral around the center
+    coords = [
+        (lat + dlat * random.uniform(0.5, 1), lng),
+        (lat, lng - dlng * random.uniform(0.5, 1)),
+        (lat - dlat * random.uniform(0.5, 1), lng),
+        (lat, lng + dlng * random.uniform(0.5, 1)),
+    ]
+    return scd.make_vol4(t0, t1, alt0, alt1, polygon=scd.make_polygon(coords))
+
+
+def ovns_in(resp, field: str) -> typing.List[str]:
+    if resp is None or resp.status_code != 200:
+        return []
+    return [e["ovn"] for e in resp.json().get(field, []) if e.get("ovn", "") not in scd.NO_OVN_PHRASES]
+
+
+class OperationalIntent(client.USS):
+    wait_time = between(0.01, 1)
+
+    def __init__(self, *args, **kwargs):
+        super(OperationalIntent, self).__init__(*args, **kwargs)
+        self.client.default_scopes = [scd.SCOPE_SC]
+
+    def query_keys(self, extents: scd.Volume4D) -> typing.List[str]:
+        # The OVNs of all operational intents overlapping the volume are required to create or modify it
+        resp = self.client.post(
+            "/operational_intent_references/query",
+            json={"area_of_interest": extents},
+        )
+        return ovns_in(resp, "operational_intent_references")
+
+    @task(10)
+    def create_oi(self):
+        oi_uuid = self.ids.next()
+        extents = make_volume()
+        resp = self.client.put(
+            "/operational_intent_references/{}".format(oi_uuid),
+            json={
+                "extents": [extents],
+                "key": self.query_keys(extents),
+                "state": "Accepted",
+                "uss_base_url": BASE_URL,
+                "new_subscription": {
+                    "uss_base_url": BASE_URL,
+                    "notify_for_constraints": False,
+                },
+            },
+        )
+        if resp.status_code == 200:
+            self.entities.add(oi_uuid, resp.json()["operational_intent_reference"])
+
+    @task(5)
+    def update_oi(self):
+        target_oi, target_ref = self.entities.checkout()
+        if not target_oi:
+            print("Nothing to pick from operational intent pool for UPDATE")
+            return
+
+        extents = make_volume()
+        key = set(self.query_keys(extents))
+        key.add(target_ref["ovn"])
+        resp = self.client.put(
+            "/operational_intent_references/{}/{}".format(target_oi, target_ref["ovn"]),
+            json={
+                "extents": [extents],
+                "key": list(key),
+                "state": random.choice(["Accepted", "Activated"]),
+                "uss_base_url": BASE_URL,
+                "subscription_id": target_ref["subscription_id"],
+            },
+        )
+        if resp.status_code == 200:
+            self.entities.add(target_oi, resp.json()["operational_intent_reference"])
+
+    @task(50)
+    def query_oi(self):
+        self.query_keys(make_volume())
+
+    @task(20)
+    def get_oi(self):
+        target_oi = self.entities.pick()[0]
+        if not target_oi:
+            print("Nothing to pick from operational intent pool for GET")
+            return
+        self.client.get("/operational_intent_references/{}".format(target_oi))
+
+    @task(5)
+    def delete_oi(self):
+        target_oi, target_ref = self.entities.checkout()
+        if not target_oi:
+            print("Nothing to pick from operational intent pool for DELETE")
+            return
+        self.client.delete(
+            "/operational_intent_references/{}/{}".format(target_oi, target_ref["ovn"])
+        )
+
+    def on_start(self):
+        # Insert atleast 1 operational intent for update to not fail
+        self.create_oi()
+
+    def on_stop(self):
+        self.entities.clear()
+
+
+class Constraint(client.USS):
+    wait_time = between(0.01, 1)
+
+    def __init__(self, *args, **kwargs):
+        super(Constraint, self).__init__(*args, **kwargs)
+        self.client.default_scopes = [scd.SCOPE_CM]
+
+    @task(10)
+    def create_constraint(self):
+        constraint_uuid = self.ids.next()
+        resp = self.client.put(
+            "/constraint_references/{}".format(constraint_uuid),
+            json={"extents": [make_volume()], "uss_base_url": BASE_URL},
+        )
+        if resp.status_code == 200:
+            self.entities.add(constraint_uuid, resp.json()["constraint_reference"]["ovn"])
+
+    @task(5)
+    def update_constraint(self):
+        target_constraint, target_ovn = self.entities.checkout()
+        if not target_constraint:
+            print("Nothing to pick from constraint pool for UPDATE")
+            return
+        resp = self.client.put(
+            "/constraint_references/{}/{}".format(target_constraint, target_ovn),
+            json={"extents": [make_volume()], "uss_base_url": BASE_URL},
+        )
+        if resp.status_code == 200:
+            self.entities.add(target_constraint, resp.json()["constraint_reference"]["ovn"])
+
+    @task(50)
+    def query_constraint(self):
+        self.client.post(
+            "/constraint_references/query",
+            json={"area_of_interest": make_volume()},
+        )
+
+    @task(20)
+    def get_constraint(self):
+        target_constraint = self.entities.pick()[0]
+        if not target_constraint:
+            print("Nothing to pick from constraint pool for GET")
+            return
+        self.client.get("/constraint_references/{}".format(target_constraint))
+
+    @task(5)
+    def delete_constraint(self):
+        target_constraint, target_ovn = self.entities.checkout()
+        if not target_constraint:
+            print("Nothing to pick from constraint pool for DELETE")
+            return
+        self.client.delete("/constraint_references/{}/{}".format(target_constraint, target_ovn))
+
+    def on_start(self):
+        # Insert atleast 1 constraint for update to not fail
+        self.create_constraint()
+
+    def on_stop(self):
+        self.entities.clear()
+
+
+class SCDSubscription(client.USS):
+    wait_time = between(0.01, 1)
+
+    def __init__(self, *args, **kwargs):
+        super(SCDSubscription, self).__init__(*args, **kwargs)
+        self.client.default_scopes = [scd.SCOPE_SC]
+
+    def make_sub_request(self) -> typing.Dict:
+        return {
+            "extents": make_volume(),
+            "uss_base_url": BASE_URL,
+            "notify_for_operational_intents": True,
+            "notify_for_constraints": False,
+        }
+
+    @task(10)
+    def create_sub(self):
+        sub_uuid = self.ids.next()
+        resp = self.client.put("/subscriptions/{}".format(sub_uuid), json=self.make_sub_request())
+        if resp.status_code == 200:
+            self.entities.add(sub_uuid, resp.json()["subscription"]["version"])
+
+    @task(5)
+    def update_sub(self):
+        target_sub, target_version = self.entities.checkout()
+        if not target_sub:
+            print("Nothing to pick from subscription pool for UPDATE")
+            return
+        resp = self.client.put(
+            "/subscriptions/{}/{}".format(target_sub, target_version),
+            json=self.make_sub_request(),
+        )
+        if resp.status_code == 200:
+            self.entities.add(target_sub, resp.json()["subscription"]["version"])
+
+    @task(20)
+    def query_sub(self):
+        self.client.post("/subscriptions/query", json={"area_of_interest": make_volume()})
+
+    @task(20)
+    def get_sub(self):
+        target_sub = self.entities.pick()[0]
+        if not target_sub:
+            print("Nothing to pick from subscription pool for GET")
+            return
+        self.client.get("/subscriptions/{}".format(target_sub))
+
+    @task(5)
+    def delete_sub(self):
+        target_sub, target_version = self.entities.checkout()
+        if not target_sub:
+            print("Nothing to pick from subscription pool for DELETE")
+            return
+        self.client.delete("/subscriptions/{}/{}".format(target_sub, target_version))
+
+    def on_start(self):
+        # Insert atleast 1 subscription for update to not fail
+        self.create_sub()
+
+    def on_stop(self):
+        self.entities.clear()
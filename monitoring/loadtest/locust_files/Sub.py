@@ -2,10 +2,8 @@
 import client
 import datetime
 import random
-import threading
 import time
 import typing
-import uuid
 from monitoring.monitorlib import rid
 from monitoring.prober.rid import common
 from locust import task, between
@@ -13,7 +11,6 @@ from locust import task, between
 
 class Sub(client.USS):
     wait_time = between(0.01, 1)
-    lock = threading.Lock()
 
     def gen_vertices(self):
         base_lng = random.randint(0, 180)
@@ -41,7 +38,7 @@ class Sub(client.USS):
     def create_sub(self):
         time_start = datetime.datetime.utcnow()
         time_end = time_start + datetime.timedelta(minutes=60)
-        sub_uuid = str(uuid.uuid4())
+        sub_uuid = self.ids.next()
 
         resp = self.client.put(
             "/subscriptions/{}".format(sub_uuid),
@@ -63,21 +60,21 @@ class Sub(client.USS):
             },
         )
         if resp.status_code == 200:
-            self.sub_dict[sub_uuid] = resp.json()["subscription"]["version"]
+            self.entities.add(sub_uuid, resp.json()["subscription"]["version"])
 
     @task(20)
     def get_sub(self):
-        target_sub = random.choice(list(self.sub_dict.keys())) if self.sub_dict else None
+        target_sub = self.entities.pick()[0]
         if not target_sub:
-            print("Nothing to pick from sub_dict for GET")
+            print("Nothing to pick from subscription pool for GET")
             return
         self.client.get("/subscriptions/{}".format(target_sub))
 
     @task(50)
     def update_sub(self):
-        target_sub, target_version = self.checkout_sub()
+        target_sub, target_version = self.entities.checkout()
         if not target_sub:
-            print("Nothing to pick from sub_dict for UPDATE")
+            print("Nothing to pick from subscription pool for UPDATE")
             return
 
         time_start = datetime.datetime.utcnow()
@@ -102,26 +99,19 @@ class Sub(client.USS):
             },
         )
         if resp.status_code == 200:
-            self.sub_dict[target_sub] = resp.json()["subscription"]["version"]
+            self.entities.add(target_sub, resp.json()["subscription"]["version"])
 
     @task(5)
     def delete_sub(self):
-        target_sub, target_version = self.checkout_sub()
+        target_sub, target_version = self.entities.checkout()
         if not target_sub:
-            print("Nothing to pick from sub_dict for DELETE")
+            print("Nothing to pick from subscription pool for DELETE")
             return
         self.client.delete("/subscriptions/{}/{}".format(target_sub, target_version))
 
-    def checkout_sub(self):
-        self.lock.acquire()
-        target_sub = random.choice(list(self.sub_dict.keys())) if self.sub_dict else None
-        target_version = self.sub_dict.pop(target_sub, None)
-        self.lock.release()
-        return target_sub, target_version
-
     def on_start(self):
         # Insert atleast 1 Sub for update to not fail
         self.create_sub()
 
     def on_stop(self):
-        self.sub_dict = {}
\ No newline at end of file
+        self.entities.clear()
\ No newline at end of file
@@ -1,11 +1,85 @@
 #!env/bin/python3
 
+import itertools
 import os
+import random
 import time
 import typing
+import uuid
 from locust import User 
 from monitoring.monitorlib import auth, infrastructure, rid
 
+# Index of this Locust worker, which must differ between the workers of a distributed load test so that each worker
+# creates entities with IDs in its own range.  A random index is used when not specified.
+WORKER_INDEX = int(os.environ.get("LOADTEST_WORKER_INDEX", random.getrandbits(16)))
+
+# Number of the next User spawned in this worker
+_user_numbers = itertools.count()
+
+
+class IDGenerator(object):
+    """Generates entity IDs (version 4 UUIDs) in the range owned by a single User.
+
+    The highest 16 bits of the ID hold the worker index and the next 32 bits
+    hold the User number in the worker, so IDs generated by different Users or
+    workers never collide.  The sequence number in the lowest bits starts from
+    the current time so that IDs are not reused by successive load tests.
+    """
+
+    def __init__(self, worker_index: int, user_number: int):
+        self._prefix = ((worker_index & 0xFFFF) << 112) | ((user_number & 0xFFFFFFFF) << 80)
+        self._sequence = itertools.count(int(time.time() * 1000) << 20)
+
+    def next(self) -> str:
+        return str(uuid.UUID(int=self._prefix | (next(self._sequence) & ((1 << 62) - 1)), version=4))
+
+
+class EntityPool(object):
+    """Entities created by a single User, with O(1) random selection and removal.
+
+    Each User owns its pool, so no lock is needed and Users do not contend
+    with each other for entities.
+    """
+
+    def __init__(self):
+        self._ids: typing.List[str] = []
+        self._entities: typing.Dict[str, typing.Tuple[int, typing.Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, entity_id: str, value: typing.Any) -> None:
+        """Adds an entity, or replaces the value (e.g., version) of an existing entity"""
+        if entity_id in self._entities:
+            self._entities[entity_id] = (self._entities[entity_id][0], value)
+        else:
+            self._entities[entity_id] = (len(self._ids), value)
+            self._ids.append(entity_id)
+
+    def pick(self) -> typing.Tuple[typing.Optional[str], typing.Any]:
+        """Returns the ID and value of a random entity, or (None, None) if the pool is empty"""
+        if not self._ids:
+            return None, None
+        entity_id = self._ids[random.randrange(len(self._ids))]
+        return entity_id, self._entities[entity_id][1]
+
+    def checkout(self) -> typing.Tuple[typing.Optional[str], typing.Any]:
+        """Removes a random entity from the pool and returns its ID and value, or (None, None) if the pool is empty"""
+        entity_id, value = self.pick()
+        if entity_id is not None:
+            # Move the last ID into the slot of the removed ID
+            index = self._entities.pop(entity_id)[0]
+            last_id = self._ids.pop()
+            if last_id != entity_id:
+                self._ids[index] = last_id
+                self._entities[last_id] = (index, self._entities[last_id][1])
+        return entity_id, value
+
+    def clear(self) -> None:
+        self._ids = []
+        self._entities = {}
+
+
 class DSSClient(infrastructure.DSSTestSession):
     _locust_environment = None
 
@@ -51,11 +125,12 @@ class DSSClient(infrastructure.DSSTestSession):
 class USS(User):
     # Suggested by Locust 1.2.2 API Docs https://docs.locust.io/en/stable/api.html#locust.User.abstract
     abstract = True
-    isa_dict: typing.Dict[str, str] = {}
-    sub_dict: typing.Dict[str, str] = {}
 
     def __init__(self, *args, **kwargs):
         super(USS, self).__init__(*args, **kwargs)
+        # Entities created by this User, and the generator of their IDs
+        self.entities = EntityPool()
+        self.ids = IDGenerator(WORKER_INDEX, next(_user_numbers))
         auth_spec = os.environ.get("AUTH_SPEC")
         oauth_adapter = auth.make_auth_adapter(auth_spec) if auth_spec else None
         self.client = DSSClient(self.host, oauth_adapter)
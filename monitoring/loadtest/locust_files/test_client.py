@@ -0,0 +1,64 @@
+import random
+import uuid
+
+import client
+
+
+def test_entity_pool():
+    random.seed(0)
+    pool = client.EntityPool()
+    expected = {}
+    assert pool.pick() == (None, None)
+    assert pool.checkout() == (None, None)
+
+    for i in range(2000):
+        if expected and random.random() < 0.4:
+            entity_id, value = pool.checkout()
+            assert expected.pop(entity_id) == value
+        elif expected and random.random() < 0.2:
+            # Replace the value (e.g., version) of an existing entity
+            entity_id = random.choice(list(expected))
+            pool.add(entity_id, i)
+            expected[entity_id] = i
+        else:
+            entity_id = "entity{}".format(i)
+            pool.add(entity_id, i)
+            expected[entity_id] = i
+        assert len(pool) == len(expected)
+        entity_id, value = pool.pick()
+        if expected:
+            assert expected[entity_id] == value
+
+    picked = set(pool.pick()[0] for _ in range(20 * len(expected)))
+    assert picked == set(expected)
+
+    while expected:
+        entity_id, value = pool.checkout()
+        assert expected.pop(entity_id) == value
+    assert len(pool) == 0
+    assert pool.checkout() == (None, None)
+
+
+def test_entity_pool_clear():
+    pool = client.EntityPool()
+    for i in range(10):
+        pool.add("entity{}".format(i), i)
+    pool.clear()
+    assert len(pool) == 0
+    assert pool.pick() == (None, None)
+
+
+def test_id_generator():
+    ids = {}
+    for worker_index in (0, 1, 0xFFFF):
+        for user_number in (0, 1, 2, 1000):
+            generator = client.IDGenerator(worker_index, user_number)
+            generated = [generator.next() for _ in range(100)]
+            for entity_id in generated:
+                u = uuid.UUID(entity_id)
+                assert u.version == 4
+                assert u.variant == uuid.RFC_4122
+                assert entity_id not in ids, "{} generated for both {} and {}".format(
+                    entity_id, ids.get(entity_id), (worker_index, user_number))
+                ids[entity_id] = (worker_index, user_number)
+            assert len(set(generated)) == len(generated)
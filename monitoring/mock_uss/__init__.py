@@ -32,3 +32,7 @@ if SERVICE_SCDSC in webapp.config[config.KEY_SERVICES]:
     enabled_services.add(SERVICE_SCDSC)
     from monitoring.mock_uss import scdsc
     from monitoring.mock_uss.scdsc import routes as scdsc_routes
+
+from monitoring.mock_uss import virtual_uss
+if virtual_uss.virtual_usss():
+    webapp.wsgi_app = virtual_uss.VirtualUSSDispatcher(webapp.wsgi_app)
@@ -0,0 +1,231 @@
+"""Asynchronous outbound requests from mock_uss to the DSS and other USSs.
+
+Each worker process runs one event loop in a background thread, on which
+asynchronous outbound requests are performed through pooled aiohttp sessions.
+Route handlers run the outbound part of their work as a coroutine with `run`,
+so a handler which needs to contact many USSs waits for all of them at once
+instead of one after the other, and waiting handlers do not hold any
+connection or CPU.  Currently only RID display data and SCD operational
+intent discovery use this client; other outbound requests (e.g., ISA and
+operational intent reference mutations, subscriber notifications) still use
+the synchronous utm_client.
+"""
+
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import os
+import threading
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+import urllib.parse
+
+import aiohttp
+import s2sphere
+
+from monitoring.monitorlib import fetch, rid, scd
+from monitoring.monitorlib.clients.scd import OperationError
+from monitoring.monitorlib.fetch import rid as fetch_rid
+from monitoring.monitorlib.infrastructure import AuthAdapter
+from monitoring.monitorlib.typing import ImplicitDict
+
+
+# Maximum number of connections opened at the same time by each client of a process
+MAX_CONNECTIONS = 100
+
+# Maximum duration of a request, including waiting for a connection, in seconds
+REQUEST_TIMEOUT_S = sum(fetch.TIMEOUTS)
+
+# Additional time allowed to `run` a sequence of requests, e.g. to obtain access tokens, in seconds
+RUN_TIMEOUT_MARGIN_S = 10
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+  """Returns the event loop of this process, starting it if needed.
+
+  The loop is started lazily so that each worker forked from a preloaded
+  application gets its own loop.
+  """
+  global _loop, _loop_pid
+  with _loop_lock:
+    if _loop is None or _loop_pid != os.getpid():
+      _loop = asyncio.new_event_loop()
+      _loop_pid = os.getpid()
+      threading.Thread(target=_loop.run_forever, name='mock_uss-async-io', daemon=True).start()
+    return _loop
+
+
+T = TypeVar('T')
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+  """Runs a coroutine on the event loop of this process and returns its result.
+
+  :param timeout: Maximum time to wait for the result, in seconds; the coroutine is cancelled after this time
+  :raises TimeoutError: If the coroutine did not complete in time
+  """
+  future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+  try:
+    return future.result(timeout)
+  except concurrent.futures.TimeoutError:
+    future.cancel()
+    raise TimeoutError('Asynchronous operation did not complete within {}s'.format(timeout))
+
+
+def timeout_for(sequential_requests: int) -> float:
+  """Returns a timeout for `run` suitable for a coroutine performing this many requests one after the other"""
+  return sequential_requests * REQUEST_TIMEOUT_S + RUN_TIMEOUT_MARGIN_S
+
+
+class AsyncDSSClient(object):
+  """Asynchronous equivalent of DSSTestSession for use on the event loop of this process.
+
+  Requests are described as fetch.Query, exactly like with
+  fetch.query_and_describe.
+  """
+
+  def __init__(self, prefix_url: str, auth_adapter: Optional[AuthAdapter] = None):
+    self._prefix_url = prefix_url[0:-1] if prefix_url[-1] == '/' else prefix_url
+    self.auth_adapter = auth_adapter
+    self._session: Optional[aiohttp.ClientSession] = None
+    self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+  def _get_session(self) -> aiohttp.ClientSession:
+    loop = asyncio.get_event_loop()
+    if self._session is None or self._session_loop is not loop:
+      connect_timeout, read_timeout = fetch.TIMEOUTS
+      self._session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS),
+        timeout=aiohttp.ClientTimeout(
+          total=REQUEST_TIMEOUT_S, sock_connect=connect_timeout, sock_read=read_timeout))
+      self._session_loop = loop
+    return self._session
+
+  async def query(self, method: str, url: str, scope: Optional[str] = None,
+                  params: Optional[Dict[str, str]] = None, json_body: Optional[Any] = None) -> fetch.Query:
+    if url.startswith('/'):
+      url = self._prefix_url + url
+    if params:
+      url = '{}{}{}'.format(url, '&' if '?' in url else '?', urllib.parse.urlencode(params))
+    headers = {}
+    if self.auth_adapter:
+      if not scope:
+        raise ValueError('All requests must specify an auth scope')
+      # Obtaining a token may require a request to the auth server, which must not block the event loop
+      headers.update(await asyncio.get_event_loop().run_in_executor(
+        None, self.auth_adapter.get_headers, url, scope.split(' ')))
+    body = None
+    if json_body is not None:
+      body = json.dumps(json_body)
+      headers['Content-Type'] = 'application/json'
+
+    t0 = datetime.datetime.utcnow()
+    request = {
+      'method': method,
+      'url': url,
+      'initiated_at': t0.isoformat(),
+      'headers': headers,
+    }
+    if json_body is not None:
+      request['json'] = json_body
+    else:
+      request['body'] = None
+    try:
+      async with self._get_session().request(method, url, data=body, headers=headers) as resp:
+        content = await resp.read()
+        t1 = datetime.datetime.utcnow()
+        response = {
+          'code': resp.status,
+          'headers': {k: v for k, v in resp.headers.items()},
+          'elapsed_s': (t1 - t0).total_seconds(),
+          'reported': t1.isoformat(),
+        }
+      try:
+        response['json'] = json.loads(content)
+      except ValueError:
+        response['body'] = content.decode('utf-8', errors='replace')
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+      t1 = datetime.datetime.utcnow()
+      response = {
+        'code': None,
+        'failure': '{}: {}'.format(type(e).__name__, str(e)),
+        'elapsed_s': (t1 - t0).total_seconds(),
+        'reported': t1.isoformat(),
+      }
+    return fetch.Query({
+      'request': fetch.RequestDescription(request),
+      'response': fetch.ResponseDescription(response),
+    })
+
+
+# === RID operations ===
+
+
+async def isas(client: AsyncDSSClient, box: s2sphere.LatLngRect,
+               start_time: datetime.datetime, end_time: datetime.datetime) -> fetch_rid.FetchedISAs:
+  """Asynchronous equivalent of fetch.rid.isas"""
+  area = rid.geo_polygon_string(rid.vertices_from_latlng_rect(box))
+  url = '/v1/dss/identification_service_areas?area={}&earliest_time={}&latest_time={}'.format(
+    area, start_time.strftime(rid.DATE_FORMAT), end_time.strftime(rid.DATE_FORMAT))
+  return fetch_rid.FetchedISAs(await client.query('GET', url, scope=rid.SCOPE_READ))
+
+
+async def flights(client: AsyncDSSClient, flights_url: str, area: s2sphere.LatLngRect,
+                  include_recent_positions: bool) -> fetch_rid.FetchedUSSFlights:
+  """Asynchronous equivalent of fetch.rid.flights"""
+  return fetch_rid.FetchedUSSFlights(await client.query('GET', flights_url, params={
+    'view': '{},{},{},{}'.format(
+      area.lat_lo().degrees,
+      area.lng_lo().degrees,
+      area.lat_hi().degrees,
+      area.lng_hi().degrees,
+    ),
+    'include_recent_positions': 'true' if include_recent_positions else 'false',
+  }, scope=rid.SCOPE_READ))
+
+
+async def all_uss_flights(client: AsyncDSSClient, flights_urls: List[str], area: s2sphere.LatLngRect,
+                          include_recent_positions: bool) -> Dict[str, fetch_rid.FetchedUSSFlights]:
+  """Retrieves the flights from all the flights URLs at the same time"""
+  results = await asyncio.gather(*[
+    flights(client, flights_url, area, include_recent_positions) for flights_url in flights_urls])
+  return dict(zip(flights_urls, results))
+
+
+# === SCD operations ===
+
+
+def _operation_failure(operation: str, query: fetch.Query) -> OperationError:
+  response = query.response
+  content = response.get('body', None)
+  if content is None:
+    content = json.dumps(response['json']) if 'json' in response else response.get('failure', '')
+  return OperationError('{} failed {}:\n{}'.format(operation, query.status_code, content))
+
+
+async def query_operational_intent_references(client: AsyncDSSClient, area_of_interest: scd.Volume4D) -> List[scd.OperationalIntentReference]:
+  """Asynchronous equivalent of clients.scd.query_operational_intent_references"""
+  req = scd.QueryOperationalIntentReferenceParameters(area_of_interest=area_of_interest)
+  query = await client.query('POST', '/dss/v1/operational_intent_references/query', json_body=req, scope=scd.SCOPE_SC)
+  if query.status_code != 200:
+    raise _operation_failure('queryOperationalIntentReferences', query)
+  return ImplicitDict.parse(query.json_result, scd.QueryOperationalIntentReferenceResponse).operational_intent_references
+
+
+async def get_operational_intent_details(client: AsyncDSSClient, uss_base_url: str, id: str) -> scd.OperationalIntent:
+  """Asynchronous equivalent of clients.scd.get_operational_intent_details"""
+  query = await client.query('GET', '{}/uss/v1/operational_intents/{}'.format(uss_base_url, id), scope=scd.SCOPE_SC)
+  if query.status_code != 200:
+    raise _operation_failure('getOperationalIntentDetails', query)
+  return ImplicitDict.parse(query.json_result, scd.GetOperationalIntentDetailsResponse).operational_intent
+
+
+async def all_operational_intent_details(client: AsyncDSSClient, op_intent_refs: List[scd.OperationalIntentReference]) -> List[scd.OperationalIntent]:
+  """Retrieves the details of all the operational intents from their managing USSs at the same time"""
+  return list(await asyncio.gather(*[
+    get_operational_intent_details(client, op_intent_ref.uss_base_url, op_intent_ref.id)
+    for op_intent_ref in op_intent_refs]))
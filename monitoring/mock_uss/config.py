@@ -6,12 +6,17 @@ from monitoring.monitorlib.locality import Locality
 
 ENV_KEY_PREFIX = 'MOCK_USS'
 ENV_KEY_PUBLIC_KEY = '{}_PUBLIC_KEY'.format(ENV_KEY_PREFIX)
+ENV_KEY_PUBLIC_KEY_REFRESH_INTERVAL = '{}_PUBLIC_KEY_REFRESH_INTERVAL'.format(ENV_KEY_PREFIX)
 ENV_KEY_TOKEN_AUDIENCE = '{}_TOKEN_AUDIENCE'.format(ENV_KEY_PREFIX)
 ENV_KEY_BASE_URL = '{}_BASE_URL'.format(ENV_KEY_PREFIX)
 ENV_KEY_AUTH = '{}_AUTH_SPEC'.format(ENV_KEY_PREFIX)
 ENV_KEY_SERVICES = '{}_SERVICES'.format(ENV_KEY_PREFIX)
 ENV_KEY_DSS = '{}_DSS_URL'.format(ENV_KEY_PREFIX)
 ENV_KEY_BEHAVIOR_LOCALITY = '{}_BEHAVIOR_LOCALITY'.format(ENV_KEY_PREFIX)
+ENV_KEY_VIRTUAL_USSS = '{}_VIRTUAL_USSS'.format(ENV_KEY_PREFIX)
+ENV_KEY_VIRTUAL_USS_AUTH_SPEC = '{}_VIRTUAL_USS_AUTH_SPEC'.format(ENV_KEY_PREFIX)
+ENV_KEY_VIRTUAL_USS_DB_CAPACITY = '{}_VIRTUAL_USS_DB_CAPACITY'.format(ENV_KEY_PREFIX)
+ENV_KEY_VIRTUAL_USS_MAX_CONCURRENT_REQUESTS = '{}_VIRTUAL_USS_MAX_CONCURRENT_REQUESTS'.format(ENV_KEY_PREFIX)
 
 # These keys map to entries in the Config class
 KEY_TOKEN_PUBLIC_KEY = 'TOKEN_PUBLIC_KEY'
@@ -21,17 +26,33 @@ KEY_AUTH_SPEC = 'AUTH_SPEC'
 KEY_SERVICES = 'SERVICES'
 KEY_DSS_URL = 'DSS_URL'
 KEY_BEHAVIOR_LOCALITY = 'BEHAVIOR_LOCALITY'
+KEY_VIRTUAL_USSS = 'VIRTUAL_USSS'
+KEY_VIRTUAL_USS_AUTH_SPEC = 'VIRTUAL_USS_AUTH_SPEC'
+KEY_VIRTUAL_USS_DB_CAPACITY = 'VIRTUAL_USS_DB_CAPACITY'
+KEY_VIRTUAL_USS_MAX_CONCURRENT_REQUESTS = 'VIRTUAL_USS_MAX_CONCURRENT_REQUESTS'
 
 
 workspace_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'workspace')
 
 
 class Config(object):
-  TOKEN_PUBLIC_KEY = auth_validation.fix_key(
-    os.environ.get(ENV_KEY_PUBLIC_KEY, '')).encode('utf-8')
+  # Keys are loaded on first use and then refreshed every MOCK_USS_PUBLIC_KEY_REFRESH_INTERVAL seconds
+  TOKEN_PUBLIC_KEY = auth_validation.KeyManager(
+    os.environ.get(ENV_KEY_PUBLIC_KEY, ''),
+    refresh_interval_s=float(os.environ.get(ENV_KEY_PUBLIC_KEY_REFRESH_INTERVAL, '3600')))
   TOKEN_AUDIENCE = os.environ.get(ENV_KEY_TOKEN_AUDIENCE, '')
   USS_BASE_URL = os.environ.get(ENV_KEY_BASE_URL, None)
   AUTH_SPEC = os.environ[ENV_KEY_AUTH]
   SERVICES = set(svc.strip().lower() for svc in os.environ.get(ENV_KEY_SERVICES, '').split(','))
   DSS_URL = os.environ[ENV_KEY_DSS]
   BEHAVIOR_LOCALITY = Locality(os.environ.get(ENV_KEY_BEHAVIOR_LOCALITY, 'CHE'))
+
+  # Names of the virtual USSs hosted in addition to the main mock USS, each
+  # served under /v/<name> (see virtual_uss.py)
+  VIRTUAL_USSS = [name.strip() for name in os.environ.get(ENV_KEY_VIRTUAL_USSS, '').split(',') if name.strip()]
+  # Auth spec of the virtual USSs; {name} is replaced by the name of each virtual USS
+  VIRTUAL_USS_AUTH_SPEC = os.environ.get(ENV_KEY_VIRTUAL_USS_AUTH_SPEC, AUTH_SPEC)
+  # Capacity, in bytes, of each database of each virtual USS
+  VIRTUAL_USS_DB_CAPACITY = int(os.environ.get(ENV_KEY_VIRTUAL_USS_DB_CAPACITY, '1000000'))
+  # Maximum number of requests handled at the same time by each virtual USS in each worker process
+  VIRTUAL_USS_MAX_CONCURRENT_REQUESTS = int(os.environ.get(ENV_KEY_VIRTUAL_USS_MAX_CONCURRENT_REQUESTS, '4'))
@@ -1,8 +1,20 @@
 from monitoring.monitorlib import auth, infrastructure
-from monitoring.mock_uss import webapp
+from monitoring.mock_uss import async_client, virtual_uss, webapp
 from . import config
 
 
-utm_client = infrastructure.DSSTestSession(
+_utm_clients = virtual_uss.Partitioned(lambda uss: infrastructure.DSSTestSession(
     webapp.config[config.KEY_DSS_URL],
-    auth.make_auth_adapter(webapp.config[config.KEY_AUTH_SPEC]))
+    auth.make_auth_adapter(uss.auth_spec)))
+_async_utm_clients = virtual_uss.Partitioned(lambda uss: async_client.AsyncDSSClient(
+    webapp.config[config.KEY_DSS_URL],
+    auth.make_auth_adapter(uss.auth_spec)))
+
+
+def __getattr__(name):
+    # utm_client and async_utm_client are the clients of the USS (main or virtual) handling the current request
+    if name == 'utm_client':
+        return _utm_clients.get()
+    if name == 'async_utm_client':
+        return _async_utm_clients.get()
+    raise AttributeError('module {} has no attribute {}'.format(__name__, name))
@@ -2,7 +2,7 @@ import json
 from typing import Dict
 
 from monitoring.monitorlib.typing import ImplicitDict
-from monitoring.monitorlib.multiprocessing import SynchronizedValue
+from monitoring.mock_uss import virtual_uss
 
 
 class FlightInfo(ImplicitDict):
@@ -14,6 +14,7 @@ class Database(ImplicitDict):
   flights: Dict[str, FlightInfo] = {}
 
 
-db = SynchronizedValue(
-    Database(),
+# Each USS hosted by this process (see virtual_uss.py) has its own partition
+db = virtual_uss.PartitionedValue(
+    Database,
     decoder=lambda b: ImplicitDict.parse(json.loads(b.decode('utf-8')), Database))
@@ -1,3 +1,4 @@
+import datetime
 from typing import Dict, List, Optional, Tuple
 
 import arrow
@@ -8,7 +9,7 @@ from monitoring.monitorlib import geo, rid
 from monitoring.monitorlib.fetch import rid as fetch
 from monitoring.monitorlib.rid_automated_testing import observation_api
 from monitoring.monitorlib.typing import ImplicitDict
-from monitoring.mock_uss import resources, webapp
+from monitoring.mock_uss import async_client, resources, webapp
 from monitoring.mock_uss.auth import requires_scope
 from . import database
 from .database import db
@@ -58,6 +59,14 @@ def _make_flight_observation(flight: rid.RIDFlight, view: s2sphere.LatLngRect) -
     recent_paths=[observation_api.Path(positions=path) for path in paths])
 
 
+async def _fetch_flights(client: async_client.AsyncDSSClient, view: s2sphere.LatLngRect,
+                         t: datetime.datetime) -> Tuple[fetch.FetchedISAs, Dict[str, fetch.FetchedUSSFlights]]:
+  isas_response = await async_client.isas(client, view, t, t)
+  if not isas_response.success:
+    return isas_response, {}
+  return isas_response, await async_client.all_uss_flights(client, isas_response.flight_urls, view, True)
+
+
 @webapp.route('/riddp/observation/display_data', methods=['GET'])
 @requires_scope([rid.SCOPE_READ])
 def display_data() -> Tuple[str, int]:
@@ -75,21 +84,24 @@ def display_data() -> Tuple[str, int]:
   if diagonal > rid.NetMaxDisplayAreaDiagonal:
     return flask.jsonify(rid.ErrorResponse(message='Requested diagonal was too large')), 413
 
-  # Get ISAs in the DSS
+  # Get ISAs in the DSS, then flights from all unique flights URLs at once
   t = arrow.utcnow().datetime
-  isas_response: fetch.FetchedISAs = fetch.isas(resources.utm_client, view, t, t)
+  try:
+    # ISAs are fetched first, then all flights at once
+    isas_response, flights_responses = async_client.run(
+      _fetch_flights(resources.async_utm_client, view, t), timeout=async_client.timeout_for(2))
+  except TimeoutError as e:
+    return flask.jsonify(rid.ErrorResponse(message='Unable to fetch flights: {}'.format(e))), 412
   if not isas_response.success:
     response = rid.ErrorResponse(message='Unable to fetch ISAs from DSS')
     response['errors'] = [isas_response]
     return flask.jsonify(response), 412
 
-  # Fetch flights from each unique flights URL
   validated_flights: List[rid.RIDFlight] = []
   tx = db.value
   flight_info: Dict[str, database.FlightInfo] = {k: v for k, v in tx.flights.items()}
 
-  for flights_url in isas_response.flight_urls:
-    flights_response = fetch.flights(resources.utm_client, flights_url, view, True)
+  for flights_url, flights_response in flights_responses.items():
     if not flights_response.success:
       response = rid.ErrorResponse(message='Error querying {}'.format(flights_url))
       response['errors'] = [flights_response]
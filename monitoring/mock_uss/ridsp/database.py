@@ -1,9 +1,9 @@
 import json
 from typing import Dict, List, Optional
 
-from monitoring.monitorlib.multiprocessing import SynchronizedValue
 from monitoring.monitorlib.rid_automated_testing import injection_api
 from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.mock_uss import virtual_uss
 
 
 class TestRecord(ImplicitDict):
@@ -25,6 +25,7 @@ class Database(ImplicitDict):
   tests: Dict[str, TestRecord] = {}
 
 
-db = SynchronizedValue(
-    Database(),
+# Each USS hosted by this process (see virtual_uss.py) has its own partition
+db = virtual_uss.PartitionedValue(
+    Database,
     decoder=lambda b: ImplicitDict.parse(json.loads(b.decode('utf-8')), Database))
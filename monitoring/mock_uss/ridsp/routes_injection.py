@@ -1,5 +1,5 @@
 import datetime
-from typing import Tuple
+from typing import Dict, Tuple
 import uuid
 
 import flask
@@ -10,7 +10,7 @@ from monitoring.monitorlib.rid_automated_testing import injection_api
 from monitoring.monitorlib.typing import ImplicitDict
 from monitoring.mock_uss import webapp
 from monitoring.mock_uss.auth import requires_scope
-from monitoring.mock_uss import config, resources
+from monitoring.mock_uss import resources, virtual_uss
 from . import database
 from .database import db
 
@@ -20,6 +20,14 @@ from .database import db
 RECENT_POSITIONS_BUFFER = datetime.timedelta(seconds=60.2)
 
 
+def _report_notification_failures(notifications: Dict[str, mutate.SubscriberNotification]) -> None:
+  for (url, notification) in notifications.items():
+    code = notification.response.status_code
+    if code != 204 and code != 200:
+      print('[RID] Notification of {} failed ({}) after {:.3f}s: {}'.format(
+        url, code, notification.latency_s, notification.response.get('failure', '')), flush=True)
+
+
 @webapp.route('/ridsp/injection/tests/<test_id>', methods=['PUT'])
 @requires_scope([injection_api.SCOPE_RID_QUALIFIER_INJECT])
 def create_test(test_id: str) -> Tuple[str, int]:
@@ -39,17 +47,15 @@ def create_test(test_id: str) -> Tuple[str, int]:
   (t0, t1) = req_body.get_span()
   t1 += RECENT_POSITIONS_BUFFER
   rect = req_body.get_rect()
-  flights_url = '{}/mock/ridsp/v1/uss/flights'.format(webapp.config.get(config.KEY_BASE_URL))
-  mutated_isa = mutate.put_isa(resources.utm_client, rect, t0, t1, flights_url, record.version)
-  if not mutated_isa.dss_response.success:
+  flights_url = '{}/mock/ridsp/v1/uss/flights'.format(virtual_uss.base_url())
+  dss_response, notifications = mutate.put_isa_notifying_in_background(
+    resources.utm_client, rect, t0, t1, flights_url, record.version)
+  if not dss_response.success:
     response = rid.ErrorResponse(message='Unable to create ISA in DSS')
-    response['errors'] = mutated_isa.dss_response.errors
+    response['errors'] = dss_response.errors
     return flask.jsonify(response), 412
-  record.isa_version = mutated_isa.dss_response.isa.version
-  for (url, notification) in mutated_isa.notifications.items():
-    code = notification.response.status_code
-    if code != 204 and code != 200:
-      pass #TODO: Log notification failures (maybe also log incorrect 200s)
+  record.isa_version = dss_response.isa.version
+  notifications.add_done_callback(_report_notification_failures)
 
   with db as tx:
     tx.tests[test_id] = record
@@ -67,15 +73,13 @@ def delete_test(test_id: str) -> Tuple[str, int]:
     return 'Test "{}" not found'.format(test_id), 404
 
   # Delete ISA from DSS
-  deleted_isa = mutate.delete_isa(resources.utm_client, record.version, record.isa_version)
-  if not deleted_isa.dss_response.success:
+  dss_response, notifications = mutate.delete_isa_notifying_in_background(
+    resources.utm_client, record.version, record.isa_version)
+  if not dss_response.success:
     response = rid.ErrorResponse(message='Unable to delete ISA from DSS')
-    response['errors'] = deleted_isa.dss_response.errors
+    response['errors'] = dss_response.errors
     return flask.jsonify(response), 412
-  for (url, notification) in deleted_isa.notifications.items():
-    code = notification.response.status_code
-    if code != 204 and code != 200:
-      pass #TODO: Log notification failures (maybe also log incorrect 200s)
+  notifications.add_done_callback(_report_notification_failures)
 
   with db as tx:
     del tx.tests[test_id]
@@ -2,13 +2,30 @@ import flask
 from werkzeug.exceptions import HTTPException
 
 from monitoring.monitorlib import auth_validation, versioning
-from monitoring.mock_uss import webapp, enabled_services
+from monitoring.mock_uss import webapp, enabled_services, virtual_uss
+from monitoring.mock_uss.auth import requires_scope
 
 
 @webapp.route('/status')
 def status():
-    return 'Mock USS ok {}; hosting {}'.format(
-        versioning.get_code_version(), ', '.join(enabled_services))
+    uss = virtual_uss.current()
+    if uss is not virtual_uss.main_uss:
+        return 'Virtual USS {} ok {}; hosting {}'.format(
+            uss.name, versioning.get_code_version(), ', '.join(enabled_services))
+    hosted_usss = virtual_uss.virtual_usss()
+    return 'Mock USS ok {}; hosting {}{}'.format(
+        versioning.get_code_version(), ', '.join(enabled_services),
+        '; with {} virtual USSs'.format(len(hosted_usss)) if hosted_usss else '')
+
+
+@webapp.route('/status/token_cache')
+def token_cache_status():
+    return flask.jsonify(requires_scope.token_cache.stats())
+
+
+@webapp.route('/status/token_keys')
+def token_keys_status():
+    return flask.jsonify(requires_scope.key_manager.stats())
 
 
 @webapp.errorhandler(Exception)
@@ -25,5 +25,7 @@ docker run --name mock_uss_ridsp \
   gunicorn \
     --preload \
     --workers=1 \
+    --worker-class=gthread \
+    --threads=64 \
     --bind=0.0.0.0:5000 \
     monitoring.mock_uss:webapp
@@ -2,9 +2,9 @@ import json
 from typing import Dict, Optional
 
 from monitoring.monitorlib import scd
-from monitoring.monitorlib.multiprocessing import SynchronizedValue
 from monitoring.monitorlib.scd_automated_testing import scd_injection_api
 from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.mock_uss import virtual_uss
 
 
 class FlightRecord(ImplicitDict):
@@ -20,6 +20,7 @@ class Database(ImplicitDict):
     cached_operations: Dict[str, scd.OperationalIntent] = {}
 
 
-db = SynchronizedValue(
-    Database(),
+# Each USS hosted by this process (see virtual_uss.py) has its own partition
+db = virtual_uss.PartitionedValue(
+    Database,
     decoder=lambda b: ImplicitDict.parse(json.loads(b.decode('utf-8')), Database))
@@ -12,7 +12,7 @@ from monitoring.monitorlib.clients import scd as scd_client
 from monitoring.monitorlib.scd_automated_testing import scd_injection_api
 from monitoring.monitorlib.scd_automated_testing.scd_injection_api import InjectFlightRequest, InjectFlightResponse, SCOPE_SCD_QUALIFIER_INJECT, InjectFlightResult, DeleteFlightResponse, DeleteFlightResult, ClearAreaRequest, ClearAreaOutcome, ClearAreaResponse, Capability, CapabilitiesResponse
 from monitoring.monitorlib.typing import ImplicitDict, StringBasedDateTime
-from monitoring.mock_uss import config, resources, webapp
+from monitoring.mock_uss import async_client, config, resources, virtual_uss, webapp
 from monitoring.mock_uss.auth import requires_scope
 from monitoring.mock_uss.scdsc import database
 from monitoring.mock_uss.scdsc.database import db
@@ -24,16 +24,20 @@ def query_operational_intents(area_of_interest: scd.Volume4D) -> List[scd.Operat
     :param area_of_interest: Area where intersecting operational intents must be discovered
     :return: Full definition for every operational intent discovered
     """
-    op_intent_refs = scd_client.query_operational_intent_references(resources.utm_client, area_of_interest)
+    client = resources.async_utm_client
+    op_intent_refs = async_client.run(
+        async_client.query_operational_intent_references(client, area_of_interest),
+        timeout=async_client.timeout_for(1))
     tx = db.value
     get_details_for = []
     for op_intent_ref in op_intent_refs:
         if op_intent_ref.id not in tx.cached_operations or tx.cached_operations[op_intent_ref.id].reference.version != op_intent_ref.version:
             get_details_for.append(op_intent_ref)
 
-    updated_op_intents = []
-    for op_intent_ref in get_details_for:
-        updated_op_intents.append(scd_client.get_operational_intent_details(resources.utm_client, op_intent_ref.uss_base_url, op_intent_ref.id))
+    # Details are requested from all the managing USSs at the same time
+    updated_op_intents = async_client.run(
+        async_client.all_operational_intent_details(client, get_details_for),
+        timeout=async_client.timeout_for(1))
 
     with db as tx:
         for op_intent in updated_op_intents:
@@ -41,6 +45,13 @@ def query_operational_intents(area_of_interest: scd.Volume4D) -> List[scd.Operat
         return [tx.cached_operations[op_intent_ref.id] for op_intent_ref in op_intent_refs]
 
 
+def _report_notification_failures(results: List[scd_client.SubscriberNotificationResult]) -> None:
+    for result in results:
+        if not result.success:
+            print('[SCD] Notification of {} failed after {} attempt(s) in {:.3f}s: {}'.format(
+                result.uss_base_url, result.attempts, result.latency_s, result.error), flush=True)
+
+
 @webapp.route('/scdsc/v1/status', methods=['GET'])
 @requires_scope([SCOPE_SCD_QUALIFIER_INJECT])
 def scdsc_injection_status() -> Tuple[str, int]:
@@ -102,7 +113,7 @@ def inject_flight(flight_id: str) -> Tuple[str, int]:
     vol4 = scd.make_vol4(start_time, end_time, alt_lo, alt_hi, polygon=scd.make_polygon(latlngrect=area))
     try:
         op_intents = query_operational_intents(vol4)
-    except (ValueError, scd_client.OperationError, requests.exceptions.ConnectionError, ConnectionError) as e:
+    except (ValueError, scd_client.OperationError, requests.exceptions.ConnectionError, ConnectionError, TimeoutError) as e:
         notes = 'Error querying operational intents: {}'.format(e)
         return flask.jsonify(InjectFlightResponse(
             result=InjectFlightResult.Failed, notes=notes)), 200
@@ -122,7 +133,7 @@ def inject_flight(flight_id: str) -> Tuple[str, int]:
                 result=InjectFlightResult.ConflictWithFlight, notes=notes)), 200
 
     # Create operational intent in DSS
-    base_url = '{}/mock/scd'.format(webapp.config[config.KEY_BASE_URL])
+    base_url = '{}/mock/scd'.format(virtual_uss.base_url())
     req = scd.PutOperationalIntentReferenceParameters(
         extents=req_body.operational_intent.volumes,
         key=[op.reference.ovn for op in op_intents],
@@ -139,12 +150,12 @@ def inject_flight(flight_id: str) -> Tuple[str, int]:
         notes = 'Error creating operational intent: {}'.format(e)
         return flask.jsonify(InjectFlightResponse(
             result=InjectFlightResult.Failed, notes=notes)), 200
-    scd_client.notify_subscribers(
+    _report_notification_failures(scd_client.notify_subscribers(
         resources.utm_client, result.operational_intent_reference.id,
         scd.OperationalIntent(
             reference=result.operational_intent_reference,
             details=req_body.operational_intent),
-        result.subscribers)
+        result.subscribers))
 
     # Store flight in database
     record = database.FlightRecord(
@@ -180,9 +191,9 @@ def delete_flight(flight_id: str) -> Tuple[str, int]:
         notes = 'Error deleting operational intent: {}'.format(e)
         return flask.jsonify(DeleteFlightResponse(
             result=DeleteFlightResult.Failed, notes=notes)), 200
-    scd_client.notify_subscribers(
+    _report_notification_failures(scd_client.notify_subscribers(
         resources.utm_client, result.operational_intent_reference.id,
-        None, result.subscribers)
+        None, result.subscribers))
 
     return flask.jsonify(DeleteFlightResponse(result=DeleteFlightResult.Closed))
 
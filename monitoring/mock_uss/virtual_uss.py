@@ -0,0 +1,157 @@
+"""Hosting of many virtual USSs in a single mock_uss process.
+
+Each virtual USS is served under its own URL prefix (/v/<name>), uses its own
+auth identity to talk to the DSS and other USSs, and keeps its state in its
+own partition of each mock_uss database.  Requests which are not under a
+virtual USS prefix are served by the main mock USS as usual.
+"""
+
+import threading
+from typing import Callable, Dict, Generic, List, TypeVar
+
+import flask
+
+from monitoring.monitorlib.multiprocessing import SynchronizedValue
+from monitoring.mock_uss import config, webapp
+
+
+URL_PREFIX = '/v'
+ENVIRON_KEY = 'mock_uss.virtual_uss'
+
+# Time, in seconds, a request to a busy virtual USS waits for a slot before being rejected
+SLOT_TIMEOUT = 10
+
+
+class VirtualUSS(object):
+  """A USS hosted by this mock_uss process"""
+
+  def __init__(self, name: str, base_url: str, auth_spec: str,
+               max_concurrent_requests: int, db_capacity_bytes: int):
+    self.name = name
+    self.base_url = base_url
+    self.auth_spec = auth_spec
+    self.db_capacity_bytes = db_capacity_bytes
+    self.slots = threading.BoundedSemaphore(max(1, max_concurrent_requests))
+
+
+def _make_usss() -> Dict[str, VirtualUSS]:
+  base_url = webapp.config.get(config.KEY_BASE_URL) or ''
+  usss = {'': VirtualUSS(
+    name='', base_url=base_url,
+    auth_spec=webapp.config[config.KEY_AUTH_SPEC],
+    max_concurrent_requests=0, db_capacity_bytes=int(10e6))}
+  for name in webapp.config[config.KEY_VIRTUAL_USSS]:
+    if not name.isidentifier():
+      raise ValueError('Invalid virtual USS name "{}"; names may only contain letters, digits and underscores'.format(name))
+    usss[name] = VirtualUSS(
+      name=name,
+      base_url='{}{}/{}'.format(base_url, URL_PREFIX, name),
+      auth_spec=webapp.config[config.KEY_VIRTUAL_USS_AUTH_SPEC].replace('{name}', name),
+      max_concurrent_requests=webapp.config[config.KEY_VIRTUAL_USS_MAX_CONCURRENT_REQUESTS],
+      db_capacity_bytes=webapp.config[config.KEY_VIRTUAL_USS_DB_CAPACITY])
+  return usss
+
+
+_usss = _make_usss()
+main_uss = _usss['']
+
+
+def virtual_usss() -> List[VirtualUSS]:
+  """Returns the virtual USSs hosted in addition to the main mock USS"""
+  return [uss for uss in _usss.values() if uss is not main_uss]
+
+
+def current() -> VirtualUSS:
+  """Returns the USS handling the current request (the main mock USS outside of requests)"""
+  if flask.has_request_context():
+    return flask.request.environ.get(ENVIRON_KEY, main_uss)
+  return main_uss
+
+
+def base_url() -> str:
+  """Returns the base URL of the USS handling the current request"""
+  return current().base_url
+
+
+T = TypeVar('T')
+
+
+class Partitioned(Generic[T]):
+  """A separate instance of a resource for each USS hosted by this process.
+
+  All the instances are created immediately, so that shared resources exist
+  before worker processes are forked.
+  """
+
+  def __init__(self, factory: Callable[[VirtualUSS], T]):
+    self._instances: Dict[str, T] = {name: factory(uss) for name, uss in _usss.items()}
+
+  def get(self) -> T:
+    """Returns the instance of the USS handling the current request"""
+    return self._instances[current().name]
+
+
+class PartitionedValue(Partitioned[SynchronizedValue]):
+  """A SynchronizedValue with a separate partition for each USS hosted by this process.
+
+  It is used exactly like a SynchronizedValue; reads and transactions apply to
+  the partition of the USS handling the current request.
+  """
+
+  def __init__(self, initial_value: Callable[[], object], decoder: Callable[[bytes], object]):
+    super(PartitionedValue, self).__init__(lambda uss: SynchronizedValue(
+      initial_value(), capacity_bytes=uss.db_capacity_bytes, decoder=decoder))
+
+  @property
+  def value(self):
+    return self.get().value
+
+  def __enter__(self):
+    return self.get().__enter__()
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    return self.get().__exit__(exc_type, exc_val, exc_tb)
+
+
+class VirtualUSSDispatcher(object):
+  """WSGI middleware routing requests under /v/<name> to the virtual USS <name>.
+
+  The prefix is moved from PATH_INFO to SCRIPT_NAME so the regular mock_uss
+  routes handle the request, and the number of requests handled at the same
+  time by each virtual USS is limited so that a busy virtual USS cannot starve
+  the others.
+  """
+
+  def __init__(self, app):
+    self._app = app
+
+  def __call__(self, environ, start_response):
+    path = environ.get('PATH_INFO', '')
+    if not path.startswith(URL_PREFIX + '/'):
+      return self._app(environ, start_response)
+
+    name, _, rest = path[len(URL_PREFIX) + 1:].partition('/')
+    uss = _usss.get(name) if name else None
+    if uss is None:
+      return _plain_response(start_response, '404 NOT FOUND', 'Virtual USS "{}" not found'.format(name))
+    if not uss.slots.acquire(timeout=SLOT_TIMEOUT):
+      return _plain_response(start_response, '503 SERVICE UNAVAILABLE', 'Virtual USS "{}" is busy'.format(name))
+    try:
+      environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + URL_PREFIX + '/' + name
+      environ['PATH_INFO'] = '/' + rest
+      environ[ENVIRON_KEY] = uss
+      # mock_uss responses are not streamed, so the whole response is produced here
+      response = self._app(environ, start_response)
+      try:
+        return list(response)
+      finally:
+        if hasattr(response, 'close'):
+          response.close()
+    finally:
+      uss.slots.release()
+
+
+def _plain_response(start_response, status: str, message: str):
+  body = message.encode('utf-8')
+  start_response(status, [('Content-Type', 'text/plain'), ('Content-Length', str(len(body)))])
+  return [body]
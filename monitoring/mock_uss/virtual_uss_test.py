@@ -0,0 +1,77 @@
+"""Unit tests for the virtual_uss module using pytest.
+
+The mock_uss environment (including the virtual USSs uss1 and uss2) is
+configured in monitoring/conftest.py.
+"""
+
+import json
+
+import flask
+
+from monitoring.mock_uss import virtual_uss, webapp
+
+
+_db = virtual_uss.PartitionedValue(lambda: {'requests': 0}, decoder=lambda b: json.loads(b.decode('utf-8')))
+
+
+def _describe_request():
+  with _db as tx:
+    tx['requests'] += 1
+  return flask.jsonify({
+    'uss': virtual_uss.current().name,
+    'base_url': virtual_uss.base_url(),
+    'script_root': flask.request.script_root,
+    'path': flask.request.path,
+    'requests': _db.value['requests'],
+  })
+webapp.add_url_rule('/virtual_uss_test', 'virtual_uss_test', _describe_request)
+
+
+def test_unknown_virtual_uss():
+  client = webapp.test_client()
+  for path in ('/v/uss3/status', '/v//status', '/v/uss3/virtual_uss_test'):
+    resp = client.get(path)
+    assert resp.status_code == 404
+    assert b'not found' in resp.data
+  assert client.get('/status').status_code == 200
+
+
+def test_dispatch():
+  client = webapp.test_client()
+
+  resp = client.get('/v/uss1/virtual_uss_test')
+  assert resp.status_code == 200
+  result = resp.get_json()
+  assert result['uss'] == 'uss1'
+  assert result['base_url'].endswith('/v/uss1')
+  assert result['script_root'] == '/v/uss1'
+  assert result['path'] == '/virtual_uss_test'
+
+  result = client.get('/virtual_uss_test').get_json()
+  assert result['uss'] == ''
+  assert result['base_url'] == virtual_uss.main_uss.base_url
+  assert result['script_root'] == ''
+  assert result['path'] == '/virtual_uss_test'
+
+  assert client.get('/v/uss2/status').data.startswith(b'Virtual USS uss2 ok')
+  # Outside of requests, the main mock USS is current
+  assert virtual_uss.current() is virtual_uss.main_uss
+
+
+def test_partitioned_value():
+  client = webapp.test_client()
+  prefixes = {'': '', 'uss1': '/v/uss1', 'uss2': '/v/uss2'}
+
+  def count_request(uss: str) -> int:
+    result = client.get(prefixes[uss] + '/virtual_uss_test').get_json()
+    assert result['uss'] == uss
+    return result['requests']
+
+  initial_counts = {uss: count_request(uss) for uss in prefixes}
+  count_request('uss1')
+  count_request('uss1')
+  count_request('uss2')
+  # Each USS only sees the requests it handled itself
+  assert count_request('uss1') - initial_counts['uss1'] == 3
+  assert count_request('uss2') - initial_counts['uss2'] == 2
+  assert count_request('') - initial_counts[''] == 1
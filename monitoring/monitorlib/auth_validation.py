@@ -1,7 +1,13 @@
+import collections
 import json
-from typing import List, NamedTuple
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 from functools import wraps
 
+import cryptography.hazmat.backends
+import cryptography.hazmat.primitives.serialization
 import flask
 import jwcrypto.jwk
 import jwt
@@ -30,14 +36,277 @@ class ConfigurationError(Exception):
     self.message = message
 
 
-def requires_scope_decorator(public_key: str, audience: str):
+def load_public_key(public_key: Union[str, bytes, object]):
+  """Returns the key object for a PEM-format public key, so it is only parsed once.
+
+  Key objects are returned as-is, and an empty key as None.
+  """
+  if not public_key:
+    return None
+  if isinstance(public_key, str):
+    public_key = public_key.encode('utf-8')
+  if isinstance(public_key, bytes):
+    try:
+      return cryptography.hazmat.primitives.serialization.load_pem_public_key(
+        public_key, backend=cryptography.hazmat.backends.default_backend())
+    except ValueError as e:
+      raise ConfigurationError('Public key for access tokens could not be loaded: {}'.format(e))
+  return public_key
+
+
+class VerifiedTokenCache(object):
+  """Bounded LRU cache of the claims of access tokens whose signature was verified.
+
+  A cached token is only reused while it is within its validity period
+  (between its nbf and exp claims), so that expiration is still detected
+  without verifying its signature again.
+  """
+
+  def __init__(self, max_size: int = 1024):
+    self.max_size = max_size
+    self._claims: 'collections.OrderedDict[str, Dict]' = collections.OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.verifications = 0
+    self.verification_time_s = 0.0
+
+  def get(self, token: str) -> Optional[Dict]:
+    """Returns the claims of the token if it was verified and is still valid"""
+    now = time.time()
+    with self._lock:
+      claims = self._claims.get(token, None)
+      if claims is not None:
+        if ('nbf' in claims and now < claims['nbf']) or ('exp' in claims and now > claims['exp']):
+          del self._claims[token]
+          claims = None
+        else:
+          self._claims.move_to_end(token)
+      if claims is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+      return claims
+
+  def put(self, token: str, claims: Dict, verification_time_s: float) -> None:
+    with self._lock:
+      self.verifications += 1
+      self.verification_time_s += verification_time_s
+      if self.max_size <= 0:
+        return
+      self._claims[token] = claims
+      self._claims.move_to_end(token)
+      while len(self._claims) > self.max_size:
+        self._claims.popitem(last=False)
+
+  def stats(self) -> Dict[str, Union[int, float]]:
+    """Returns the counters of this cache"""
+    with self._lock:
+      return {
+        'size': len(self._claims),
+        'hits': self.hits,
+        'misses': self.misses,
+        'verifications': self.verifications,
+        'verification_time_s': self.verification_time_s,
+      }
+
+  def clear(self) -> None:
+    """Forgets all verified tokens, so they are verified again when next presented"""
+    with self._lock:
+      self._claims.clear()
+
+
+# Maximum time, in seconds, to wait for a key source to respond
+KEY_FETCH_TIMEOUT_S = 10
+
+
+class KeyManager(object):
+  """Public keys used to verify access tokens, identified by their kid.
+
+  The source may be a URL to a JWKS or to a PEM file, the path of a JWKS or
+  PEM file, or PEM-format text.  Keys are kept in memory and reloaded from
+  their source in a background thread every refresh_interval_s, and as soon
+  as a token signed with an unknown kid is presented (at most once every
+  min_refresh_interval_s), so keys can be rotated without restarting the
+  service.  Nothing is loaded when the manager is created, so startup never
+  waits on the network; the first request which needs a key loads the keys
+  if the background thread has not done so already.  The background thread
+  is started separately in each process which uses the manager, so it
+  survives forking of preloaded worker processes.
+  """
+
+  def __init__(self, source: str, refresh_interval_s: float = 3600, min_refresh_interval_s: float = 30):
+    self.source = source.strip() if source else ''
+    self.refresh_interval_s = refresh_interval_s
+    self.min_refresh_interval_s = min_refresh_interval_s
+
+    # Incremented every time the set of keys changes
+    self.version = 0
+
+    self._keys: Optional[Dict[Optional[str], object]] = None
+    self._default_key = None
+    self._pems: Optional[List[Tuple[Optional[str], bytes]]] = None
+    self._last_attempt: Optional[float] = None
+    self._last_error: Optional[str] = None
+    self._load_lock = threading.Lock()
+    self._refresher_lock = threading.Lock()
+    self._refresher_pid: Optional[int] = None
+
+  def __repr__(self):
+    return 'KeyManager({})'.format(self._describe_source())
+
+  def _describe_source(self) -> str:
+    return self.source if self._is_url() or self._is_file() else '<PEM text>'
+
+  def _is_url(self) -> bool:
+    return self.source.startswith('http://') or self.source.startswith('https://')
+
+  def _is_file(self) -> bool:
+    return self.source.startswith('/') or self.source.endswith(('.pem', '.json'))
+
+  def _fetch(self) -> List[Tuple[Optional[str], bytes]]:
+    """Returns the kid and PEM-format content of each signing key at the source"""
+    if self._is_url():
+      resp = requests.get(self.source, timeout=KEY_FETCH_TIMEOUT_S)
+      resp.raise_for_status()
+      content = resp.content.decode('utf-8')
+    elif self._is_file():
+      with open(self.source, 'r') as f:
+        content = f.read()
+    else:
+      content = self.source
+    content = content.strip()
+
+    if content.startswith('{'):
+      jwks = json.loads(content)
+      jwks = jwks['keys'] if 'keys' in jwks else [jwks]
+      return [(jwk.get('kid', None), jwcrypto.jwk.JWK.from_json(json.dumps(jwk)).export_to_pem())
+              for jwk in jwks if jwk.get('use', 'sig') == 'sig']
+    return [(None, _normalize_pem(content).encode('utf-8'))]
+
+  def _load(self) -> bool:
+    self._last_attempt = time.monotonic()
+    try:
+      pems = self._fetch()
+      if not pems:
+        raise ValueError('no signing keys found')
+      keys = {kid: load_public_key(pem) for kid, pem in pems}
+    except Exception as e:
+      # Keep the keys which were previously loaded, if any
+      self._last_error = '{}: {}'.format(type(e).__name__, e.message if isinstance(e, ConfigurationError) else str(e))
+      print('[auth] Could not load access token keys from {}: {}'.format(self._describe_source(), self._last_error), flush=True)
+      return False
+    self._last_error = None
+    if pems != self._pems:
+      self._keys = keys
+      self._default_key = keys[pems[0][0]]
+      self._pems = pems
+      self.version += 1
+      print('[auth] Loaded access token keys from {}: {}'.format(
+        self._describe_source(), ', '.join(str(kid) for kid, _ in pems)), flush=True)
+    return True
+
+  def refresh(self) -> bool:
+    """Reloads the keys from the source, and returns whether it succeeded.
+
+    If the keys cannot be loaded, the previously-loaded keys are still used.
+    """
+    with self._load_lock:
+      return self._load()
+
+  def _refresh_if_allowed(self) -> None:
+    with self._load_lock:
+      # Other threads may have been waiting for the same refresh
+      if self._last_attempt is not None and time.monotonic() - self._last_attempt < self.min_refresh_interval_s:
+        return
+      self._load()
+
+  def start(self) -> None:
+    """Starts refreshing the keys in the background in this process, if their source may change"""
+    if not (self._is_url() or self._is_file()) or self.refresh_interval_s <= 0:
+      return
+    pid = os.getpid()
+    if self._refresher_pid == pid:
+      return
+    with self._refresher_lock:
+      if self._refresher_pid == pid:
+        return
+      self._refresher_pid = pid
+      threading.Thread(target=self._refresh_periodically, name='auth-key-refresh', daemon=True).start()
+
+  def _refresh_periodically(self) -> None:
+    while True:
+      self._refresh_if_allowed()
+      # Retry sooner when the source is unavailable
+      time.sleep(max(1, self.min_refresh_interval_s if self._last_error else self.refresh_interval_s))
+
+  def get_key(self, kid: Optional[str] = None):
+    """Returns the key for tokens signed with the specified kid, or the default key if kid is not specified"""
+    if not self.source:
+      raise ConfigurationError('Public key for access tokens is not configured on server')
+    self.start()
+    if self._keys is None:
+      self._refresh_if_allowed()
+      if self._keys is None:
+        raise ConfigurationError('Public key for access tokens could not be loaded on server: {}'.format(self._last_error))
+
+    keys = self._keys
+    if kid is None or list(keys) == [None]:
+      # A single key without kid (e.g. PEM) verifies all tokens
+      return self._default_key
+    if kid not in keys:
+      # The key may just have been rotated in
+      self._refresh_if_allowed()
+      keys = self._keys
+      if kid not in keys:
+        raise InvalidAccessTokenError('Access token was signed with unknown key "{}"'.format(kid))
+    return keys[kid]
+
+  def stats(self) -> Dict:
+    """Returns the state of the keys of this manager"""
+    return {
+      'source': self._describe_source(),
+      'kids': [kid for kid, _ in self._pems] if self._pems else [],
+      'version': self.version,
+      'last_error': self._last_error,
+      'last_attempt_age_s': time.monotonic() - self._last_attempt if self._last_attempt is not None else None,
+    }
+
+
+def requires_scope_decorator(public_key: Union[str, bytes, object, KeyManager], audience: str, token_cache_size: int = 1024):
   """Function that produces a decorator to protect a Flask endpoint.
 
   If you decorate an endpoint with a decorator produced by this function, it
   will ensure that the requester has a valid access token with the required
-  scope before allowing the endpoint to be called.
+  scope before allowing the endpoint to be called.  Verified tokens are
+  cached (see VerifiedTokenCache), and the cache is available as the
+  token_cache attribute of the produced function.
+
+  public_key may be a KeyManager, in which case tokens are verified with the
+  key matching their kid and key rotations are followed.
   """
   audiences = audience.split(',') if audience else []
+  key_manager = public_key if isinstance(public_key, KeyManager) else None
+  key = None if key_manager else load_public_key(public_key)
+  token_cache = VerifiedTokenCache(token_cache_size)
+  key_version = [None]
+
+  def verify(token: str) -> Dict:
+    if key_manager is not None and key_manager.version != key_version[0]:
+      # Keys were rotated; tokens verified with a removed key must not be accepted anymore
+      key_version[0] = key_manager.version
+      token_cache.clear()
+    r = token_cache.get(token)
+    if r is None:
+      if key_manager is None:
+        k = key
+      else:
+        k = key_manager.get_key(jwt.get_unverified_header(token).get('kid', None))
+      t0 = time.monotonic()
+      r = jwt.decode(token, k, algorithms='RS256', options={'verify_aud': False})
+      token_cache.put(token, r, time.monotonic() - t0)
+    return r
+
   def decorator(permitted_scopes):
     def outer_wrapper(fn):
       @wraps(fn)
@@ -58,11 +327,11 @@ def requires_scope_decorator(public_key: str, audience: str):
             raise InvalidAccessTokenError('Missing Authorization header')
           token = token.replace('Bearer ', '')
           try:
-            if not public_key:
+            if key_manager is None and key is None:
               raise ConfigurationError('Public key for access tokens is not configured on server')
             if not audiences:
               raise ConfigurationError('Audience for access tokens is not configured on server')
-            r = jwt.decode(token, public_key, algorithms='RS256', options={'verify_aud': False})
+            r = verify(token)
             if 'aud' not in r:
               raise InvalidAccessTokenError('Access token is missing aud claim.')
             if r['aud'] not in audiences:
@@ -94,9 +363,20 @@ def requires_scope_decorator(public_key: str, audience: str):
         return fn(*args, **kwargs)
       return wrapper
     return outer_wrapper
+  decorator.token_cache = token_cache
+  decorator.key_manager = key_manager
   return decorator
 
 
+def _normalize_pem(public_key: str) -> str:
+  # ENV variables sometimes don't pass newlines, spec says white space
+  # doesn't matter, but pyjwt cares about it, so fix it
+  public_key = public_key.replace(' PUBLIC ', '_PLACEHOLDER_')
+  public_key = public_key.replace(' ', '\n')
+  public_key = public_key.replace('_PLACEHOLDER_', ' PUBLIC ')
+  return public_key
+
+
 def fix_key(public_key: str) -> str:
   """Convert a user-specified public key into a properly-formatted PEM string"""
 
@@ -113,9 +393,4 @@ def fix_key(public_key: str) -> str:
   elif public_key.startswith('/') or public_key.endswith(('.pem')):
     with open(public_key, 'r') as f:
       public_key = f.read()
-  # ENV variables sometimes don't pass newlines, spec says white space
-  # doesn't matter, but pyjwt cares about it, so fix it
-  public_key = public_key.replace(' PUBLIC ', '_PLACEHOLDER_')
-  public_key = public_key.replace(' ', '\n')
-  public_key = public_key.replace('_PLACEHOLDER_', ' PUBLIC ')
-  return public_key
+  return _normalize_pem(public_key)
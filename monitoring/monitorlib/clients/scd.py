@@ -1,4 +1,8 @@
-from typing import List, Optional
+import concurrent.futures
+import time
+from typing import Dict, List, Optional
+
+import requests
 
 from monitoring.monitorlib import scd
 from monitoring.monitorlib.infrastructure import DSSTestSession
@@ -57,13 +61,89 @@ def notify_operational_intent_details_changed(utm_client: DSSTestSession, uss_ba
 # === Custom actions ===
 
 
-def notify_subscribers(utm_client: DSSTestSession, id: str, operational_intent: Optional[scd.OperationalIntent], subscribers: List[scd.SubscriberToNotify]):
+# Maximum number of USSs notified at the same time
+NOTIFICATION_WORKERS = 16
+
+# Number of attempts to notify a USS before giving up
+NOTIFICATION_ATTEMPTS = 3
+
+# Delay, in seconds, before the first retry of a notification; doubled for each following retry
+NOTIFICATION_RETRY_DELAY = 0.5
+
+# Timeouts of `connect` and `read` in seconds for each notification attempt
+NOTIFICATION_TIMEOUTS = (5, 10)
+
+
+class SubscriberNotificationResult(ImplicitDict):
+    """Outcome of notifying one USS of a change to an operational intent"""
+
+    uss_base_url: str
+
+    subscriptions: List[scd.SubscriptionState]
+    """Subscriptions of the USS covered by the notification"""
+
+    success: bool
+
+    status_code: Optional[int]
+    """HTTP status code of the last attempt, if a response was received"""
+
+    error: Optional[str]
+    """Reason of the failure of the last attempt, if it failed"""
+
+    attempts: int
+
+    latency_s: float
+    """Time, in seconds, from the first attempt to the completion of the last attempt"""
+
+
+def _notify_uss(utm_client: DSSTestSession, uss_base_url: str, update: scd.PutOperationalIntentDetailsParameters) -> SubscriberNotificationResult:
+    t0 = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        status_code = None
+        try:
+            resp = utm_client.post('{}/uss/v1/operational_intents'.format(uss_base_url), json=update,
+                                   scope=scd.SCOPE_SC, timeout=NOTIFICATION_TIMEOUTS)
+            status_code = resp.status_code
+            if status_code == 204 or status_code == 200:
+                error = None
+            else:
+                error = 'notifyOperationalIntentDetailsChanged failed {}:\n{}'.format(status_code, resp.content.decode('utf-8'))
+        except requests.RequestException as e:
+            error = '{}: {}'.format(type(e).__name__, str(e))
+        # Only server-side and connection failures may succeed when retried
+        retriable = status_code is None or status_code == 429 or status_code >= 500
+        if error is None or not retriable or attempt >= NOTIFICATION_ATTEMPTS:
+            break
+        time.sleep(NOTIFICATION_RETRY_DELAY * 2 ** (attempt - 1))
+    return SubscriberNotificationResult(
+        uss_base_url=uss_base_url, subscriptions=update.subscriptions, success=error is None,
+        status_code=status_code, error=error, attempts=attempt, latency_s=time.monotonic() - t0)
+
+
+def notify_subscribers(utm_client: DSSTestSession, id: str, operational_intent: Optional[scd.OperationalIntent], subscribers: List[scd.SubscriberToNotify]) -> List[SubscriberNotificationResult]:
+    """Notifies all subscribers of a change to an operational intent.
+
+    USSs are notified concurrently, with a single notification covering all
+    the subscriptions of each USS, and failed notifications are retried.  A
+    failure to notify one USS does not prevent the notification of the
+    others; instead, the outcome for each USS is returned.
+    """
+    subscriptions_by_uss: Dict[str, List[scd.SubscriptionState]] = {}
     for subscriber in subscribers:
+        subscriptions_by_uss.setdefault(subscriber.uss_base_url, []).extend(subscriber.subscriptions)
+    if not subscriptions_by_uss:
+        return []
+
+    updates = []
+    for uss_base_url, subscriptions in subscriptions_by_uss.items():
         kwargs = {
             'operational_intent_id': id,
-            'subscriptions': subscriber.subscriptions,
+            'subscriptions': subscriptions,
         }
         if operational_intent is not None:
             kwargs['operational_intent'] = operational_intent
-        update = scd.PutOperationalIntentDetailsParameters(**kwargs)
-        notify_operational_intent_details_changed(utm_client, subscriber.uss_base_url, update)
+        updates.append((uss_base_url, scd.PutOperationalIntentDetailsParameters(**kwargs)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(updates), NOTIFICATION_WORKERS)) as executor:
+        return list(executor.map(lambda u: _notify_uss(utm_client, *u), updates))
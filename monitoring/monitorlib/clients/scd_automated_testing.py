@@ -7,7 +7,8 @@ from monitoring.monitorlib import fetch
 from monitoring.monitorlib.clients.scd import OperationError
 from monitoring.monitorlib.infrastructure import DSSTestSession
 from monitoring.monitorlib.scd_automated_testing.scd_injection_api import InjectFlightRequest, InjectFlightResponse, \
-    SCOPE_SCD_QUALIFIER_INJECT, InjectFlightResult, DeleteFlightResponse, DeleteFlightResult
+    SCOPE_SCD_QUALIFIER_INJECT, InjectFlightResult, DeleteFlightResponse, DeleteFlightResult, ClearAreaRequest, \
+    ClearAreaResponse
 from monitoring.monitorlib.typing import ImplicitDict
 
 
@@ -42,3 +43,13 @@ def delete_flight(utm_client: DSSTestSession, uss_base_url: str, flight_id: str)
     return ImplicitDict.parse(resp.json(), DeleteFlightResponse), fetch.describe_query(resp, initiated_at)
 
 
+def clear_area(utm_client: DSSTestSession, uss_base_url: str, request: ClearAreaRequest) -> Tuple[ClearAreaResponse, fetch.Query]:
+    url = '{}/v1/clear_area_requests'.format(uss_base_url)
+    print("[SCD] POST {}".format(url))
+
+    initiated_at = datetime.utcnow()
+    resp = utm_client.post(url, json=request, scope=SCOPE_SCD_QUALIFIER_INJECT)
+    if resp.status_code != 200:
+        raise QueryError('Unexpected response code for clearArea {}. Response: {}'.format(resp.status_code, resp.content.decode('utf-8')), fetch.describe_query(resp, initiated_at))
+
+    return ImplicitDict.parse(resp.json(), ClearAreaResponse), fetch.describe_query(resp, initiated_at)
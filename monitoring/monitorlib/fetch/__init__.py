@@ -129,7 +129,8 @@ def describe_query(resp: requests.Response,
 
 def query_and_describe(client: infrastructure.DSSTestSession, method: str, url: str, **kwargs) -> Query:
   req_kwargs = kwargs.copy()
-  req_kwargs['timeout'] = TIMEOUTS
+  if 'timeout' not in req_kwargs:
+    req_kwargs['timeout'] = TIMEOUTS
   t0 = datetime.datetime.utcnow()
   try:
     return describe_query(client.request(method, url, **req_kwargs), t0)
@@ -1,5 +1,9 @@
+import collections
+import concurrent.futures
 import datetime
-from typing import Dict, List, Optional
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import urllib.parse
 
 import requests
 import s2sphere
@@ -100,7 +104,8 @@ yaml.add_representer(FetchedUSSFlights, Representer.represent_dict)
 def flights(utm_client: infrastructure.DSSTestSession,
             flights_url: str,
             area: s2sphere.LatLngRect,
-            include_recent_positions: bool) -> FetchedUSSFlights:
+            include_recent_positions: bool,
+            timeout: Tuple[float, float]=fetch.TIMEOUTS) -> FetchedUSSFlights:
   result = fetch.query_and_describe(
     utm_client, 'GET', flights_url, params={
       'view': '{},{},{},{}'.format(
@@ -110,7 +115,7 @@ def flights(utm_client: infrastructure.DSSTestSession,
         area.lng_hi().degrees,
       ),
       'include_recent_positions': 'true' if include_recent_positions else 'false',
-    }, scope=rid.SCOPE_READ)
+    }, scope=rid.SCOPE_READ, timeout=timeout)
   return FetchedUSSFlights(result)
 
 
@@ -135,13 +140,18 @@ class FetchedUSSFlightDetails(fetch.Query):
 yaml.add_representer(FetchedUSSFlightDetails, Representer.represent_dict)
 
 
+def _flight_details_url(flights_url: str, id: str, enhanced_details: bool) -> str:
+  suffix = '?enhanced=true' if enhanced_details else ''
+  return flights_url + '/{}/details{}'.format(id, suffix)
+
+
 def flight_details(utm_client: infrastructure.DSSTestSession,
                    flights_url: str, id: str,
-                   enhanced_details: bool=False) -> FetchedUSSFlightDetails:
-  suffix = '?enhanced=true' if enhanced_details else ''
+                   enhanced_details: bool=False,
+                   timeout: Tuple[float, float]=fetch.TIMEOUTS) -> FetchedUSSFlightDetails:
   scope = ' '.join([rid.SCOPE_READ, rid.UPP2_SCOPE_ENHANCED_DETAILS]) if enhanced_details else rid.SCOPE_READ
   result = FetchedUSSFlightDetails(fetch.query_and_describe(
-    utm_client, 'GET', flights_url + '/{}/details{}'.format(id, suffix), scope=scope))
+    utm_client, 'GET', _flight_details_url(flights_url, id, enhanced_details), scope=scope, timeout=timeout))
   result['requested_id'] = id
   return result
 
@@ -168,32 +178,160 @@ class FetchedFlights(fetch.Query):
   @property
   def uss_flight_details_queries(self) -> Dict[str, FetchedUSSFlightDetails]:
     return {k: fetch.coerce(v, FetchedUSSFlightDetails) for k, v in self.get('uss_flight_details_queries', {}).items()}
+
+  @property
+  def timing(self) -> Dict:
+    """Statistics on the time taken to fetch the flights (see all_flights)"""
+    return self.get('timing', {})
 yaml.add_representer(FetchedFlights, Representer.represent_dict)
 
 
+# Maximum number of requests sent at the same time by all_flights
+ALL_FLIGHTS_WORKERS = 32
+
+# Maximum number of requests sent at the same time by all_flights to each host
+ALL_FLIGHTS_MAX_REQUESTS_PER_HOST = 4
+
+# Time, in seconds, by which all_flights must have completed by default
+ALL_FLIGHTS_DEADLINE_S = 30
+
+
+def _deadline_exceeded_query(url: str) -> fetch.Query:
+  t = datetime.datetime.utcnow()
+  return fetch.Query({
+    'request': fetch.RequestDescription({
+      'method': 'GET',
+      'url': url,
+      'initiated_at': t.isoformat(),
+      'headers': {},
+      'body': None,
+    }),
+    'response': fetch.ResponseDescription({
+      'code': None,
+      'failure': 'Not completed before the all_flights deadline',
+      'elapsed_s': 0,
+      'reported': t.isoformat(),
+    }),
+  })
+
+
+class _Request(object):
+  """Request to be sent by all_flights to the URL, stored under key in the results of its kind"""
+
+  def __init__(self, kind: str, key: str, url: str, query: Callable[[Tuple[float, float]], fetch.Query]):
+    self.kind = kind
+    self.key = key
+    self.url = url
+    self.host = urllib.parse.urlparse(url).netloc
+    self.query = query
+
+
 def all_flights(utm_client: infrastructure.DSSTestSession,
                 area: s2sphere.LatLngRect,
                 include_recent_positions: bool,
                 get_details: bool,
-                enhanced_details: bool=False) -> Dict:
+                enhanced_details: bool=False,
+                deadline_s: Optional[float]=ALL_FLIGHTS_DEADLINE_S) -> FetchedFlights:
+  """Retrieves the flights (and optionally their details) from all USSs with ISAs in the area.
+
+  Flights URLs are queried concurrently, and details are requested as soon as
+  the flights of their USS are known, with at most
+  ALL_FLIGHTS_MAX_REQUESTS_PER_HOST requests in flight to each host.  Requests
+  which have not completed deadline_s seconds after the start are reported as
+  failures.  Timing statistics are included in the `timing` field.
+  """
+  t0 = time.monotonic()
+  deadline = t0 + deadline_s if deadline_s else None
   isa_query = isas(utm_client, area, datetime.datetime.utcnow(), datetime.datetime.utcnow())
+  isa_query_s = time.monotonic() - t0
 
   uss_flight_queries: Dict[str, FetchedUSSFlights] = {}
   uss_flight_details_queries: Dict[str, FetchedUSSFlightDetails] = {}
-  for flights_url in isa_query.flight_urls:
-    flights_for_url = flights(utm_client, flights_url, area, include_recent_positions)
-    uss_flight_queries[flights_url] = flights_for_url
-
-    if get_details and flights_for_url.success:
-      for flight in flights_for_url.flights:
-        if flight.valid:
-          details = flight_details(utm_client, flights_url, flight.id, enhanced_details)
-          uss_flight_details_queries[flight.id] = details
+  queued: Dict[str, Deque[_Request]] = collections.defaultdict(collections.deque)
+  in_flight_by_host: Dict[str, int] = collections.defaultdict(int)
+  in_flight: Dict[concurrent.futures.Future, _Request] = {}
+  max_in_flight = 0
+  request_count = 0
+  executor = concurrent.futures.ThreadPoolExecutor(max_workers=ALL_FLIGHTS_WORKERS, thread_name_prefix='all_flights')
+
+  def timeout() -> Tuple[float, float]:
+    if deadline is None:
+      return fetch.TIMEOUTS
+    remaining = max(deadline - time.monotonic(), 0.001)
+    return min(fetch.TIMEOUTS[0], remaining), min(fetch.TIMEOUTS[1], remaining)
+
+  def start_requests(host: str) -> None:
+    nonlocal max_in_flight, request_count
+    while queued[host] and in_flight_by_host[host] < ALL_FLIGHTS_MAX_REQUESTS_PER_HOST:
+      request = queued[host].popleft()
+      in_flight[executor.submit(request.query, timeout())] = request
+      in_flight_by_host[host] += 1
+      request_count += 1
+    max_in_flight = max(max_in_flight, len(in_flight))
+
+  def enqueue(request: _Request) -> None:
+    queued[request.host].append(request)
+    start_requests(request.host)
+
+  def query_flights(flights_url: str) -> Callable[[Tuple[float, float]], fetch.Query]:
+    return lambda t: flights(utm_client, flights_url, area, include_recent_positions, t)
+
+  def query_details(flights_url: str, flight_id: str) -> Callable[[Tuple[float, float]], fetch.Query]:
+    return lambda t: flight_details(utm_client, flights_url, flight_id, enhanced_details, t)
+
+  try:
+    for flights_url in isa_query.flight_urls:
+      enqueue(_Request('flights', flights_url, flights_url, query_flights(flights_url)))
+
+    while in_flight:
+      wait_s = None if deadline is None else max(deadline - time.monotonic(), 0)
+      done, _ = concurrent.futures.wait(in_flight, timeout=wait_s, return_when=concurrent.futures.FIRST_COMPLETED)
+      if not done:
+        break
+      for future in done:
+        request = in_flight.pop(future)
+        in_flight_by_host[request.host] -= 1
+        result = future.result()
+        if request.kind == 'flights':
+          uss_flight_queries[request.key] = result
+          if get_details and result.success:
+            for flight in result.flights:
+              if flight.valid:
+                enqueue(_Request(
+                  'details', flight.id, _flight_details_url(request.key, flight.id, enhanced_details),
+                  query_details(request.key, flight.id)))
+        else:
+          uss_flight_details_queries[request.key] = result
+        start_requests(request.host)
+  finally:
+    # Requests still in flight at this point could not complete before the deadline
+    executor.shutdown(wait=False)
+
+  missed = list(in_flight.values()) + [request for host_queue in queued.values() for request in host_queue]
+  for request in missed:
+    if request.kind == 'flights':
+      uss_flight_queries[request.key] = FetchedUSSFlights(_deadline_exceeded_query(request.url))
+    else:
+      details = FetchedUSSFlightDetails(_deadline_exceeded_query(request.url))
+      details['requested_id'] = request.key
+      uss_flight_details_queries[request.key] = details
+
+  queries = list(uss_flight_queries.values()) + list(uss_flight_details_queries.values())
+  timing = {
+    'total_s': time.monotonic() - t0,
+    'dss_isa_query_s': isa_query_s,
+    'requests': request_count,
+    'max_concurrent_requests': max_in_flight,
+    'requests_elapsed_s': sum(q.response.get('elapsed_s', 0) for q in queries),
+    'max_request_elapsed_s': max((q.response.get('elapsed_s', 0) for q in queries), default=0),
+    'missed_deadline': len(missed),
+  }
 
   return FetchedFlights({
     'dss_isa_query': isa_query,
-    'uss_flight_queries': uss_flight_queries,
+    'uss_flight_queries': {url: uss_flight_queries[url] for url in isa_query.flight_urls if url in uss_flight_queries},
     'uss_flight_details_queries': uss_flight_details_queries,
+    'timing': timing,
   })
 
 
@@ -1,5 +1,9 @@
+import concurrent.futures
 import datetime
-from typing import Dict, List, Optional
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
 import s2sphere
 import yaml
@@ -123,10 +127,98 @@ class MutatedISAResponse(fetch.Query):
 yaml.add_representer(MutatedISAResponse, Representer.represent_dict)
 
 
+class SubscriberNotification(fetch.Query):
+  """Notification of a change to an ISA sent to one subscriber"""
+  @property
+  def latency_s(self) -> float:
+    """Time, in seconds, between sending the notification and receiving its response (or failure)"""
+    return self['latency_s']
+yaml.add_representer(SubscriberNotification, Representer.represent_dict)
+
+
+# Maximum number of notifications sent at the same time by each process
+NOTIFICATION_WORKERS = 16
+
+# Timeouts of `connect` and `read` in seconds for each notification
+NOTIFICATION_TIMEOUTS = (5, 10)
+
+_notification_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_notification_executor_pid: Optional[int] = None
+_notification_executor_lock = threading.Lock()
+
+
+def _get_notification_executor() -> concurrent.futures.ThreadPoolExecutor:
+  """Returns the thread pool sending notifications for this process, creating it after a fork if needed"""
+  global _notification_executor, _notification_executor_pid
+  with _notification_executor_lock:
+    if _notification_executor is None or _notification_executor_pid != os.getpid():
+      _notification_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=NOTIFICATION_WORKERS, thread_name_prefix='rid-notification')
+      _notification_executor_pid = os.getpid()
+    return _notification_executor
+
+
+def _notify(utm_client: infrastructure.DSSTestSession, url: str, body: Dict) -> SubscriberNotification:
+  t0 = time.monotonic()
+  query = fetch.query_and_describe(
+    utm_client, 'POST', url, json=body, scope=rid.SCOPE_WRITE, timeout=NOTIFICATION_TIMEOUTS)
+  result = SubscriberNotification(query)
+  result['latency_s'] = time.monotonic() - t0
+  return result
+
+
+class PendingNotifications(object):
+  """Handle to notifications of subscribers which are being sent concurrently"""
+
+  def __init__(self, futures: Dict[str, concurrent.futures.Future]):
+    self._futures = futures
+
+  def done(self) -> bool:
+    """Returns whether all notifications have completed"""
+    return all(f.done() for f in self._futures.values())
+
+  def result(self, timeout: Optional[float] = None) -> Dict[str, SubscriberNotification]:
+    """Waits for all notifications to complete and returns them by subscriber URL.
+
+    :param timeout: Maximum time, in seconds, to wait; concurrent.futures.TimeoutError is raised when exceeded
+    """
+    concurrent.futures.wait(self._futures.values(), timeout=timeout)
+    return {url: f.result(timeout=0) for url, f in self._futures.items()}
+
+  def add_done_callback(self, fn: Callable[[Dict[str, SubscriberNotification]], None]) -> None:
+    """Calls fn with the notifications by subscriber URL once they have all completed"""
+    remaining = [len(self._futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+      with lock:
+        remaining[0] -= 1
+        if remaining[0] > 0:
+          return
+      fn(self.result())
+    if not self._futures:
+      fn({})
+    for f in self._futures.values():
+      f.add_done_callback(on_done)
+
+
+def _notify_subscribers(utm_client: infrastructure.DSSTestSession,
+                        subscribers: List[rid.SubscriberToNotify],
+                        entity_id: str,
+                        make_body: Callable[[rid.SubscriberToNotify], Dict]) -> PendingNotifications:
+  executor = _get_notification_executor()
+  return PendingNotifications({
+    subscriber.url: executor.submit(
+      _notify, utm_client, '{}/{}'.format(subscriber.url, entity_id), make_body(subscriber))
+    for subscriber in subscribers})
+
+
 class MutatedISA(ImplicitDict):
   """Result of an attempt to mutate an ISA (including DSS & notifications)"""
   dss_response: MutatedISAResponse
-  notifications: Dict[str, fetch.Query]
+
+  notifications: Dict[str, SubscriberNotification]
+  """Notifications of subscribers by subscriber URL"""
 
 
 def put_isa(utm_client: infrastructure.DSSTestSession,
@@ -136,6 +228,23 @@ def put_isa(utm_client: infrastructure.DSSTestSession,
             flights_url: str,
             entity_id: str,
             isa_version: Optional[str]=None) -> MutatedISA:
+  """Creates or updates an ISA in the DSS, then notifies its subscribers concurrently."""
+  dss_response, pending = put_isa_notifying_in_background(
+    utm_client, area, start_time, end_time, flights_url, entity_id, isa_version)
+  return MutatedISA(dss_response=dss_response, notifications=pending.result())
+
+
+def put_isa_notifying_in_background(utm_client: infrastructure.DSSTestSession,
+                                    area: s2sphere.LatLngRect,
+                                    start_time: datetime.datetime,
+                                    end_time: datetime.datetime,
+                                    flights_url: str,
+                                    entity_id: str,
+                                    isa_version: Optional[str]=None) -> Tuple[MutatedISAResponse, PendingNotifications]:
+  """Creates or updates an ISA in the DSS, returning as soon as the DSS responds.
+
+  :return: Response from the DSS, and handle to the notifications of subscribers which are still being sent
+  """
   extents = {
     'spatial_volume': {
       'footprint': {
@@ -160,46 +269,48 @@ def put_isa(utm_client: infrastructure.DSSTestSession,
   dss_response['mutation'] = 'create' if isa_version is None else 'update'
 
   # Notify subscribers
-  notifications: Dict[str, fetch.Query] = {}
   try:
     subscribers = dss_response.subscribers
     isa = dss_response.isa
   except ValueError:
     subscribers = []
     isa = None
-  for subscriber in subscribers:
-    body = {
-      'service_area': isa,
-      'subscriptions': subscriber.subscriptions,
-      'extents': extents
-    }
-    url = '{}/{}'.format(subscriber.url, entity_id)
-    notifications[subscriber.url] = fetch.query_and_describe(
-      utm_client, 'POST', url, json=body, scope=rid.SCOPE_WRITE)
+  pending = _notify_subscribers(utm_client, subscribers, entity_id, lambda subscriber: {
+    'service_area': isa,
+    'subscriptions': subscriber.subscriptions,
+    'extents': extents
+  })
 
-  return MutatedISA(dss_response=dss_response, notifications=notifications)
+  return dss_response, pending
 
 
 def delete_isa(utm_client: infrastructure.DSSTestSession,
                entity_id: str,
                isa_version: str) -> MutatedISA:
+  """Deletes an ISA from the DSS, then notifies its subscribers concurrently."""
+  dss_response, pending = delete_isa_notifying_in_background(utm_client, entity_id, isa_version)
+  return MutatedISA(dss_response=dss_response, notifications=pending.result())
+
+
+def delete_isa_notifying_in_background(utm_client: infrastructure.DSSTestSession,
+                                       entity_id: str,
+                                       isa_version: str) -> Tuple[MutatedISAResponse, PendingNotifications]:
+  """Deletes an ISA from the DSS, returning as soon as the DSS responds.
+
+  :return: Response from the DSS, and handle to the notifications of subscribers which are still being sent
+  """
   url = '/v1/dss/identification_service_areas/{}/{}'.format(entity_id, isa_version)
   dss_response = MutatedISAResponse(fetch.query_and_describe(
     utm_client, 'DELETE', url, scope=rid.SCOPE_WRITE))
   dss_response['mutation'] = 'delete'
 
   # Notify subscribers
-  notifications: Dict[str, fetch.Query] = {}
   try:
     subscribers = dss_response.subscribers
   except ValueError:
     subscribers = []
-  for subscriber in subscribers:
-    body = {
-      'subscriptions': subscriber.subscriptions
-    }
-    url = '{}/{}'.format(subscriber.url, entity_id)
-    notifications[subscriber.url] = fetch.query_and_describe(
-      utm_client, 'POST', url, json=body, scope=rid.SCOPE_WRITE)
-
-  return MutatedISA(dss_response=dss_response, notifications=notifications)
+  pending = _notify_subscribers(utm_client, subscribers, entity_id, lambda subscriber: {
+    'subscriptions': subscriber.subscriptions
+  })
+
+  return dss_response, pending
@@ -1,5 +1,6 @@
 import arrow
 import datetime
+import functools
 from typing import get_args, get_origin, get_type_hints, Dict, Literal, Optional, Type, Union
 
 import pytimeparse
@@ -76,7 +77,7 @@ class ImplicitDict(dict):
     if not isinstance(source, dict):
       raise ValueError('Expected to find dictionary data to populate {} object but instead found {} type'.format(parse_type.__name__, type(source).__name__))
     kwargs = {}
-    hints = get_type_hints(parse_type)
+    hints = _get_type_hints(parse_type)
     for key, value in source.items():
       if key in hints:
         # This entry has an explicit type
@@ -166,6 +167,11 @@ class ImplicitDict(dict):
       super(ImplicitDict, self).__setattr__(key, value)
 
 
+@functools.lru_cache(maxsize=None)
+def _get_type_hints(parse_type: Type) -> Dict[str, Type]:
+  return get_type_hints(parse_type)
+
+
 def _parse_value(value, value_type: Type):
   generic_type = get_origin(value_type)
   if generic_type:
@@ -227,9 +233,28 @@ class StringBasedDateTime(str):
   """String that only allows values which describe a datetime."""
   def __new__(cls, value):
     if isinstance(value, str):
-      t = arrow.get(value).datetime
+      t = _parse_datetime(value)
     else:
       t = value
-    str_value = str.__new__(cls, arrow.get(t).to('UTC').format('YYYY-MM-DDTHH:mm:ss.SSSSSS') + 'Z')
+    if isinstance(t, datetime.datetime):
+      # Format directly rather than through arrow; naive datetimes are UTC
+      utc = t.astimezone(datetime.timezone.utc) if t.tzinfo else t
+      str_value = str.__new__(cls, utc.strftime('%Y-%m-%dT%H:%M:%S.%f') + 'Z')
+    else:
+      str_value = str.__new__(cls, arrow.get(t).to('UTC').format('YYYY-MM-DDTHH:mm:ss.SSSSSS') + 'Z')
     str_value.datetime = t
     return str_value
+
+  def __getnewargs__(self):
+    # Reconstruct from the datetime when unpickling rather than parsing the string again
+    return (self.datetime,)
+
+
+def _parse_datetime(value: str) -> datetime.datetime:
+  if len(value) == 27 and value[-1] == 'Z':
+    # Fast path for the format produced by StringBasedDateTime
+    try:
+      return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+      pass
+  return arrow.get(value).datetime
@@ -0,0 +1,111 @@
+import json
+import time
+
+import cryptography.hazmat.backends
+import cryptography.hazmat.primitives.asymmetric.rsa
+import cryptography.hazmat.primitives.serialization
+import flask
+import jwcrypto.jwk
+import jwt
+import pytest
+
+from monitoring.monitorlib import auth_validation
+
+
+def _make_key_pair():
+  private_key = cryptography.hazmat.primitives.asymmetric.rsa.generate_private_key(
+    public_exponent=65537, key_size=2048, backend=cryptography.hazmat.backends.default_backend())
+  public_pem = private_key.public_key().public_bytes(
+    encoding=cryptography.hazmat.primitives.serialization.Encoding.PEM,
+    format=cryptography.hazmat.primitives.serialization.PublicFormat.SubjectPublicKeyInfo)
+  return private_key, public_pem
+
+
+def _make_token(private_key, **claims) -> str:
+  now = int(time.time())
+  payload = {'aud': 'localhost', 'scope': 'read write', 'sub': 'uss1', 'nbf': now - 1, 'exp': now + 60}
+  payload.update(claims)
+  token = jwt.encode(payload, private_key, algorithm='RS256')
+  return token.decode('utf-8') if isinstance(token, bytes) else token
+
+
+def test_verified_token_cache():
+  private_key, public_pem = _make_key_pair()
+  requires_scope = auth_validation.requires_scope_decorator(public_pem, 'localhost', token_cache_size=2)
+  app = flask.Flask(__name__)
+
+  @requires_scope(['read'])
+  def endpoint():
+    return flask.request.jwt.client_id
+
+  def call(token: str) -> str:
+    with app.test_request_context(headers={'Authorization': 'Bearer ' + token}):
+      return endpoint()
+
+  tokens = [_make_token(private_key, sub='uss{}'.format(i)) for i in range(3)]
+  assert call(tokens[0]) == 'uss0'
+  assert call(tokens[0]) == 'uss0'
+  stats = requires_scope.token_cache.stats()
+  assert stats['hits'] == 1 and stats['verifications'] == 1
+
+  # Least recently used token is evicted
+  call(tokens[1])
+  call(tokens[2])
+  call(tokens[0])
+  assert requires_scope.token_cache.stats()['verifications'] == 4
+  assert requires_scope.token_cache.stats()['size'] == 2
+
+  # Cached tokens are still rejected once expired
+  expiring_token = _make_token(private_key, exp=int(time.time()) + 1)
+  call(expiring_token)
+  time.sleep(2.1)
+  with pytest.raises(auth_validation.InvalidAccessTokenError):
+    call(expiring_token)
+
+  # Tokens signed with another key are never accepted
+  other_private_key, _ = _make_key_pair()
+  with pytest.raises(auth_validation.InvalidAccessTokenError):
+    call(_make_token(other_private_key))
+
+
+def _make_jwks(*kids_and_pems) -> str:
+  return json.dumps({'keys': [
+    dict(json.loads(jwcrypto.jwk.JWK.from_pem(pem).export_public()), kid=kid, use='sig')
+    for kid, pem in kids_and_pems]})
+
+
+def test_key_manager(tmp_path):
+  key1, pem1 = _make_key_pair()
+  key2, pem2 = _make_key_pair()
+  key3, pem3 = _make_key_pair()
+  jwks_path = tmp_path / 'jwks.json'
+  jwks_path.write_text(_make_jwks(('k1', pem1), ('k2', pem2)))
+  key_manager = auth_validation.KeyManager(str(jwks_path), refresh_interval_s=0, min_refresh_interval_s=0)
+  requires_scope = auth_validation.requires_scope_decorator(key_manager, 'localhost')
+  app = flask.Flask(__name__)
+
+  @requires_scope(['read'])
+  def endpoint():
+    return flask.request.jwt.client_id
+
+  def call(private_key, kid: str) -> str:
+    token = jwt.encode({'aud': 'localhost', 'scope': 'read', 'sub': kid, 'exp': int(time.time()) + 60},
+                       private_key, algorithm='RS256', headers={'kid': kid})
+    token = token.decode('utf-8') if isinstance(token, bytes) else token
+    with app.test_request_context(headers={'Authorization': 'Bearer ' + token}):
+      return endpoint()
+
+  # Each token is verified with the key matching its kid
+  assert call(key1, 'k1') == 'k1'
+  assert call(key2, 'k2') == 'k2'
+  with pytest.raises(auth_validation.InvalidAccessTokenError):
+    call(key1, 'k2')
+  with pytest.raises(auth_validation.InvalidAccessTokenError):
+    call(key3, 'k3')
+
+  # Rotated keys are picked up when a token with an unknown kid is presented
+  jwks_path.write_text(_make_jwks(('k2', pem2), ('k3', pem3)))
+  assert call(key3, 'k3') == 'k3'
+  assert key_manager.stats()['kids'] == ['k2', 'k3']
+  with pytest.raises(auth_validation.InvalidAccessTokenError):
+    call(key1, 'k1')
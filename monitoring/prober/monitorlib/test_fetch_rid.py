@@ -0,0 +1,94 @@
+import collections
+import datetime
+import json
+import threading
+import time
+import urllib.parse
+
+import requests
+import s2sphere
+
+from monitoring.monitorlib.fetch import rid as fetch_rid
+
+
+AREA = s2sphere.LatLngRect.from_point_pair(
+  s2sphere.LatLng.from_degrees(46.9, 7.4), s2sphere.LatLng.from_degrees(47.0, 7.5))
+
+
+class _FakeUTMClient(object):
+  """Serves ISAs from the DSS and flights from USSs, recording how many requests each host handles at once"""
+
+  def __init__(self, flight_counts, details_delays_s):
+    self._flight_counts = flight_counts
+    self._details_delays_s = details_delays_s
+    self._lock = threading.Lock()
+    self._in_flight = collections.defaultdict(int)
+    self.max_in_flight = collections.defaultdict(int)
+
+  def request(self, method, url, **kwargs):
+    if url.startswith('/'):
+      content = {'service_areas': [
+        {'id': host, 'owner': host, 'flights_url': 'https://{}/flights'.format(host)}
+        for host in self._flight_counts]}
+      return self._response(method, 'https://dss.example.com' + url, content)
+
+    host = urllib.parse.urlparse(url).netloc
+    with self._lock:
+      self._in_flight[host] += 1
+      self.max_in_flight[host] = max(self.max_in_flight[host], self._in_flight[host])
+    try:
+      time.sleep(self._details_delays_s[host] if url.endswith('/details') else 0.01)
+    finally:
+      with self._lock:
+        self._in_flight[host] -= 1
+    if url.endswith('/details'):
+      return self._response(method, url, {'details': {}})
+    return self._response(method, url, {'flights': [
+      {'id': '{}-{}'.format(host, i)} for i in range(self._flight_counts[host])]})
+
+  def _response(self, method, url, content):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = json.dumps(content).encode('utf-8')
+    resp.headers['Content-Type'] = 'application/json'
+    resp.elapsed = datetime.timedelta(seconds=0)
+    resp.request = requests.Request(method, url).prepare()
+    return resp
+
+
+def test_all_flights_limits_requests_per_host():
+  client = _FakeUTMClient(
+    {'uss1.example.com': 10, 'uss2.example.com': 10},
+    {'uss1.example.com': 0.02, 'uss2.example.com': 0.02})
+
+  result = fetch_rid.all_flights(client, AREA, True, True)
+
+  assert len(result.uss_flight_queries) == 2
+  assert len(result.uss_flight_details_queries) == 20
+  assert all(q.success for q in result.uss_flight_details_queries.values())
+  assert result.timing['requests'] == 22
+  assert result.timing['missed_deadline'] == 0
+  for host in ('uss1.example.com', 'uss2.example.com'):
+    assert client.max_in_flight[host] == fetch_rid.ALL_FLIGHTS_MAX_REQUESTS_PER_HOST
+
+
+def test_all_flights_reports_missed_deadline():
+  # Flights are listed quickly by both USSs, but the details of uss2 are too slow
+  client = _FakeUTMClient(
+    {'uss1.example.com': 2, 'uss2.example.com': 6},
+    {'uss1.example.com': 0.01, 'uss2.example.com': 1})
+
+  result = fetch_rid.all_flights(client, AREA, True, True, deadline_s=0.5)
+
+  assert result.timing['missed_deadline'] == 6
+  details = result.uss_flight_details_queries
+  for i in range(2):
+    assert details['uss1.example.com-{}'.format(i)].success
+  for i in range(6):
+    flight_id = 'uss2.example.com-{}'.format(i)
+    query = details[flight_id]
+    assert not query.success
+    assert query['requested_id'] == flight_id
+    assert query.request['url'] == 'https://uss2.example.com/flights/{}/details'.format(flight_id)
+  # Details requests beyond the limit were still queued at the deadline
+  assert client.max_in_flight['uss2.example.com'] == fetch_rid.ALL_FLIGHTS_MAX_REQUESTS_PER_HOST
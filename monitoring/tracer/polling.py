@@ -1,13 +1,17 @@
+import concurrent.futures
 import datetime
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import urllib.parse
 
+import requests.adapters
 import s2sphere
 from termcolor import colored
 import yaml
 
-from monitoring.monitorlib import fetch
+from monitoring.monitorlib import fetch, rid
 import monitoring.monitorlib.fetch.rid
 import monitoring.monitorlib.fetch.scd
+from monitoring.tracer import tracerlog
 from monitoring.tracer.resources import ResourceSet
 
 
@@ -64,3 +68,128 @@ def poll_scd_constraints(resources: ResourceSet) -> Any:
   return fetch.scd.constraints(
     resources.dss_client, resources.area, resources.start_time,
     resources.end_time, constraint_cache=resources.scd_cache['constraints'])
+
+
+FLIGHTS_LOG_COLUMNS = [
+  'observed', 'event', 'uss', 'flight_id', 'timestamp', 'lat', 'lng', 'alt',
+  'track', 'speed', 'vertical_speed', 'status', 'error']
+
+# Maximum number of flights URLs polled at the same time
+FLIGHTS_POLL_WORKERS = 16
+
+
+def _flight_state(flight: rid.Flight) -> Tuple:
+  """Returns the values describing the position and state of a flight, excluding its timestamp"""
+  state = flight.get('current_state', None) or {}
+  position = state.get('position', None) or {}
+
+  def rounded(v, digits: int):
+    return round(v, digits) if isinstance(v, (int, float)) else v
+
+  return (
+    rounded(position.get('lat', None), 7),
+    rounded(position.get('lng', None), 7),
+    rounded(position.get('alt', None), 1),
+    rounded(state.get('track', None), 1),
+    rounded(state.get('speed', None), 2),
+    rounded(state.get('vertical_speed', None), 2),
+    state.get('operational_status', None),
+  )
+
+
+class RIDFlightsPoller(Poller):
+  """Polls the flights of all the USSs with ISAs in the area, and logs the changes.
+
+  The flights URLs are discovered from the ISAs in the DSS every isa_interval,
+  then all of them are polled concurrently every interval over persistent
+  connections.  Unlike other pollers, this poller records its own results:
+  only the flights which appeared, moved, changed state or disappeared since
+  the previous poll are written to a columnar log, one row per flight.
+  """
+
+  def __init__(self, resources: ResourceSet, interval: datetime.timedelta,
+               isa_interval: datetime.timedelta, log: tracerlog.ColumnarLog):
+    super(RIDFlightsPoller, self).__init__(
+      name='poll_flights', object_diff_text=lambda a, b: '', interval=interval, poll=self._poll_flights)
+    self._resources = resources
+    self._isa_interval = isa_interval
+    self._log = log
+    self._flights_urls: List[str] = []
+    self._next_isa_query: Optional[datetime.datetime] = None
+    self._states: Dict[Tuple[str, str], Tuple[str, Tuple]] = {}
+    self._failing_urls: Set[str] = set()
+    self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=FLIGHTS_POLL_WORKERS)
+    # Keep a connection open to each USS between polls
+    adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=FLIGHTS_POLL_WORKERS)
+    resources.dss_client.mount('https://', adapter)
+    resources.dss_client.mount('http://', adapter)
+    timeout_s = max(interval.total_seconds(), 1)
+    self._timeouts = (min(fetch.TIMEOUTS[0], timeout_s), min(fetch.TIMEOUTS[1], timeout_s))
+
+  def _write(self, observed: str, event: str, flights_url: str, flight_id: Optional[str] = None,
+             timestamp: Optional[str] = None, state: Tuple = (None,) * 7, error: Optional[str] = None) -> None:
+    uss = urllib.parse.urlparse(flights_url).netloc if flights_url else 'dss'
+    self._log.write((observed, event, uss, flight_id, timestamp) + state + (error,))
+
+  def close(self) -> None:
+    self._executor.shutdown(wait=False)
+    self._log.flush()
+
+  def _poll_flights(self) -> Dict[str, int]:
+    now = datetime.datetime.utcnow()
+    observed = now.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    counts = {'urls': 0, 'flights': 0, 'new': 0, 'changed': 0, 'gone': 0, 'errors': 0}
+
+    if self._next_isa_query is None or now >= self._next_isa_query:
+      self._next_isa_query = now + self._isa_interval
+      isa_query = fetch.rid.isas(self._resources.dss_client, self._resources.area, now, now)
+      if isa_query.success:
+        self._flights_urls = isa_query.flight_urls
+        for key in [key for key in self._states if key[0] not in self._flights_urls]:
+          self._write(observed, 'gone', key[0], key[1])
+          del self._states[key]
+          counts['gone'] += 1
+      else:
+        self._write(observed, 'error', '', error=isa_query.error)
+        counts['errors'] += 1
+
+    futures = {url: self._executor.submit(
+      fetch.rid.flights, self._resources.dss_client, url, self._resources.area, False, self._timeouts)
+      for url in self._flights_urls}
+    counts['urls'] = len(futures)
+    for url, future in futures.items():
+      result = future.result()
+      if not result.success:
+        # Only log the beginning of a failure, and keep the last known flights meanwhile
+        if url not in self._failing_urls:
+          self._failing_urls.add(url)
+          self._write(observed, 'error', url, error='; '.join(result.errors))
+        counts['errors'] += 1
+        continue
+      if url in self._failing_urls:
+        self._failing_urls.remove(url)
+        self._write(observed, 'recovered', url)
+
+      seen = set()
+      for flight in result.flights:
+        if not flight.valid:
+          continue
+        key = (url, flight.id)
+        seen.add(key)
+        counts['flights'] += 1
+        timestamp = (flight.get('current_state', None) or {}).get('timestamp', None)
+        state = _flight_state(flight)
+        previous = self._states.get(key, None)
+        if previous is not None and previous[1] == state:
+          continue
+        self._states[key] = (timestamp, state)
+        event = 'new' if previous is None else 'changed'
+        self._write(observed, event, url, flight.id, timestamp, state)
+        counts[event] += 1
+      for key in [key for key in self._states if key[0] == url and key not in seen]:
+        self._write(observed, 'gone', url, key[1])
+        del self._states[key]
+        counts['gone'] += 1
+
+    self._log.flush_if_due()
+    return counts
@@ -0,0 +1,66 @@
+#!env/bin/python3
+
+import argparse
+import logging
+import os
+
+import yaml
+
+from monitoring.monitorlib import infrastructure
+from monitoring.tracer import tracerlog
+
+
+logging.basicConfig()
+_logger = logging.getLogger('render_kml')
+_logger.setLevel(logging.DEBUG)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Render the entries of an existing tracer log folder to KML')
+  parser.add_argument('--log-folder', required=True, help='Path of the folder containing the tracer logs')
+  parser.add_argument('--kml-server', required=True, help='Base URL of KML-generating server')
+  parser.add_argument('--kml-folder', required=True, help='Name of path on KML server')
+  parser.add_argument('--batch-size', type=int, default=20, help='Maximum number of log entries to render in each request to the KML server')
+  parser.add_argument('--overwrite', action='store_true', default=False, help='If set, also render log entries which already have a KML')
+  args = parser.parse_args()
+
+  renderer = tracerlog.KMLRenderer(
+    infrastructure.KMLGenerationSession(args.kml_server, args.kml_folder), args.log_folder)
+
+  # Log entries are named <index>_<time>_<code>.yaml; 000000_* files are not individual entries
+  logs = sorted(f for f in os.listdir(args.log_folder) if f.endswith('.yaml') and not f.startswith('000000_'))
+  already_rendered = set() if args.overwrite else renderer.rendered_basenames()
+  batch = []
+  rendered = 0
+  skipped = 0
+  failed = 0
+  for log in logs:
+    basename = log[0:-len('.yaml')]
+    if basename in already_rendered:
+      skipped += 1
+      continue
+    code = basename.split('_', 3)[-1]
+    with open(os.path.join(args.log_folder, log), 'r') as f:
+      content = yaml.full_load(f)
+    if isinstance(content, dict) and renderer.is_unchanged(code, content):
+      skipped += 1
+      continue
+    batch.append(basename)
+    if len(batch) >= args.batch_size:
+      if renderer.render(batch):
+        rendered += len(batch)
+      else:
+        failed += len(batch)
+      batch = []
+  if batch:
+    if renderer.render(batch):
+      rendered += len(batch)
+    else:
+      failed += len(batch)
+
+  _logger.info('Rendered {} log entries; skipped {} already-rendered or unchanged entries; failed to render {} entries'.format(
+    rendered, skipped, failed))
+
+
+if __name__ == "__main__":
+  main()
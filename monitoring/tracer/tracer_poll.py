@@ -8,7 +8,7 @@ import time
 from typing import List
 
 from monitoring.monitorlib import versioning
-from monitoring.tracer import diff, polling
+from monitoring.tracer import diff, polling, tracerlog
 from monitoring.tracer.resources import ResourceSet
 
 
@@ -19,6 +19,8 @@ def parseArgs() -> argparse.Namespace:
 
     # Feature arguments
     parser.add_argument('--rid-isa-poll-interval', type=float, default=0, help='Seconds beteween each poll of the DSS for ISAs, 0 to disable DSS polling for ISAs')
+    parser.add_argument('--rid-flights-poll-interval', type=float, default=0, help='Seconds between each poll of the flights of all USSs with ISAs in the area, 0 to disable polling for flights')
+    parser.add_argument('--rid-flights-isa-interval', type=float, default=15, help='Seconds between each discovery of the flights URLs to poll from the ISAs in the DSS')
     parser.add_argument('--scd-operation-poll-interval', type=float, default=0, help='Seconds between each poll of the DSS for Operations, 0 to disable DSS polling for Operations')
     parser.add_argument('--scd-constraint-poll-interval', type=float, default=0, help='Seconds between each poll of the DSS for Constraints, 0 to disable DSS polling for Constraints')
 
@@ -50,6 +52,14 @@ def main() -> int:
         interval=datetime.timedelta(seconds=args.rid_isa_poll_interval),
         poll=lambda: polling.poll_rid_isas(resources, resources.area)))
 
+    if args.rid_flights_poll_interval > 0:
+      pollers.append(polling.RIDFlightsPoller(
+        resources,
+        interval=datetime.timedelta(seconds=args.rid_flights_poll_interval),
+        isa_interval=datetime.timedelta(seconds=args.rid_flights_isa_interval),
+        log=tracerlog.ColumnarLog(
+          os.path.join(resources.logger.log_path, '000000_rid_flights.tsv'), polling.FLIGHTS_LOG_COLUMNS)))
+
     if args.scd_operation_poll_interval > 0:
       pollers.append(polling.Poller(
         name='poll_ops',
@@ -88,7 +98,17 @@ def main() -> int:
         result = most_urgent_poller.poll()
         t1 = datetime.datetime.utcnow()
 
-        if result.has_different_content_than(most_urgent_poller.last_result):
+        if isinstance(most_urgent_poller, polling.RIDFlightsPoller):
+          # Flight changes are recorded by the poller itself
+          if result['new'] or result['changed'] or result['gone'] or result['errors']:
+            if need_line_break:
+              print()
+            print('Flights: {flights} in {urls} URLs; {new} new, {changed} changed, {gone} gone, {errors} errors'.format(**result))
+            need_line_break = False
+          else:
+            print_no_newline('.')
+            need_line_break = True
+        elif result.has_different_content_than(most_urgent_poller.last_result):
           resources.logger.log_new(most_urgent_poller.name, result)
           if need_line_break:
             print()
@@ -102,6 +122,10 @@ def main() -> int:
       except KeyboardInterrupt:
         abort = True
 
+    for poller in pollers:
+      if isinstance(poller, polling.RIDFlightsPoller):
+        poller.close()
+
     resources.logger.log_new('poll_stop', {
       'timestamp': datetime.datetime.utcnow().isoformat(),
     })
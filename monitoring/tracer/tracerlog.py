@@ -1,8 +1,14 @@
+import atexit
+import contextlib
 import copy
 import datetime
+import hashlib
+import json
 import logging
 import os
-from typing import Dict
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 import yaml
 
@@ -14,12 +20,156 @@ _logger = logging.getLogger('tracer.logging')
 _logger.setLevel(logging.DEBUG)
 
 
+# Name of the file, in the kml folder, listing the basenames of all log files rendered to KML
+RENDERED_MANIFEST = 'rendered.txt'
+
+# Fields of log entries which differ between otherwise-identical entries
+_VOLATILE_FIELDS = {'initiated_at', 'received_at', 'reported', 'elapsed_s', 'headers', 'timestamp', 't0', 't1'}
+
+
+def _without_volatile_fields(obj):
+  if isinstance(obj, dict):
+    return {k: _without_volatile_fields(v) for k, v in obj.items() if k not in _VOLATILE_FIELDS}
+  elif isinstance(obj, list):
+    return [_without_volatile_fields(v) for v in obj]
+  return obj
+
+
+def content_fingerprint(content: Dict) -> str:
+  """Returns a digest of the content of a log entry which ignores when it was obtained"""
+  text = json.dumps(_without_volatile_fields(content), sort_keys=True, default=str)
+  return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class KMLRenderer(object):
+  """Renders log files to KML with a KML server, in batches and in the background.
+
+  Log files submitted are sent to the KML server by a background thread of
+  the process, up to batch_size files per request after waiting up to
+  batch_delay_s for more files to accumulate.  A file whose content did not
+  change since the last file rendered with the same code is skipped, and
+  failed requests are retried with exponential backoff.  The KML for a batch
+  is written under the name of its last log file, and every log file of the
+  batch is recorded in the kml/rendered.txt manifest.  render may also be
+  called directly to render existing log files offline.
+  """
+
+  def __init__(self, kml_session: infrastructure.KMLGenerationSession, log_path: str,
+               batch_size: int = 20, batch_delay_s: float = 2, max_attempts: int = 3,
+               retry_delay_s: float = 1, drain_timeout_s: float = 10):
+    self.kml_session = kml_session
+    self.log_path = log_path
+    self.batch_size = batch_size
+    self.batch_delay_s = batch_delay_s
+    self.max_attempts = max_attempts
+    self.retry_delay_s = retry_delay_s
+    self.drain_timeout_s = drain_timeout_s
+    self._fingerprints: Dict[str, str] = {}
+    self._pending: List[str] = []
+    self._busy = False
+    self._draining = False
+    self._pid: Optional[int] = None
+    self._condition = threading.Condition()
+
+  def is_unchanged(self, code: str, content: Dict) -> bool:
+    """Returns whether content is the same as the last content with the same code, and remembers it"""
+    fingerprint = content_fingerprint(content)
+    if self._fingerprints.get(code, None) == fingerprint:
+      return True
+    self._fingerprints[code] = fingerprint
+    return False
+
+  def submit(self, code: str, basename: str, content: Dict) -> None:
+    """Queues the log file basename.yaml, containing content, for rendering"""
+    if self.is_unchanged(code, content):
+      return
+    with self._condition:
+      if self._pid != os.getpid():
+        # Start the rendering thread of this process (e.g., after forking)
+        self._pid = os.getpid()
+        self._pending = []
+        threading.Thread(target=self._render_continuously, name='kml-renderer', daemon=True).start()
+        atexit.register(self._drain)
+      self._pending.append(basename)
+      self._condition.notify()
+
+  def _render_continuously(self) -> None:
+    while True:
+      with self._condition:
+        while not self._pending:
+          self._condition.wait()
+        # Give other entries a chance to join this batch
+        deadline = time.monotonic() + self.batch_delay_s
+        while len(self._pending) < self.batch_size and time.monotonic() < deadline and not self._draining:
+          self._condition.wait(deadline - time.monotonic())
+        batch = self._pending[0:self.batch_size]
+        self._pending = self._pending[self.batch_size:]
+        self._busy = True
+      try:
+        self.render(batch)
+      finally:
+        with self._condition:
+          self._busy = False
+          self._condition.notify_all()
+
+  def _drain(self) -> None:
+    """Waits a limited time for queued log files to be rendered"""
+    deadline = time.monotonic() + self.drain_timeout_s
+    with self._condition:
+      self._draining = True
+      self._condition.notify_all()
+      while (self._pending or self._busy) and time.monotonic() < deadline:
+        self._condition.wait(min(0.1, max(deadline - time.monotonic(), 0)))
+
+  def rendered_basenames(self) -> Set[str]:
+    """Returns the basenames of the log files already rendered to KML"""
+    kml_path = os.path.join(self.log_path, 'kml')
+    if not os.path.exists(kml_path):
+      return set()
+    # Log files rendered before the manifest existed each have their own KML
+    rendered = {f[0:-len('.kml')] for f in os.listdir(kml_path) if f.endswith('.kml')}
+    manifest = os.path.join(kml_path, RENDERED_MANIFEST)
+    if os.path.exists(manifest):
+      with open(manifest, 'r') as f:
+        rendered.update(line.strip() for line in f if line.strip())
+    return rendered
+
+  def render(self, basenames: List[str]) -> bool:
+    """Renders the specified log files in one request to the KML server, and returns whether it succeeded"""
+    if not basenames:
+      return True
+    kml_path = os.path.join(self.log_path, 'kml')
+    kml_server_filenames = ', '.join(os.path.join(self.kml_session.kml_folder, '{}.yaml'.format(b)) for b in basenames)
+    for attempt in range(1, self.max_attempts + 1):
+      try:
+        with contextlib.ExitStack() as stack:
+          files = [('files[]', stack.enter_context(open(os.path.join(self.log_path, '{}.yaml'.format(b)), 'r')))
+                   for b in basenames]
+          resp = self.kml_session.post('/realtime_kml',
+                                       data={'path': self.kml_session.kml_folder},
+                                       files=files)
+        resp.raise_for_status()
+        os.makedirs(kml_path, exist_ok=True)
+        with open(os.path.join(kml_path, '{}.kml'.format(basenames[-1])), 'w') as f:
+          f.write(resp.content.decode('utf-8'))
+        with open(os.path.join(kml_path, RENDERED_MANIFEST), 'a') as f:
+          f.write(''.join(b + '\n' for b in basenames))
+        return True
+      except IOError as e:
+        if attempt == self.max_attempts:
+          print('Error posting {} to KML server: {}'.format(kml_server_filenames, e))
+        else:
+          time.sleep(self.retry_delay_s * 2 ** (attempt - 1))
+    return False
+
+
 class Logger(object):
   def __init__(self, log_path: str, kml_session: infrastructure.KMLGenerationSession = None):
     self.log_path = log_path
     _logger.info('Log path: {}'.format(self.log_path))
     os.makedirs(self.log_path, exist_ok=True)
     self.kml_session = kml_session
+    self.kml_renderer = KMLRenderer(kml_session, log_path) if kml_session else None
 
   def log_same(self, t0: datetime.datetime, t1: datetime.datetime, code: str) -> None:
     with open(os.path.join(self.log_path, '000000_nochange_queries.yaml'), 'a') as f:
@@ -41,19 +191,42 @@ class Logger(object):
     with open(fullname, 'w') as f:
       f.write(yaml.dump(dump, indent=2))
 
-    if self.kml_session:
-      kml_server_filename = os.path.join(self.kml_session.kml_folder, logname)
-      try:
-        with open(fullname, 'r') as f:
-          resp = self.kml_session.post('/realtime_kml',
-                                       data={'path': self.kml_session.kml_folder},
-                                       files=[('files[]', f)])
-        resp.raise_for_status()
-        kml_path = os.path.join(self.log_path, 'kml')
-        os.makedirs(kml_path, exist_ok=True)
-        with open(os.path.join(kml_path, '{}.kml'.format(basename)), 'w') as f:
-          f.write(resp.content.decode('utf-8'))
-      except IOError as e:
-        print('Error posting {} to KML server: {}'.format(kml_server_filename, e))
+    if self.kml_renderer:
+      self.kml_renderer.submit(code, basename, dump)
 
     return logname
+
+
+class ColumnarLog(object):
+  """Append-only tab-separated log with one row per event, for high-rate observations.
+
+  A header row naming the columns is written when the file is created.  Rows
+  are buffered and written at most every flush_interval_s seconds so that a
+  high observation rate does not cost a disk write per row.
+  """
+
+  def __init__(self, path: str, columns: List[str], flush_interval_s: float = 1.0):
+    self.path = path
+    self.columns = columns
+    self._flush_interval_s = flush_interval_s
+    self._rows: List[str] = []
+    self._last_flush = time.monotonic()
+    if not os.path.exists(path):
+      with open(path, 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+
+  def write(self, values: Iterable[Any]) -> None:
+    self._rows.append('\t'.join(
+      '' if v is None else str(v).replace('\t', ' ').replace('\n', ' ') for v in values))
+    self.flush_if_due()
+
+  def flush_if_due(self) -> None:
+    if time.monotonic() - self._last_flush >= self._flush_interval_s:
+      self.flush()
+
+  def flush(self) -> None:
+    if self._rows:
+      with open(self.path, 'a') as f:
+        f.write('\n'.join(self._rows) + '\n')
+      self._rows = []
+    self._last_flush = time.monotonic()
@@ -18,6 +18,7 @@ from monitoring.monitorlib import mutate
 import monitoring.monitorlib.mutate.rid
 import monitoring.monitorlib.mutate.scd
 from monitoring.tracer.resources import ResourceSet
+from monitoring.tracer.uss_receiver.notification_queue import NotificationQueue
 
 
 ENV_OPTIONS = 'TRACER_OPTIONS'
@@ -29,6 +30,7 @@ _logger = logging.getLogger('tracer.context')
 _logger.setLevel(logging.DEBUG)
 
 resources: Optional[ResourceSet] = None
+notifications = NotificationQueue()
 
 
 class SubscriptionManagementError(RuntimeError):
@@ -47,11 +49,13 @@ def init() -> None:
   parser.add_argument('--base-url', help='Base URL at which this server may be reached externally')
   parser.add_argument('--monitor-rid', action='store_true', default=False, help='If specified, monitor ISA activity per the remote ID standard')
   parser.add_argument('--monitor-scd', action='store_true', default=False, help='If specified, monitor Operation and Constraint activity per the strategic deconfliction standard')
+  parser.add_argument('--notification-queue-size', type=int, default=1000, help='Maximum number of received notifications waiting to be logged in each worker process; further notifications are acknowledged but not logged')
 
   args = parser.parse_args(shlex.split(os.environ[ENV_OPTIONS]))
 
   global resources
   resources = ResourceSet.from_arguments(args)
+  notifications.max_size = args.notification_queue_size
 
   config = vars(args)
   config['code_version'] = versioning.get_code_version()
@@ -0,0 +1,112 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+logging.basicConfig()
+_logger = logging.getLogger('tracer.notification_queue')
+_logger.setLevel(logging.DEBUG)
+
+
+class NotificationQueue(object):
+  """Bounded in-memory queue of received notifications, processed in the background.
+
+  Notification handlers only describe the request and enqueue it so that the
+  notifying USS or DSS receives its response immediately; a writer thread
+  then processes the notifications (logging, KML rendering) in the order they
+  were received.  When the queue is full, notifications are dropped and
+  counted rather than delaying responses.  Each process (e.g., each gunicorn
+  worker) has its own queue and writer thread, started on first use.
+  """
+
+  def __init__(self, max_size: int = 1000, drain_timeout_s: float = 5):
+    self.max_size = max_size
+    self.drain_timeout_s = drain_timeout_s
+    self._queue: Optional[queue.Queue] = None
+    self._pid: Optional[int] = None
+    self._lock = threading.Lock()
+    self._reset_stats()
+
+  def _reset_stats(self) -> None:
+    self.enqueued = 0
+    self.processed = 0
+    self.failed = 0
+    self.dropped = 0
+    self.max_depth = 0
+    self.processing_time_s = 0.0
+
+  def _get_queue(self) -> queue.Queue:
+    pid = os.getpid()
+    if self._pid != pid:
+      with self._lock:
+        if self._pid != pid:
+          self._queue = queue.Queue(maxsize=self.max_size)
+          self._reset_stats()
+          self._pid = pid
+          threading.Thread(target=self._process, name='notification-writer', daemon=True).start()
+          atexit.register(self._drain)
+    return self._queue
+
+  def submit(self, fn: Callable, *args) -> bool:
+    """Enqueues fn(*args) for processing in the background, and returns whether it was accepted"""
+    q = self._get_queue()
+    try:
+      q.put_nowait((fn, args))
+    except queue.Full:
+      with self._lock:
+        self.dropped += 1
+        dropped = self.dropped
+      if dropped == 1 or dropped % 100 == 0:
+        _logger.warning('Notification queue full; {} notification(s) dropped so far'.format(dropped))
+      return False
+    with self._lock:
+      self.enqueued += 1
+      self.max_depth = max(self.max_depth, q.qsize())
+    return True
+
+  def _process(self) -> None:
+    q = self._queue
+    while True:
+      fn, args = q.get()
+      t0 = time.monotonic()
+      try:
+        fn(*args)
+        failed = False
+      except Exception as e:
+        _logger.error('Error processing notification with {}: {}'.format(fn.__name__, e))
+        failed = True
+      finally:
+        q.task_done()
+      with self._lock:
+        self.processed += 1
+        self.processing_time_s += time.monotonic() - t0
+        if failed:
+          self.failed += 1
+
+  def _drain(self) -> None:
+    """Waits a limited time for notifications still in the queue to be processed"""
+    if self._pid != os.getpid():
+      return
+    deadline = time.monotonic() + self.drain_timeout_s
+    while self._queue.unfinished_tasks and time.monotonic() < deadline:
+      time.sleep(0.05)
+
+  def stats(self) -> Dict:
+    """Returns the metrics of the queue of this process"""
+    q = self._get_queue()
+    with self._lock:
+      return {
+        'pid': os.getpid(),
+        'depth': q.qsize(),
+        'max_depth': self.max_depth,
+        'capacity': self.max_size,
+        'enqueued': self.enqueued,
+        'processed': self.processed,
+        'failed': self.failed,
+        'dropped': self.dropped,
+        'processing_time_s': self.processing_time_s,
+      }
@@ -39,18 +39,30 @@ def _print_time_range(t0: str, t1: str) -> str:
     return ''
 
 
+def _request_json(req: fetch.RequestDescription) -> Dict:
+  json = req.get('json', None)
+  if not isinstance(json, dict):
+    raise ValueError('Request body is not a JSON object')
+  return json
+
+
 @webapp.route('/v1/uss/identification_service_areas/<id>', methods=['POST'])
 def rid_isa_notification(id: str) -> Tuple[str, int]:
   """Implements RID ISA notification receiver."""
   req = fetch.describe_flask_request(flask.request)
   req['endpoint'] = 'identification_service_areas'
+  context.notifications.submit(_log_rid_isa_notification, id, req)
+  return RESULT
+
+
+def _log_rid_isa_notification(id: str, req: fetch.RequestDescription) -> None:
   log_name = context.resources.logger.log_new('notify_isa', req)
 
   claims = req.token
   owner = claims.get('sub', '<No owner in token>')
   label = colored('ISA', 'cyan')
   try:
-    json = flask.request.json
+    json = _request_json(req)
     if json.get('service_area'):
       isa = json['service_area']
       owner_body = isa.get('owner')
@@ -64,21 +76,24 @@ def rid_isa_notification(id: str) -> Tuple[str, int]:
   except ValueError as e:
     _logger.error('{} {} ({}) unable to decode JSON: {} -> {}'.format(label, id, owner, e, log_name))
 
-  return RESULT
-
 
 @webapp.route('/uss/v1/operations', methods=['POST'])
 def scd_operation_notification() -> Tuple[str, int]:
   """Implements SCD Operation notification receiver."""
   req = fetch.describe_flask_request(flask.request)
   req['endpoint'] = 'operations'
+  context.notifications.submit(_log_scd_operation_notification, req)
+  return RESULT
+
+
+def _log_scd_operation_notification(req: fetch.RequestDescription) -> None:
   log_name = context.resources.logger.log_new('notify_op', req)
 
   claims = req.token
   owner = claims.get('sub', '<No owner in token>')
   label = colored('Operation', 'blue')
   try:
-    json = flask.request.json
+    json = _request_json(req)
     id = json.get('operation_id', '<Unknown ID>')
     if json.get('operation'):
       op = json['operation']
@@ -109,21 +124,24 @@ def scd_operation_notification() -> Tuple[str, int]:
   except ValueError as e:
     _logger.error('{} ({}) unable to decode JSON: {} -> {}'.format(label, owner, e, log_name))
 
-  return RESULT
-
 
 @webapp.route('/uss/v1/constraints', methods=['POST'])
 def scd_constraint_notification() -> Tuple[str, int]:
   """Implements SCD Constraint notification receiver."""
   req = fetch.describe_flask_request(flask.request)
   req['endpoint'] = 'constraints'
+  context.notifications.submit(_log_scd_constraint_notification, req)
+  return RESULT
+
+
+def _log_scd_constraint_notification(req: fetch.RequestDescription) -> None:
   log_name = context.resources.logger.log_new('notify_constraint', req)
 
-  claims = infrastructure.get_token_claims({k: v for k, v in flask.request.headers})
+  claims = req.token
   owner = claims.get('sub', '<No owner in token>')
   label = colored('Constraint', 'magenta')
   try:
-    json = flask.request.json
+    json = _request_json(req)
     id = json.get('constraint_id', '<Unknown ID>')
     if json.get('constraint'):
       constraint = json['constraint']
@@ -151,14 +169,17 @@ def scd_constraint_notification() -> Tuple[str, int]:
   except ValueError as e:
     _logger.error('{} ({}) unable to decode JSON: {} -> {}'.format(label, owner, e, log_name))
 
-  return RESULT
-
 
 @webapp.route('/status')
 def status():
   return 'Ok {}'.format(versioning.get_code_version())
 
 
+@webapp.route('/status/notifications')
+def notifications_status():
+  return flask.jsonify(context.notifications.stats())
+
+
 @webapp.route('/logs')
 @webapp.route('/')
 def list_logs():
@@ -282,6 +303,11 @@ def favicon():
 def catch_all(u_path) -> Tuple[str, int]:
   req = fetch.describe_flask_request(flask.request)
   req['endpoint'] = 'catch_all'
+  context.notifications.submit(_log_bad_route, u_path, req)
+  return RESULT
+
+
+def _log_bad_route(u_path: str, req: fetch.RequestDescription) -> None:
   log_name = context.resources.logger.log_new('uss_badroute', req)
 
   claims = req.token
@@ -289,7 +315,5 @@ def catch_all(u_path) -> Tuple[str, int]:
   label = colored('Bad route', 'red')
   _logger.error('{} to {} ({}): {}'.format(label, u_path, owner, log_name))
 
-  return RESULT
-
 
 context.init()
@@ -45,7 +45,7 @@ def main() -> int:
     if "rid" in config:
         print(f"[RID] Configuration provided with {len(config.rid.injection_targets)} injection targets.")
         rid_test_executor.validate_configuration(config.rid)
-        rid_flight_records = rid_test_executor.load_rid_test_definitions(config.locale)
+        rid_flight_records = rid_test_executor.load_rid_test_definitions(config.locale, config.rid.flight_record_workers)
         rid_test_executor.run_rid_tests(test_configuration=config.rid, auth_spec=auth_spec,
                                         flight_records=rid_flight_records)
     else:
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+import time
+from typing import Optional, Tuple, Union
+
+
+class ResultCache(object):
+    """Content-addressed cache of background job results, stored on disk.
+
+    Each result is stored in its own file named after the key of the inputs
+    which produced it.  Reading a result marks it as recently used (through
+    the access time of its file) and, whenever the total size of the cache
+    exceeds max_bytes, the least recently used results are evicted.
+    """
+
+    SUFFIX = '.json'
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(*parts: Union[str, bytes]) -> str:
+        """Returns the key identifying the result computed from the specified inputs"""
+        h = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            # Prefix each part with its length so that different splits of the same content produce different keys
+            h.update(str(len(part)).encode('ascii'))
+            h.update(b':')
+            h.update(part)
+        return h.hexdigest()
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, key + ResultCache.SUFFIX)
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[str]:
+        """Returns the cached result for the key, or None if there is no such result.
+
+        :param max_age: If specified, results computed more than this many seconds ago are ignored
+        """
+        cached = self.get_with_time(key, max_age)
+        return cached[0] if cached is not None else None
+
+    def get_with_time(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Returns the cached result for the key and when it was stored (seconds since epoch), or None if there is no such result.
+
+        :param max_age: If specified, results computed more than this many seconds ago are ignored
+        """
+        if self.max_bytes <= 0:
+            return None
+        file_path = self._file_path(key)
+        try:
+            mtime = os.stat(file_path).st_mtime
+            if max_age is not None and time.time() - mtime > max_age:
+                return None
+            with open(file_path, 'r') as f:
+                content = f.read()
+            os.utime(file_path, (time.time(), mtime))
+        except FileNotFoundError:
+            # Never cached, or evicted by another worker in the meantime
+            return None
+        return content, mtime
+
+    def put(self, key: str, content: str) -> None:
+        """Stores the result for the key, then evicts older results if the cache is too large"""
+        if self.max_bytes <= 0 or len(content) > self.max_bytes:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        # Write to a temporary file first so other workers never read a partial result
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, self._file_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used results until the cache is no larger than max_bytes"""
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.name.endswith(ResultCache.SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+        if total_bytes <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, file_path in entries:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
@@ -0,0 +1,67 @@
+"""Unit tests for the result_cache module using pytest.
+
+Testing can be invoked from the command line using:
+`pytest [test_*|*_test.py file/filepath]`
+"""
+
+import os
+import time
+
+from monitoring.uss_qualifier.result_cache import ResultCache
+
+
+def test_put_get(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), 1000)
+    key = ResultCache.make_key('kind', 'input')
+    assert cache.get(key) is None
+
+    cache.put(key, 'result')
+    assert cache.get(key) == 'result'
+    assert cache.get(ResultCache.make_key('kind', 'other input')) is None
+    # Different splits of the same content are different inputs
+    assert ResultCache.make_key('ab', 'c') != ResultCache.make_key('a', 'bc')
+
+    # A disabled cache stores nothing
+    disabled_cache = ResultCache(str(tmp_path / 'disabled'), 0)
+    disabled_cache.put(key, 'result')
+    assert disabled_cache.get(key) is None
+
+
+def test_get_with_time_max_age(tmp_path):
+    cache = ResultCache(str(tmp_path), 1000)
+    key = ResultCache.make_key('report')
+    t0 = time.time()
+    cache.put(key, 'report')
+    content, stored_at = cache.get_with_time(key)
+    assert content == 'report'
+    assert abs(stored_at - t0) < 5
+
+    assert cache.get_with_time(key, max_age=60) is not None
+    # Pretend the result was stored 2 minutes ago
+    file_path = str(tmp_path / (key + ResultCache.SUFFIX))
+    os.utime(file_path, (t0, t0 - 120))
+    assert cache.get_with_time(key, max_age=60) is None
+    assert cache.get_with_time(key, max_age=180)[0] == 'report'
+
+
+def test_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), 250)
+    keys = [ResultCache.make_key(str(i)) for i in range(3)]
+    t0 = time.time()
+    for i, key in enumerate(keys[0:2]):
+        cache.put(key, str(i) * 100)
+        # Make access times distinct and in the order of insertion
+        file_path = str(tmp_path / (key + ResultCache.SUFFIX))
+        os.utime(file_path, (t0 - 100 + i * 10, t0))
+
+    # Reading the first result makes it the most recently used
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], '2' * 100)
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+    # Results larger than the whole cache are not stored
+    big_key = ResultCache.make_key('big')
+    cache.put(big_key, 'x' * 300)
+    assert cache.get(big_key) is None
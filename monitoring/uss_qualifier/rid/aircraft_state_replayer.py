@@ -1,38 +1,80 @@
 import datetime
 from monitoring.monitorlib.auth import make_auth_adapter
-from monitoring.monitorlib.infrastructure import DSSTestSession
+from monitoring.monitorlib.infrastructure import AuthAdapter, DSSTestSession
+import collections
+import itertools
 import json, os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from monitoring.monitorlib import fetch
-from monitoring.uss_qualifier.rid.utils import FullFlightRecord
+from monitoring.uss_qualifier.rid.utils import FLIGHT_RECORDS_CHUNK_SUFFIX, FullFlightRecord
 from monitoring.uss_qualifier.rid import reports
 from monitoring.monitorlib.rid_automated_testing.injection_api import TestFlightDetails, TestFlight, CreateTestParameters, SCOPE_RID_QUALIFIER_INJECT
-from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.monitorlib.typing import ImplicitDict, StringBasedDateTime
 import arrow
 
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 from monitoring.uss_qualifier.rid.utils import RIDQualifierTestConfiguration
 
 
-def get_full_flight_records(aircraft_states_directory: Path) -> List[FullFlightRecord]:
-    """Gets full flight records from the specified directory if they exist"""
-
+def _list_flight_record_files(aircraft_states_directory: Path) -> List[str]:
     if not os.path.exists(aircraft_states_directory):
         raise ValueError('The aircraft states directory does not exist: {}'.format(aircraft_states_directory))
 
-    all_files = os.listdir(aircraft_states_directory)
+    all_files = sorted(os.listdir(aircraft_states_directory))
     files = [os.path.join(aircraft_states_directory,f) for f in all_files if os.path.isfile(os.path.join(aircraft_states_directory, f))]
 
     if not files:
         raise ValueError('There are no states in the states directory, create states first using the simulator/flight_state module.')
+    return files
 
-    flight_records: List[FullFlightRecord] = []
+
+def _read_flight_record_jsons(files: List[str]) -> Iterator[str]:
+    """Reads the JSON content of each flight record in the files, one record at a time"""
     for file in files:
         with open(file, 'r') as f:
-            flight_records.append(ImplicitDict.parse(json.load(f), FullFlightRecord))
+            if file.endswith(FLIGHT_RECORDS_CHUNK_SUFFIX):
+                # Chunk file containing one flight record per line
+                for line in f:
+                    if line.strip():
+                        yield line
+            else:
+                yield f.read()
+
+
+def parse_full_flight_record(flight_record_json: str) -> FullFlightRecord:
+    return ImplicitDict.parse(json.loads(flight_record_json), FullFlightRecord)
 
-    return flight_records
+
+def _parse_in_worker_pool(flight_record_jsons: Iterator[str], max_workers: int) -> Iterator[FullFlightRecord]:
+    """Parses flight records in worker processes, in order, with only a few records parsed ahead of the consumer"""
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque()
+        for flight_record_json in flight_record_jsons:
+            pending.append(executor.submit(parse_full_flight_record, flight_record_json))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_full_flight_records(aircraft_states_directory: Path, max_workers: int = 1) -> Iterator[FullFlightRecord]:
+    """Lazily gets full flight records from the specified directory if they exist.
+
+    The directory is checked immediately, but each record is only read and
+    parsed when it is consumed from the returned iterator.  If max_workers is
+    more than 1, records are parsed in that many worker processes.
+    """
+    flight_record_jsons = _read_flight_record_jsons(_list_flight_record_files(aircraft_states_directory))
+    if max_workers > 1:
+        return _parse_in_worker_pool(flight_record_jsons, max_workers)
+    return (parse_full_flight_record(j) for j in flight_record_jsons)
+
+
+def get_full_flight_records(aircraft_states_directory: Path) -> List[FullFlightRecord]:
+    """Gets full flight records from the specified directory if they exist"""
+    return list(iter_full_flight_records(aircraft_states_directory))
 
 
 class TestBuilder():
@@ -40,20 +82,23 @@ class TestBuilder():
 
     def __init__(
             self, test_configuration: RIDQualifierTestConfiguration,
-            flight_records: List[FullFlightRecord]) -> None:
+            flight_records: Iterable[FullFlightRecord]) -> None:
         self.test_configuration = test_configuration
         usses = self.test_configuration.injection_targets
-        if len(usses) > len(flight_records):
-            raise ValueError('There are not enough flight records ({}) to test the specified USSes ({})'.format(len(usses), len(flight_records)))
-        self.disk_flight_records: List[FullFlightRecord] = flight_records
+        # Only the records assigned to a USS are consumed (and so, when loaded lazily, parsed)
+        self.disk_flight_records: List[FullFlightRecord] = list(itertools.islice(flight_records, len(usses)))
+        if len(usses) > len(self.disk_flight_records):
+            raise ValueError('There are not enough flight records ({}) to test the specified USSes ({})'.format(len(self.disk_flight_records), len(usses)))
 
-    def build_test_payloads(self) -> List[CreateTestParameters]:
+    def build_test_payloads(self, flight_start_delay: Optional[datetime.timedelta] = None) -> List[CreateTestParameters]:
         ''' This is the main method to process the test configuration and build RID payload object, maxium of one flight is allocated to each USS. '''
 
         all_test_payloads = [] # This holds the data that will be deilver
 
+        if flight_start_delay is None:
+            flight_start_delay = self.test_configuration.flight_start_delay.timedelta
         test_reference_time = arrow.now()
-        test_start_time = test_reference_time + self.test_configuration.flight_start_delay.timedelta
+        test_start_time = test_reference_time + flight_start_delay
         test_start_isoformat = test_start_time.isoformat()
 
         for state_data_index, flight_record in enumerate(self.disk_flight_records):
@@ -62,11 +107,10 @@ class TestBuilder():
 
             flight_record.reference_time = test_reference_time.isoformat()
 
-            timestamp_offset = test_start_time - disk_reference_time
+            timestamp_offset = test_start_time.datetime - disk_reference_time.datetime
 
-            for telemetry_id, flight_telemetry in enumerate(flight_record.states):
-                timestamp = arrow.get(flight_telemetry.timestamp) + timestamp_offset
-                flight_telemetry.timestamp = timestamp.isoformat()
+            for flight_telemetry in flight_record.states:
+                flight_telemetry.timestamp = StringBasedDateTime(_get_datetime(flight_telemetry.timestamp) + timestamp_offset)
 
             test_flight_details = TestFlightDetails(effective_after = test_start_isoformat, details = flight_record.flight_details.rid_details)
 
@@ -82,25 +126,54 @@ class TestBuilder():
         return all_test_payloads
 
 
+def _get_datetime(timestamp: str) -> datetime.datetime:
+    """Returns the datetime of a timestamp, without parsing it again if it was already parsed"""
+    if isinstance(timestamp, StringBasedDateTime):
+        return timestamp.datetime
+    return arrow.get(timestamp).datetime
+
+
 class TestHarness():
     ''' A class to submit Aircraft RID State to the USS test endpoint '''
 
-    def __init__(self, auth_spec:str, injection_base_url:str):
+    def __init__(self, auth_spec:str, injection_base_url:str, auth_adapter: Optional[AuthAdapter] = None):
 
-        auth_adapter = make_auth_adapter(auth_spec)
+        if auth_adapter is None:
+            auth_adapter = make_auth_adapter(auth_spec)
         self._base_url = injection_base_url
         self.uss_session = DSSTestSession(injection_base_url, auth_adapter)
 
-    def submit_test(self, payload: CreateTestParameters, test_id: str, setup: reports.Setup) -> None:
+    def probe_latency(self) -> float:
+        ''' Measures the round trip time, in seconds, of an authorized request to the USS test endpoint.
+
+        The request attempts to delete a test which does not exist, so it has no side effect on the USS.
+        '''
+        probe_path = '/tests/{}/0'.format(uuid.uuid4())
+
+        # Make sure token issuance is not included in the measurement
+        self.uss_session.auth_adapter.get_headers(self._base_url + probe_path, [SCOPE_RID_QUALIFIER_INJECT])
+
+        t0 = datetime.datetime.utcnow()
+        self.uss_session.delete(url=probe_path, scope=SCOPE_RID_QUALIFIER_INJECT, timeout=fetch.TIMEOUTS)
+        return (datetime.datetime.utcnow() - t0).total_seconds()
+
+    def inject_test(self, payload: CreateTestParameters, test_id: str) -> fetch.Query:
+        ''' Submits the test to the USS test endpoint and describes the interaction, whatever its outcome '''
         injection_path = '/tests/{}'.format(test_id)
 
         initiated_at = datetime.datetime.utcnow()
         response = self.uss_session.put(url=injection_path, json=payload, scope=SCOPE_RID_QUALIFIER_INJECT)
         #TODO: Use response to specify flights as actually-injected rather than assuming no modifications
-        setup.injections.append(fetch.describe_query(response, initiated_at))
+        return fetch.describe_query(response, initiated_at)
 
-        if response.status_code == 200:
+    def check_injection(self, query: fetch.Query, test_id: str) -> None:
+        if query.status_code == 200:
             print("New test with ID %s created" % test_id)
         else:
             raise RuntimeError('Error {} submitting test ID {} to {}: {}'.format(
-                response.status_code, test_id, self._base_url, response.content.decode('utf-8')))
+                query.status_code, test_id, self._base_url, query.response.get('json', query.response.get('body', None))))
+
+    def submit_test(self, payload: CreateTestParameters, test_id: str, setup: reports.Setup) -> None:
+        query = self.inject_test(payload, test_id)
+        setup.injections.append(query)
+        self.check_injection(query, test_id)
@@ -0,0 +1,48 @@
+"""Unit tests for the aircraft_state_replayer module using pytest.
+
+Testing can be invoked from the command line using:
+`pytest [test_*|*_test.py file/filepath]`
+"""
+
+import datetime
+
+import arrow
+
+from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.uss_qualifier.rid import aircraft_state_replayer as asr
+from monitoring.uss_qualifier.rid.simulator import traffic_scenario as ts
+from monitoring.uss_qualifier.rid.utils import RIDQualifierTestConfiguration
+
+
+def _write_scenario(output_folder: str) -> None:
+    ts.generate_traffic_scenario(ImplicitDict.parse({
+        'minx': 7.40, 'miny': 46.90, 'maxx': 7.45, 'maxy': 46.95, 'utm_zone': '32T',
+        'flight_count': 12, 'duration': 30, 'flight_duration': {'min': 30, 'max': 30},
+        'reference_time': '2022-01-01T00:00:00Z', 'flights_per_file': 5,
+    }, ts.TrafficScenarioConfiguration), output_folder)
+
+
+def test_build_test_payloads(tmp_path):
+    _write_scenario(str(tmp_path))
+    records = asr.iter_full_flight_records(tmp_path)
+    config = ImplicitDict.parse({
+        'injection_targets': [{'name': 'uss1', 'injection_base_url': 'http://uss1'},
+                              {'name': 'uss2', 'injection_base_url': 'http://uss2'}],
+        'observers': [],
+    }, RIDQualifierTestConfiguration)
+
+    builder = asr.TestBuilder(config, records)
+    # Only the records assigned to USSs were consumed
+    assert len(builder.disk_flight_records) == 2
+    assert len(list(records)) == 10
+
+    t0 = arrow.utcnow().datetime
+    payloads = builder.build_test_payloads(datetime.timedelta(seconds=20))
+    assert len(payloads) == 2
+    for payload in payloads:
+        telemetry = payload.requested_flights[0].telemetry
+        # The first state was 1 second after the reference time of the record
+        dt = (arrow.get(telemetry[0].timestamp).datetime - t0).total_seconds()
+        assert 20.5 < dt < 22
+        assert (arrow.get(telemetry[-1].timestamp) - arrow.get(telemetry[0].timestamp)).total_seconds() == 29
+        assert telemetry[0].timestamp.endswith('Z')
@@ -1,9 +1,13 @@
 import datetime
 import json
+import math
+import threading
 import time
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
 import arrow
+import numpy as np
 import s2sphere
 
 from monitoring.monitorlib import fetch, geo, rid
@@ -44,60 +48,140 @@ class RIDSystemObserver(object):
     return (result, fetch.describe_query(resp, initiated_at))
 
 
-def _get_query_rect(injected_flights: List[TestFlight], t: datetime.datetime,
-                    config: EvaluationConfiguration) -> s2sphere.LatLngRect:
-  data_exists = False
-  lat_min = 90
-  lng_min = 360
-  lat_max = -90
-  lng_max = -360
+class _FlightTrack(object):
+  """Telemetry of a single injected flight as time-sorted arrays"""
+
+  def __init__(self, flight: TestFlight):
+    states = [(arrow.get(telemetry.timestamp).timestamp(), telemetry.position.lat,
+               telemetry.position.lng, telemetry.position.alt)
+              for telemetry in flight.telemetry]
+    states.sort(key=lambda state: state[0])
+    values = np.asarray(states, dtype=float).reshape(-1, 4)
+    self.t = values[:, 0]
+    self.lat = values[:, 1]
+    self.lng = values[:, 2]
+    self.alt = values[:, 3]
+    self.t_min = datetime.datetime.fromtimestamp(self.t[0], datetime.timezone.utc) if len(self.t) else None
+    self.t_max = datetime.datetime.fromtimestamp(self.t[-1], datetime.timezone.utc) if len(self.t) else None
+
+  def position_at(self, t: float) -> Tuple[float, float, float]:
+    """Returns the (lat, lng, alt) of the flight interpolated at time t (seconds since epoch)"""
+    return (float(np.interp(t, self.t, self.lat)),
+            float(np.interp(t, self.t, self.lng)),
+            float(np.interp(t, self.t, self.alt)))
+
+  def closest_approach(self, lat: float, lng: float, t0: float, t1: float,
+                       tolerance: float = 1) -> Optional[Tuple[float, float]]:
+    """Finds when, between t0 and t1, the flight came closest to the specified position.
+
+    The track between telemetry points is considered to be a straight line.
+    When the flight passed within tolerance meters of its closest distance more
+    than once (e.g., on successive laps of a circular track), the latest time
+    is chosen since it corresponds to the smallest latency.
+
+    :return: Time (seconds since epoch) of closest approach, and the horizontal distance in meters at that time
+    """
+    i0 = max(np.searchsorted(self.t, t0, side='left') - 1, 0)
+    i1 = min(np.searchsorted(self.t, t1, side='right') + 1, len(self.t))
+    if i1 - i0 < 1:
+      return None
+    x, y = _flatten_arrays(lat, lng, self.lat[i0:i1], self.lng[i0:i1])
+    t = self.t[i0:i1]
+    if len(t) == 1:
+      return float(t[0]), float(np.hypot(x[0], y[0]))
+
+    # Project the observed position (the origin) onto each segment of the track
+    dx = np.diff(x)
+    dy = np.diff(y)
+    length2 = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+      u = np.where(length2 > 0, -(x[:-1] * dx + y[:-1] * dy) / length2, 0)
+    u = np.clip(u, 0, 1)
+    t_closest = np.clip(t[:-1] + u * np.diff(t), t0, t1)
+    distance = np.hypot(x[:-1] + u * dx, y[:-1] + u * dy)
+    k = int(np.nonzero(distance <= distance.min() + tolerance)[0][-1])
+    return float(t_closest[k]), float(distance[k])
+
+
+def _flatten_arrays(ref_lat: float, ref_lng: float, lats: np.ndarray, lngs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+  """Locally flatten lat-lng points to (dx, dy) in meters from reference; see geo.flatten"""
+  return (
+    (lngs - ref_lng) * geo.EARTH_CIRCUMFERENCE_M * math.cos(math.radians(ref_lat)) / 360,
+    (lats - ref_lat) * geo.EARTH_CIRCUMFERENCE_M / 360
+  )
+
+
+class _TelemetryIndex(object):
+  """Positions of all telemetry of injected flights, sorted by time.
+
+  Timestamps are parsed once so that the positions relevant to any time window
+  can be found with a binary search rather than by scanning all telemetry.
+  """
 
+  def __init__(self, injected_flights: List[TestFlight]):
+    self.tracks = [_FlightTrack(injected_flight) for injected_flight in injected_flights]
+    times = np.concatenate([track.t for track in self.tracks]) if self.tracks else np.zeros(0)
+    order = np.argsort(times, kind='stable')
+    self.t = times[order]
+    self.lat = np.concatenate([track.lat for track in self.tracks])[order] if self.tracks else np.zeros(0)
+    self.lng = np.concatenate([track.lng for track in self.tracks])[order] if self.tracks else np.zeros(0)
+
+  @property
+  def t_end(self) -> Optional[datetime.datetime]:
+    """Time of the last telemetry point"""
+    if len(self.t) == 0:
+      return None
+    return datetime.datetime.fromtimestamp(self.t[-1], datetime.timezone.utc)
+
+  def bounds(self, t_min: datetime.datetime, t_max: datetime.datetime) -> Optional[Tuple[float, float, float, float]]:
+    """Returns (lat_min, lng_min, lat_max, lng_max) of the telemetry between t_min and t_max, if any"""
+    i0 = np.searchsorted(self.t, t_min.timestamp(), side='left')
+    i1 = np.searchsorted(self.t, t_max.timestamp(), side='right')
+    if i0 >= i1:
+      return None
+    lats = self.lat[i0:i1]
+    lngs = self.lng[i0:i1]
+    return lats.min(), lngs.min(), lats.max(), lngs.max()
+
+  def center(self) -> Tuple[float, float]:
+    """Returns the mean position of all telemetry"""
+    return self.lat.mean(), self.lng.mean()
+
+
+def _get_query_rect(telemetry_index: _TelemetryIndex, t: datetime.datetime,
+                    config: EvaluationConfiguration) -> s2sphere.LatLngRect:
   # Find the bounds of all relevant points
   t_min = t - rid.NetMaxNearRealTimeDataPeriod - config.max_propagation_latency.timedelta
   t_max = t
-  for injected_flight in injected_flights:
-    for telemetry in injected_flight.telemetry:
-      t = arrow.get(telemetry.timestamp).datetime
-      if t_min <= t <= t_max:
-        data_exists = True
-        lat_min = min(lat_min, telemetry.position.lat)
-        lat_max = max(lat_max, telemetry.position.lat)
-        lng_min = min(lng_min, telemetry.position.lng)
-        lng_max = max(lng_max, telemetry.position.lng)
-
-  # If there is no flight data yet, look at the center of where the data will be
-  if not data_exists:
-    lat = 0
-    lng = 0
-    n = 0
-    for injected_flight in injected_flights:
-      for telemetry in injected_flight.telemetry:
-        lat += telemetry.position.lat
-        lng += telemetry.position.lng
-        n += 1
-    lat_min = lat_max = lat / n
-    lng_min = lng_max = lng / n
+  bounds = telemetry_index.bounds(t_min, t_max)
+
+  if bounds is not None:
+    lat_min, lng_min, lat_max, lng_max = bounds
+  else:
+    # If there is no flight data yet, look at the center of where the data will be
+    lat_min, lng_min = telemetry_index.center()
+    lat_max, lng_max = lat_min, lng_min
 
   # Expand view size to meet minimum, if necessary
   OVERSHOOT = 1.01
-  while True:
-    c1 = s2sphere.LatLng.from_degrees(lat_min, lng_min)
-    c2 = s2sphere.LatLng.from_degrees(lat_max, lng_max)
-    diagonal = c1.get_distance(c2).degrees * geo.EARTH_CIRCUMFERENCE_KM * 1000 / 360
-    if diagonal >= config.min_query_diagonal:
-      break
-    if lat_min == lat_max and lng_min == lng_max:
-      lat_min -= 1e-5
-      lat_max += 1e-5
-      lng_min -= 1e-5
-      lng_max += 1e-5
-      continue
+  if lat_min == lat_max and lng_min == lng_max:
+    lat_min -= 1e-5
+    lat_max += 1e-5
+    lng_min -= 1e-5
+    lng_max += 1e-5
+  c1 = s2sphere.LatLng.from_degrees(lat_min, lng_min)
+  c2 = s2sphere.LatLng.from_degrees(lat_max, lng_max)
+  diagonal = c1.get_distance(c2).degrees * geo.EARTH_CIRCUMFERENCE_KM * 1000 / 360
+  if diagonal < config.min_query_diagonal:
+    # At these scales the diagonal is proportional to the spans, so scaling
+    # both spans by the same factor scales the diagonal by that factor
+    scale = config.min_query_diagonal / diagonal * OVERSHOOT
     lat_center = 0.5 * (lat_min + lat_max)
-    lat_span = (lat_max - lat_min) * config.min_query_diagonal / diagonal * OVERSHOOT
+    lat_span = (lat_max - lat_min) * scale
     lat_min = lat_center - 0.5 * lat_span
     lat_max = lat_center + 0.5 * lat_span
     lng_center = 0.5 * (lng_min + lng_max)
-    lng_span = (lng_max - lng_min) * config.min_query_diagonal / diagonal * OVERSHOOT
+    lng_span = (lng_max - lng_min) * scale
     lng_min = lng_center - 0.5 * lng_span
     lng_max = lng_center + 0.5 * lng_span
 
@@ -108,20 +192,24 @@ def _get_query_rect(injected_flights: List[TestFlight], t: datetime.datetime,
 
 def evaluate_system(
     injected_flights: List[InjectedFlight], observers: List[RIDSystemObserver],
-    config: EvaluationConfiguration, findings: Findings) -> None:
+    config: EvaluationConfiguration, findings: Findings,
+    on_observation: Optional[Callable[[Findings], None]] = None) -> None:
   """Evaluate a system by polling system state and comparing to expectations.
 
   This routine periodically polls each of the specified observers for the system
   state and checks that each system state matches expectations based on the
-  provided injected flights, updating the provided report findings.
+  provided injected flights, updating the provided report findings.  If
+  specified, on_observation is called with the findings after each
+  observation of the system.
   """
 
+  telemetry_index = _TelemetryIndex(
+    [injected_flight.flight for injected_flight in injected_flights])
+
   # Compute the end of all injected data
   t_end = arrow.utcnow()
-  for injected_flight in injected_flights:
-    for telemetry in injected_flight.flight.telemetry:
-      t = arrow.get(telemetry.timestamp)
-      t_end = max(t_end, t)
+  if telemetry_index.t_end is not None:
+    t_end = max(t_end, arrow.get(telemetry_index.t_end))
   t_end += rid.NetMaxNearRealTimeDataPeriod + config.max_propagation_latency.timedelta
 
   if arrow.utcnow() > t_end:
@@ -129,7 +217,19 @@ def evaluate_system(
       'Cannot evaluate system: injected test flights ended at {}, which is before now ({})'.format(
         t_end, datetime.datetime.utcnow()))
 
+  poller = _ConcurrentPoller(observers)
+  try:
+    _poll_system(injected_flights, telemetry_index, poller, config, findings, t_end, on_observation)
+  finally:
+    poller.shutdown()
 
+
+def _poll_system(
+    injected_flights: List[InjectedFlight], telemetry_index: _TelemetryIndex,
+    poller: '_ConcurrentPoller',
+    config: EvaluationConfiguration, findings: Findings,
+    t_end: arrow.Arrow,
+    on_observation: Optional[Callable[[Findings], None]] = None) -> None:
   query_counter = 0
   last_rect = None
 
@@ -144,14 +244,14 @@ def evaluate_system(
       query_counter % config.repeat_query_rect_period == 0):
         rect = last_rect
     else:
-      rect = _get_query_rect(
-        [injected_flight.flight for injected_flight in injected_flights],
-        t_now, config)
+      rect = _get_query_rect(telemetry_index, t_now, config)
       last_rect = rect
     _evaluate_system_instantaneously(
-      injected_flights, observers, config, findings, rect)
+      injected_flights, telemetry_index, poller, config, findings, rect)
     print('After observation at {}, {}'.format(arrow.utcnow(), findings))
     print(json.dumps(findings.issues, indent=2))
+    if on_observation is not None:
+      on_observation(findings)
 
     # Wait until minimum polling interval elapses
     while t_next < arrow.utcnow():
@@ -164,21 +264,54 @@ def evaluate_system(
     query_counter += 1
 
 
+class _ConcurrentPoller(object):
+  """Polls all observers at the same instant.
+
+  Each observer has a dedicated worker thread; the workers wait on a barrier
+  so that the observation requests are sent simultaneously rather than after
+  the previous observer responded.
+  """
+
+  def __init__(self, observers: List[RIDSystemObserver]):
+    self.observers = observers
+    self._executor = ThreadPoolExecutor(max_workers=max(1, len(observers)))
+    self._barrier = threading.Barrier(max(1, len(observers)))
+
+  def _observe(self, observer: RIDSystemObserver, rect: s2sphere.LatLngRect) -> Tuple[Optional[observation_api.GetDisplayDataResponse], fetch.Query]:
+    self._barrier.wait()
+    return observer.observe_system(rect)
+
+  def observe_system(self, rect: s2sphere.LatLngRect) -> List[Tuple[Optional[observation_api.GetDisplayDataResponse], fetch.Query]]:
+    """Observes the system through every observer, returning results in the order of the observers"""
+    futures = [self._executor.submit(self._observe, observer, rect) for observer in self.observers]
+    return [future.result() for future in futures]
+
+  def shutdown(self):
+    self._executor.shutdown(wait=False)
+
+
 def _evaluate_system_instantaneously(
-    injected_flights: List[InjectedFlight], observers: List[RIDSystemObserver],
+    injected_flights: List[InjectedFlight], telemetry_index: _TelemetryIndex,
+    poller: _ConcurrentPoller,
     config: EvaluationConfiguration, findings: Findings, rect: s2sphere.LatLngRect) -> None:
-  for observer in observers:
-    # Conduct an observation, then log and evaluate it
-    (observation, query) = observer.observe_system(rect)
+  # Conduct all observations at the same time
+  observations = poller.observe_system(rect)
+  findings.add_observation_cycle(
+    [observer.name for observer in poller.observers],
+    [query for _, query in observations])
+
+  for observer, (observation, query) in zip(poller.observers, observations):
+    # Log and evaluate each observation
     findings.add_observation_query(query)
-    _evaluate_observation(injected_flights, observer, rect, observation, query,
-                          config, findings)
+    _evaluate_observation(injected_flights, telemetry_index, observer, rect,
+                          observation, query, config, findings)
 
     #TODO: If bounding rect is smaller than cluster threshold, expand slightly above cluster threshold and re-observe
     #TODO: If bounding rect is smaller than area-too-large threshold, expand slightly above area-too-large threshold and re-observe
 
 def _evaluate_observation(
-    injected_flights: List[InjectedFlight], observer: RIDSystemObserver,
+    injected_flights: List[InjectedFlight], telemetry_index: _TelemetryIndex,
+    observer: RIDSystemObserver,
     rect: s2sphere.LatLngRect,
     observation: Optional[observation_api.GetDisplayDataResponse],
     query: fetch.Query, config: EvaluationConfiguration,
@@ -189,12 +322,13 @@ def _evaluate_observation(
   elif diagonal > rid.NetDetailsMaxDisplayAreaDiagonal:
     _evaluate_clusters_observation(findings)
   else:
-    _evaluate_normal_observation(injected_flights, observer, rect,
-                                 observation, query, config, findings)
+    _evaluate_normal_observation(injected_flights, telemetry_index, observer,
+                                 rect, observation, query, config, findings)
 
 
 def _evaluate_normal_observation(
-    injected_flights: List[InjectedFlight], observer: RIDSystemObserver,
+    injected_flights: List[InjectedFlight], telemetry_index: _TelemetryIndex,
+    observer: RIDSystemObserver,
     rect: s2sphere.LatLngRect,
     observation: Optional[observation_api.GetDisplayDataResponse],
     query: fetch.Query, config: EvaluationConfiguration,
@@ -203,17 +337,20 @@ def _evaluate_normal_observation(
     findings.add_observation_failure(observer.name, rect, query)
     return
 
-  for expected_flight in injected_flights:
-    t_initiated = query.request.timestamp
-    t_response = query.response.reported
-    timestamps = [arrow.get(t.timestamp) for t in expected_flight.flight.telemetry]
-    t_min = min(timestamps).datetime
-    t_max = max(timestamps).datetime
+  observed_flights_by_id: Dict[str, List[observation_api.Flight]] = {}
+  for observed_flight in observation.flights:
+    observed_flights_by_id.setdefault(observed_flight.id, []).append(observed_flight)
+
+  t_initiated = query.request.timestamp
+  t_response = query.response.reported
+  for expected_flight, track in zip(injected_flights, telemetry_index.tracks):
+    if track.t_min is None:
+      continue
+    t_min = track.t_min
+    t_max = track.t_max
 
     flight_id = expected_flight.flight.details_responses[0].details.id # TODO: Choose appropriate details rather than first
-    matching_flights = [observed_flight
-                        for observed_flight in observation.flights
-                        if observed_flight.id == flight_id]
+    matching_flights = observed_flights_by_id.get(flight_id, [])
     if len(matching_flights) > 1:
       findings.add_duplicate_flights(observer.name, flight_id, len(matching_flights), expected_flight.uss.name, query)
 
@@ -232,12 +369,54 @@ def _evaluate_normal_observation(
       if not matching_flights:
         findings.add_missing_flight(observer.name, expected_flight, rect, expected_flight.uss.name, query)
         continue
-    elif t_initiated > t_min:
-      # If this flight was not observed, there may be propagation latency
-      pass #TODO: findings propagation latency
 
     for matching_flight in matching_flights:
-      pass #TODO: Check position, altitude, flight details, etc
+      #TODO: Check flight details
+      if 'most_recent_position' in matching_flight and matching_flight.most_recent_position:
+        _evaluate_position(
+          matching_flight.most_recent_position, track, flight_id, observer,
+          expected_flight.uss.name, t_initiated, query, config, findings)
+
+
+def _evaluate_position(
+    position: observation_api.Position, track: _FlightTrack, flight_id: str,
+    observer: RIDSystemObserver, injection_target: str,
+    t_initiated: datetime.datetime, query: fetch.Query,
+    config: EvaluationConfiguration, findings: Findings) -> None:
+  """Compares an observed position with the injected telemetry of its flight.
+
+  The propagation latency is inferred from the time at which the flight was
+  closest to the observed position.
+  """
+  t_obs = t_initiated.timestamp()
+  t_earliest = t_obs - (rid.NetMaxNearRealTimeDataPeriod + config.max_propagation_latency.timedelta).total_seconds()
+  expected_lat, expected_lng, expected_alt = track.position_at(t_obs)
+  x, y = _flatten_arrays(expected_lat, expected_lng, np.array([position.lat]), np.array([position.lng]))
+  horizontal_error = float(np.hypot(x[0], y[0]))
+
+  closest = track.closest_approach(position.lat, position.lng, t_earliest, t_obs)
+  if closest is None:
+    return
+  t_closest, closest_distance = closest
+  latency = t_obs - t_closest
+  altitude_error = None
+  if position.get('alt', None) is not None:
+    altitude_error = position.alt - track.position_at(t_closest)[2]
+
+  findings.add_position_evaluation(
+    observer.name, flight_id, injection_target, t_initiated,
+    horizontal_error, closest_distance, altitude_error, latency)
+
+  if closest_distance > config.max_position_error:
+    findings.add_wrong_position(observer.name, flight_id, closest_distance,
+                                t_initiated, injection_target, query)
+  else:
+    if latency > config.max_propagation_latency.timedelta.total_seconds():
+      findings.add_excessive_latency(observer.name, flight_id, latency,
+                                     t_initiated, injection_target, query)
+    if altitude_error is not None and abs(altitude_error) > config.max_altitude_error:
+      findings.add_wrong_altitude(observer.name, flight_id, altitude_error,
+                                  t_initiated, injection_target, query)
 
 
 def _evaluate_area_to_large_observation(
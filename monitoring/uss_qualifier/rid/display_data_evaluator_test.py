@@ -0,0 +1,93 @@
+"""Unit tests for the display_data_evaluator module using pytest.
+
+Testing can be invoked from the command line using:
+`pytest [test_*|*_test.py file/filepath]`
+"""
+
+import datetime
+import math
+
+from monitoring.monitorlib import geo, rid
+from monitoring.monitorlib.rid_automated_testing.injection_api import TestFlight
+from monitoring.uss_qualifier.rid import display_data_evaluator as dde
+from monitoring.uss_qualifier.rid.utils import EvaluationConfiguration
+
+T0 = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _make_flight(lat0: float, lng0: float, dt0: int, duration: int) -> TestFlight:
+    telemetry = []
+    for i in range(duration):
+        telemetry.append(rid.RIDAircraftState(
+            timestamp=(T0 + datetime.timedelta(seconds=dt0 + i)).isoformat(),
+            timestamp_accuracy=0,
+            position=rid.RIDAircraftPosition(lat=lat0 + i * 1e-5, lng=lng0, alt=100, accuracy_h='HAUnknown', accuracy_v='VAUnknown'),
+            track=0, speed=1, speed_accuracy='SAUnknown', vertical_speed=0))
+    return TestFlight(injection_id='test', telemetry=telemetry, details_responses=[])
+
+
+def _diagonal(rect) -> float:
+    return rect.lo().get_distance(rect.hi()).degrees * geo.EARTH_CIRCUMFERENCE_KM * 1000 / 360
+
+
+def test_get_query_rect():
+    config = EvaluationConfiguration()
+    index = dde._TelemetryIndex([_make_flight(46, 7, 0, 600), _make_flight(46.01, 7.01, 300, 600)])
+    assert index.t_end == T0 + datetime.timedelta(seconds=899)
+
+    # Only the first flight is relevant
+    rect = dde._get_query_rect(index, T0 + datetime.timedelta(seconds=100), config)
+    assert rect.lo().lat().degrees <= 46 + 100e-5 <= rect.hi().lat().degrees
+    assert rect.hi().lng().degrees < 7.01
+
+    # Both flights are relevant
+    rect = dde._get_query_rect(index, T0 + datetime.timedelta(seconds=400), config)
+    assert rect.lo().lng().degrees <= 7 and rect.hi().lng().degrees >= 7.01
+
+    # No flight is relevant yet; the view is expanded to the minimum diagonal
+    rect = dde._get_query_rect(index, T0 - datetime.timedelta(seconds=100), config)
+    assert config.min_query_diagonal <= _diagonal(rect) <= config.min_query_diagonal * 1.02
+
+
+def test_flight_track():
+    track = dde._FlightTrack(_make_flight(46, 7, 0, 600))
+    t0 = T0.timestamp()
+    assert track.t_min == T0
+    assert track.t_max == T0 + datetime.timedelta(seconds=599)
+
+    lat, lng, alt = track.position_at(t0 + 100.5)
+    assert abs(lat - (46 + 100.5e-5)) < 1e-9 and lng == 7 and alt == 100
+
+    # Flight was observed where it was 10 seconds before the observation
+    t_closest, distance = track.closest_approach(46 + 200e-5, 7, t0 + 150, t0 + 210)
+    assert abs(t_closest - (t0 + 200)) < 1e-6
+    assert distance < 1e-6
+
+    # Flight was observed to the side of its track, and the window ends before its closest approach
+    t_closest, distance = track.closest_approach(46 + 300e-5, 7.0001, t0 + 150, t0 + 210)
+    assert t_closest == t0 + 210
+    assert abs(distance - geo.EARTH_CIRCUMFERENCE_M / 360 * 90e-5 * 1.0) < 10
+
+
+def test_closest_approach_on_circular_track():
+    # 50 m radius circle flown in 65 seconds, as generated by the simulator
+    radius = 50 * 360 / geo.EARTH_CIRCUMFERENCE_M
+    telemetry = []
+    for i in range(200):
+        angle = 2 * math.pi * i / 65
+        telemetry.append(rid.RIDAircraftState(
+            timestamp=(T0 + datetime.timedelta(seconds=i)).isoformat(),
+            timestamp_accuracy=0,
+            position=rid.RIDAircraftPosition(lat=46 + radius * math.sin(angle), lng=7 + radius * math.cos(angle) / math.cos(math.radians(46)),
+                                             alt=100, accuracy_h='HAUnknown', accuracy_v='VAUnknown'),
+            track=0, speed=5, speed_accuracy='SAUnknown', vertical_speed=0))
+    track = dde._FlightTrack(TestFlight(injection_id='test', telemetry=telemetry, details_responses=[]))
+    t0 = T0.timestamp()
+
+    # Flight was observed where it was 5 seconds before the observation, which it also was one lap earlier
+    lat, lng, _ = track.position_at(t0 + 145)
+    t_obs = t0 + 150
+    t_earliest = t_obs - (rid.NetMaxNearRealTimeDataPeriod + EvaluationConfiguration().max_propagation_latency.timedelta).total_seconds()
+    t_closest, distance = track.closest_approach(lat, lng, t_earliest, t_obs)
+    assert abs(t_closest - (t0 + 145)) < 1e-6
+    assert distance < 1e-3
@@ -1,10 +1,10 @@
 import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import s2sphere
 
 from monitoring.monitorlib import fetch
-from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.monitorlib.typing import ImplicitDict, StringBasedTimeDelta
 from monitoring.uss_qualifier.rid.utils import InjectedFlight, RIDQualifierTestConfiguration
 from monitoring.uss_qualifier.common_data_definitions import Severity
 
@@ -59,14 +59,97 @@ class Setup(ImplicitDict):
   configuration: RIDQualifierTestConfiguration
   injections: List[fetch.Query] = []
 
+  injection_latencies: Dict[str, float] = {}
+  """Time, in seconds, taken by each injection target to respond to the injection of its flights"""
+
+  effective_flight_start_delay: Optional[StringBasedTimeDelta]
+  """Amount of time actually used between starting the test and commencement of flights"""
+
+
+class ObservationTiming(ImplicitDict):
+  observer: str
+  """Name of the observer queried"""
+
+  initiated_at: str
+  """Time at which the observation request was sent"""
+
+  elapsed_s: float
+  """Time, in seconds, taken by the observer to respond"""
+
+
+class ObservationCycle(ImplicitDict):
+  timings: List[ObservationTiming]
+  """Timing of the observation of each observer polled in this cycle"""
+
+  jitter_s: float
+  """Spread, in seconds, between the earliest and the latest moment at which
+  an observation was initiated in this cycle"""
+
+
+class PositionEvaluation(ImplicitDict):
+  observer: str
+  """Name of the observer through which the flight was observed"""
+
+  injection_target: str
+  """Name of the target into which the flight was injected"""
+
+  flight_id: str
+  """ID of the observed flight"""
+
+  observed_at: str
+  """Time at which the observation request was sent"""
+
+  expected_position_error_m: float
+  """Horizontal distance, in meters, between the observed position and the
+  injected position of the flight when the observation was initiated"""
+
+  track_error_m: float
+  """Horizontal distance, in meters, between the observed position and the
+  closest position occupied by the flight within the propagation latency
+  window"""
+
+  altitude_error_m: Optional[float]
+  """Difference, in meters, between the observed altitude and the injected
+  altitude at the closest position, if an altitude was observed"""
+
+  inferred_latency_s: float
+  """Time, in seconds, between the flight occupying the closest position and
+  the observation being initiated"""
+
 
 class Findings(ImplicitDict):
   issues: List[Issue] = []
   observation_queries: List[fetch.Query] = []
+  observation_cycles: List[ObservationCycle] = []
+  position_evaluations: List[PositionEvaluation] = []
 
   def add_observation_query(self, query: fetch.Query):
     self.observation_queries.append(query)
 
+  def add_observation_cycle(self, observer_names: List[str], queries: List[fetch.Query]) -> None:
+    timings = [ObservationTiming(
+      observer=observer_name,
+      initiated_at=query.request['initiated_at'],
+      elapsed_s=query.response['elapsed_s']) for observer_name, query in zip(observer_names, queries)]
+    t_initiated = [query.request.timestamp for query in queries]
+    jitter = (max(t_initiated) - min(t_initiated)).total_seconds() if t_initiated else 0
+    self.observation_cycles.append(ObservationCycle(timings=timings, jitter_s=jitter))
+
+  def add_position_evaluation(
+      self, observer_name: str, flight_id: str, injection_target: str,
+      t_initiated: datetime.datetime, expected_position_error: float,
+      track_error: float, altitude_error: Optional[float],
+      inferred_latency: float) -> None:
+    self.position_evaluations.append(PositionEvaluation(
+      observer=observer_name,
+      injection_target=injection_target,
+      flight_id=flight_id,
+      observed_at=t_initiated.isoformat(),
+      expected_position_error_m=expected_position_error,
+      track_error_m=track_error,
+      altitude_error_m=altitude_error,
+      inferred_latency_s=inferred_latency))
+
   def add_area_too_large_not_indicated(
       self, observer_name: str, diagonal: float, query: fetch.Query) -> None:
     self.issues.append(Issue(
@@ -94,6 +177,21 @@ class Findings(ImplicitDict):
         flight_count, flight_id, observer_name),
       queries=[query]))
 
+  def add_excessive_latency(
+      self, observer_name: str, flight_id: str, latency: float,
+      t_initiated: datetime.datetime, injection_target: str,
+      query: fetch.Query) -> None:
+    self.issues.append(Issue(
+      test_code='EXCESSIVE_PROPAGATION_LATENCY',
+      severity=Severity.Medium,
+      injection_target=injection_target,
+      observation_source=observer_name,
+      subject=flight_id,
+      summary='Observed position is out of date',
+      details='Flight {} was observed by {} at {} in the position it occupied {:.1f} seconds earlier'.format(
+        flight_id, observer_name, t_initiated, latency),
+      queries=[query]))
+
   def add_lingering_flight(
       self, observer_name: str, flight_id: str, t_max: datetime.datetime,
       t_initiated: datetime.datetime, injection_target: str,
@@ -160,11 +258,91 @@ class Findings(ImplicitDict):
         flight_id, t_min, t_response, observer_name),
       queries=[query]))
 
+  def add_wrong_altitude(
+      self, observer_name: str, flight_id: str, altitude_error: float,
+      t_initiated: datetime.datetime, injection_target: str,
+      query: fetch.Query) -> None:
+    self.issues.append(Issue(
+      test_code='WRONG_ALTITUDE',
+      severity=Severity.Medium,
+      injection_target=injection_target,
+      observation_source=observer_name,
+      subject=flight_id,
+      summary='Observed altitude does not match injected altitude',
+      details='Flight {} was observed by {} at {} with an altitude {:.1f} meters from its injected altitude'.format(
+        flight_id, observer_name, t_initiated, altitude_error),
+      queries=[query]))
+
+  def add_wrong_position(
+      self, observer_name: str, flight_id: str, track_error: float,
+      t_initiated: datetime.datetime, injection_target: str,
+      query: fetch.Query) -> None:
+    self.issues.append(Issue(
+      test_code='WRONG_POSITION',
+      severity=Severity.Medium,
+      injection_target=injection_target,
+      observation_source=observer_name,
+      subject=flight_id,
+      summary='Observed position does not match injected telemetry',
+      details='Flight {} was observed by {} at {} in a position {:.1f} meters from anywhere it was recently injected'.format(
+        flight_id, observer_name, t_initiated, track_error),
+      queries=[query]))
+
   def __repr__(self):
     return '[{} issues in {} observations]'.format(
       len(self.issues), len(self.observation_queries))
 
 
+class InteractionSummary(ImplicitDict):
+  method: str
+  """HTTP method of the request"""
+
+  url: str
+  """URL of the request"""
+
+  initiated_at: str
+  """Time at which the request was sent"""
+
+  status_code: int
+  """HTTP status code of the response (999 if no response was received)"""
+
+  elapsed_s: Optional[float]
+  """Time, in seconds, taken to receive the response"""
+
+  @staticmethod
+  def from_query(query: fetch.Query) -> 'InteractionSummary':
+    return InteractionSummary(
+      method=query.request.get('method', ''),
+      url=query.request.get('url', ''),
+      initiated_at=query.request.get('initiated_at', ''),
+      status_code=query.status_code,
+      elapsed_s=query.response.get('elapsed_s', None))
+
+
+class ProgressEvent(ImplicitDict):
+  event: str
+  """Kind of event: `injected` once test flights are injected, `observation`
+  after each observation of the system, then `finished` or `failed`"""
+
+  observations_completed: int = 0
+  """Number of observations of the system completed so far"""
+
+  issue_count: int = 0
+  """Number of issues found so far"""
+
+  interaction_count: int = 0
+  """Number of observation queries recorded so far"""
+
+  new_issues: List[Issue] = []
+  """Issues found since the previous event, without their queries"""
+
+  new_interactions: List[InteractionSummary] = []
+  """Observation queries recorded since the previous event"""
+
+  message: Optional[str]
+  """Human-readable description of the event, if applicable"""
+
+
 class Report(ImplicitDict):
   setup: Setup
   findings: Findings = Findings()
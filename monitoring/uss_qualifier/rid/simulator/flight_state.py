@@ -1,12 +1,16 @@
 from shapely.geometry import Point, Polygon, LineString
 import shapely.geometry
-from pyproj import Geod, Transformer, Proj
+from pyproj import CRS, Geod, Transformer
+import functools
+import itertools
 import json
+import re
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 import arrow
 import datetime
 from datetime import datetime, timedelta
+import numpy as np
 from monitoring.uss_qualifier.rid.utils import QueryBoundingBox, FlightPoint, GridCellFlight, FlightDetails, FullFlightRecord
 from monitoring.monitorlib.rid import RIDHeight, RIDAircraftState, RIDAircraftPosition, RIDFlightDetails
 from monitoring.uss_qualifier.rid.simulator import operator_flight_details as details_generator
@@ -14,6 +18,68 @@ import os
 import pathlib
 
 
+@functools.lru_cache(maxsize=None)
+def utm_transformer(utm_zone: str, inverse: bool = False) -> Transformer:
+    ''' Returns a (cached) transformer from lat / lon (x = longitude) to the UTM zone specified, or from the UTM zone if inverse. The latitude band letter of the zone, if any, is ignored. '''
+    zone = int(re.match(r'\d+', utm_zone).group(0))
+    wgs84 = CRS('epsg:4326')
+    utm = CRS(proj='utm', zone=zone, ellps='WGS84', datum='WGS84')
+    if inverse:
+        return Transformer.from_crs(utm, wgs84, always_xy=True)
+    return Transformer.from_crs(wgs84, utm, always_xy=True)
+
+
+def make_track(geod: Geod, lngs: np.ndarray, lats: np.ndarray, alt: float, delta_time_secs: int = 1) -> List[FlightPoint]:
+    ''' Builds the points of a closed track from arrays of coordinates, computing the speed and bearing between each point and the next in a single call to the geodesic solver. The last point is considered to be followed by the first one. '''
+    lngs = np.asarray(lngs, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    fwd_azimuth, _, distance = geod.inv(lngs, lats, np.roll(lngs, -1), np.roll(lats, -1))
+    speeds = np.round(np.asarray(distance) / delta_time_secs, 2)
+    bearings = np.where(fwd_azimuth < 0, fwd_azimuth + 360, fwd_azimuth)
+    return [FlightPoint(lat=lat, lng=lng, alt=alt, speed=speed, bearing=bearing)
+            for lat, lng, speed, bearing in zip(lats.tolist(), lngs.tolist(), speeds.tolist(), bearings.tolist())]
+
+
+def make_timestamps(reference_time: datetime, duration: int, time_increment_seconds: int = 1) -> List[str]:
+    ''' Formats the timestamps of each of the `duration` steps following the reference time once, so they can be shared by all flights '''
+    return [(reference_time + timedelta(seconds=(j + 1) * time_increment_seconds)).isoformat() for j in range(duration)]
+
+
+def generate_track_states(track: List[FlightPoint], timestamps: List[str], altitude_agl: float) -> List[RIDAircraftState]:
+    ''' Generates the telemetry of an aircraft flying around a circular track, one track point per timestamp.
+
+    As the last point of a circular track is the same as its first point, the aircraft reports no state at the timestamp it would be at the last point and starts over at the first point on the next timestamp.
+    Positions are shared by all the states reported at the same point of the track.
+    '''
+    track_length = len(track)
+    if track_length == 0:
+        return []
+    step = np.arange(len(timestamps))
+    track_index = step % track_length
+    reported = np.nonzero(track_index != track_length - 1)[0]
+
+    positions = [RIDAircraftPosition(lat=flight_point.lat,
+                                     lng=flight_point.lng,
+                                     alt=flight_point.alt,
+                                     accuracy_h="HAUnkown",
+                                     accuracy_v="VAUnknown",
+                                     extrapolated=False,
+                                     ) for flight_point in track]
+    aircraft_height = RIDHeight(distance=altitude_agl, reference="TakeoffLocation")
+
+    return [RIDAircraftState(
+                timestamp=timestamps[j],
+                operational_status="Airborne",
+                position=positions[i],
+                height=aircraft_height,
+                track=track[i].bearing,
+                speed=track[i].speed,
+                timestamp_accuracy=0.0,
+                speed_accuracy="SA3mps",
+                vertical_speed=0.0)
+            for j, i in zip(reported.tolist(), track_index[reported].tolist())]
+
+
 class AdjacentCircularFlightsSimulator():
 
     ''' A class to generate Flight Paths given a bounding box, this is the main module to generate flight path datasets, the data is generated as latitude / longitude pairs with assoiated with the flights. Additional flight metadata e.g. flight id, altitude, registration number can also be generated '''
@@ -112,8 +178,7 @@ class AdjacentCircularFlightsSimulator():
 
         fwd_azimuth, back_azimuth, adjacent_point_distance_mts = self.geod.inv(first_point.x, first_point.y, second_point.x, second_point.y)
 
-        speed_mts_per_sec = (adjacent_point_distance_mts / delta_time_secs)
-        speed_mts_per_sec = float("{:.2f}".format(speed_mts_per_sec))
+        speed_mts_per_sec = round(adjacent_point_distance_mts / delta_time_secs, 2)
 
         if fwd_azimuth < 0:
             fwd_azimuth = 360 + fwd_azimuth
@@ -123,15 +188,15 @@ class AdjacentCircularFlightsSimulator():
     def utm_converter(self, shapely_shape: shapely.geometry, inverse:bool=False) -> shapely.geometry.shape:
         ''' A helper function to convert from lat / lon to UTM coordinates for buffering. tracks. This is the UTM projection (https://en.wikipedia.org/wiki/Universal_Transverse_Mercator_coordinate_system), we use Zone 33T which encompasses Switzerland, this zone has to be set for each locale / city. Adapted from https://gis.stackexchange.com/questions/325926/buffering-geometry-with-points-in-wgs84-using-shapely '''
 
-        proj = Proj(proj="utm", zone=self.utm_zone, ellps="WGS84", datum="WGS84")
+        transformer = utm_transformer(self.utm_zone, inverse)
 
         geo_interface = shapely_shape.__geo_interface__
         point_or_polygon = geo_interface['type']
         coordinates = geo_interface['coordinates']
         if point_or_polygon == 'Polygon':
-            new_coordinates = [[proj(*point, inverse=inverse) for point in linring] for linring in coordinates]
+            new_coordinates = [list(zip(*transformer.transform(*np.asarray(linring).T))) for linring in coordinates]
         elif point_or_polygon == 'Point':
-            new_coordinates = proj(*coordinates, inverse=inverse)
+            new_coordinates = transformer.transform(*coordinates)
         else:
             raise RuntimeError('Unexpected geo_interface type: {}'.format(point_or_polygon))
 
@@ -162,17 +227,8 @@ class AdjacentCircularFlightsSimulator():
             buffer_shape_utm = center_utm.buffer(50)
             buffered_path = self.utm_converter(buffer_shape_utm, inverse=True)
             altitude = altitude_of_ground_level_wgs_84 + self.altitude_agl  # meters WGS 84
-            flight_points_with_altitude = []
             x, y = buffered_path.exterior.coords.xy
-
-            for coord in range(0, len(x)):
-                cur_coord = coord
-                next_coord = coord + 1
-                next_coord = 0 if next_coord == len(x) else next_coord
-                adjacent_points = [Point(x[cur_coord], y[cur_coord]), Point(x[next_coord], y[next_coord])]
-                flight_speed, bearing  = self.generate_flight_speed_bearing(adjacent_points=adjacent_points, delta_time_secs= 1)
-
-                flight_points_with_altitude.append(FlightPoint(lat = y[coord], lng = x[coord], alt = altitude, speed = flight_speed, bearing = bearing))
+            flight_points_with_altitude = make_track(self.geod, np.asarray(x), np.asarray(y), altitude, delta_time_secs=1)
 
             all_grid_cell_tracks.append(GridCellFlight(bounds = grid_cell, track = flight_points_with_altitude))
 
@@ -200,85 +256,31 @@ class AdjacentCircularFlightsSimulator():
         return flight_details
 
 
-    def generate_rid_state(self, duration):
+    def iter_rid_states(self, duration: int, reference_time: Optional[arrow.Arrow] = None) -> Iterator[FullFlightRecord]:
         '''
 
-        This method generates rid_state objects that can be submitted as flight telemetry
+        This method generates one FullFlightRecord per flight track, with rid_state objects that can be submitted as flight telemetry, so that records can be written out as they are generated rather than all held in memory
 
 
         '''
-        all_flight_telemetry: List[List[RIDAircraftState]] = []
-        flight_track_details = {}  # Develop a index of flight length and their index
-        # Store where on the track the current index is, since the tracks are circular, once the end of the track is reached, the index is reset to 0 to indicate beginning of the track again.
-        flight_current_index = {}
-        # Get the number of flights
-        num_flights = len(self.grid_cells_flight_tracks)
-        time_increment_seconds = 1 # the number of seconds it takes to go from one point to next on the track
-        now = arrow.now()
+        now = arrow.now() if reference_time is None else reference_time
         now_isoformat = now.isoformat()
-        for i in range(num_flights):
-            flight_positions_len = len(self.grid_cells_flight_tracks[i].track)
-
-            # in a circular flight pattern increment direction
-            angle_increment = (360 / flight_positions_len)
-
-            # the resolution of track is 1 degree minimum
-            angle_increment = 1.0 if angle_increment == 0.0 else angle_increment
-
-            if i not in flight_track_details:
-                flight_track_details[i] = {}
-            flight_track_details[i]['track_length'] = flight_positions_len
-            flight_current_index[i] = 0
-            all_flight_telemetry.append([])
-
-        timestamp = now
-        for j in range(duration):
-            timestamp = timestamp.shift(seconds=time_increment_seconds)
-
-            timestamp_isoformat = timestamp.isoformat()
-
-            for k in range(num_flights):
-                list_end = flight_track_details[k]['track_length'] - \
-                    flight_current_index[k]
-
-                if list_end != 1:
-                    flight_point = self.grid_cells_flight_tracks[k].track[flight_current_index[k]]
-                    aircraft_position = RIDAircraftPosition(lat=flight_point.lat,
-                                                            lng=flight_point.lng,
-                                                            alt=flight_point.alt,
-                                                            accuracy_h="HAUnkown",
-                                                            accuracy_v="VAUnknown",
-                                                            extrapolated=False,
-                                                            )
-                    aircraft_height = RIDHeight(distance=self.altitude_agl, reference="TakeoffLocation")
-
-                    rid_aircraft_state = RIDAircraftState(
-                        timestamp=timestamp_isoformat,
-                        operational_status="Airborne",
-                        position=aircraft_position,
-                        height=aircraft_height,
-                        track=flight_point.bearing,
-                        speed=flight_point.speed,
-                        timestamp_accuracy=0.0,
-                        speed_accuracy="SA3mps",
-                        vertical_speed=0.0)
-
-                    all_flight_telemetry[k].append(rid_aircraft_state)
-
-                    flight_current_index[k] += 1
-                else:
-                    flight_current_index[k] = 0
-
-
-        flights = []
-        for m in range(num_flights):
-            flight = FullFlightRecord(
+        timestamps = make_timestamps(now.datetime, duration)
+
+        for m, grid_cell_flight_track in enumerate(self.grid_cells_flight_tracks):
+            yield FullFlightRecord(
                 reference_time=now_isoformat,
-                states=all_flight_telemetry[m],
+                states=generate_track_states(grid_cell_flight_track.track, timestamps, self.altitude_agl),
                 flight_details=self.generate_flight_details(id=str(m), aircraft_type="Helicopter"))
-            flights.append(flight)
 
-        self.flights = flights
+    def generate_rid_state(self, duration):
+        '''
+
+        This method generates rid_state objects that can be submitted as flight telemetry
+
+
+        '''
+        self.flights = list(self.iter_rid_states(duration))
 
 
 class TrackWriter():
@@ -356,9 +358,10 @@ class RIDAircraftStateWriter():
 
     """
 
-    def __init__(self, output_path: str, flights: List[FullFlightRecord], country_code='che') -> None:
+    def __init__(self, output_path: str, flights: Iterable[FullFlightRecord], country_code='che') -> None:
         """ Atleast single flight points array is necessary and a ouptut directory
         Args:
+        flights: The flights to write; this may be a generator (e.g. AdjacentCircularFlightsSimulator.iter_rid_states), in which case each flight is generated just before it is written.
         country_code: An ISO 3166-1 alpha-3 code for a country, this is used to create a sub-directory to store output.
 
         Outputs:
@@ -366,7 +369,7 @@ class RIDAircraftStateWriter():
 
         """
 
-        self.flights = flights
+        self.flights = iter(flights)
         self.country_code = country_code
         self.flight_telemetry_check()
 
@@ -382,7 +385,9 @@ class RIDAircraftStateWriter():
         ''' Check if atleast one track is provided, if no tracks are provided, then RIDAircraftState and Test JSON cannot be generated.'''
 
         # Empty flight points cannot be converted to a Aircraft State, check if the list has
-        if (self.flights):
+        first_flight = next(self.flights, None)
+        if first_flight is not None:
+            self.flights = itertools.chain([first_flight], self.flights)
             return
         else:
             raise ValueError("At least one flight track is necessary to create a AircraftState and a test JSON, please generate the tracks first using AdjacentCircularFlightsSimulator class")
@@ -409,8 +414,7 @@ def generate_aircraft_states():
 
     grid_tracks = my_path_generator.grid_cells_flight_tracks
 
-    my_path_generator.generate_rid_state(duration=30)
-    flights = my_path_generator.flights
+    flights = my_path_generator.iter_rid_states(duration=30)
 
     query_bboxes = my_path_generator.query_bboxes
 
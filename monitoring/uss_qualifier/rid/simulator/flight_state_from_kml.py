@@ -5,16 +5,16 @@ import argparse
 import datetime
 import json
 import math
-import s2sphere
 import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from shapely.geometry import LineString, Point, Polygon
-from monitoring.monitorlib.geo import flatten, unflatten
+import numpy as np
+from monitoring.monitorlib.geo import EARTH_CIRCUMFERENCE_KM
 from monitoring.uss_qualifier.rid.simulator import kml
 from monitoring.uss_qualifier.rid.utils import FlightDetails, FullFlightRecord
 from monitoring.monitorlib.rid import RIDAircraftState, RIDAircraftPosition, RIDFlightDetails, LatLngPoint
-from typing import List
+from typing import List, Tuple
 
 
 STATE_INCREMENT_SECONDS = 1
@@ -58,6 +58,60 @@ def get_track_angle(point1, point2):
             return 360 - abs(angle)
         return angle
 
+class PolygonField(object):
+    """Values (speeds or altitudes) of a set of flattened polygons, interpolated at many points at once.
+
+    The value at a point is the value of the polygon containing the point (or
+    within 0.1 m of it), otherwise the average of the values of all polygons
+    weighted by the inverse of their distance to the point.  The polygons are
+    only built once and distances are computed with numpy.
+    """
+
+    def __init__(self, polygons, all_possible_values):
+        self.values = [float(v) for v in all_possible_values]
+
+        # Edges of all polygons, concatenated; polygon i has the edges from self.starts[i]
+        rings = [np.asarray(polygon, dtype=float)[:, :2] for polygon in polygons]
+        self.starts = np.cumsum([0] + [len(ring) for ring in rings[:-1]])
+        a = np.concatenate(rings) if rings else np.zeros((0, 2))
+        b = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings]) if rings else np.zeros((0, 2))
+        self.ax, self.ay = a[:, 0], a[:, 1]
+        self.by = b[:, 1]
+        self.dx, self.dy = b[:, 0] - self.ax, self.by - self.ay
+        length2 = self.dx * self.dx + self.dy * self.dy
+        self.inv_length2 = np.divide(1, length2, out=np.zeros_like(length2), where=length2 > 0)
+        self.x_per_y = np.divide(self.dx, self.dy, out=np.zeros_like(self.dy), where=self.dy != 0)
+
+    def get_distances(self, points: np.ndarray) -> np.ndarray:
+        """Returns the distance of each point (row) to each polygon (column); 0 inside a polygon."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        px = points[:, 0:1]
+        py = points[:, 1:2]
+        t = np.clip(((px - self.ax) * self.dx + (py - self.ay) * self.dy) * self.inv_length2, 0, 1)
+        edge_distances = np.hypot(px - (self.ax + t * self.dx), py - (self.ay + t * self.dy))
+        # Even-odd rule: count the edges crossed by a ray from the point towards +x
+        crossings = ((self.ay > py) != (self.by > py)) & (px < self.ax + (py - self.ay) * self.x_per_y)
+        inside = np.add.reduceat(crossings, self.starts, axis=1) % 2 == 1
+        return np.where(inside, 0, np.minimum.reduceat(edge_distances, self.starts, axis=1))
+
+    def interpolate(self, points: np.ndarray, round_value=False) -> List[float]:
+        """Returns the interpolated value at each point"""
+        results = []
+        for distances in self.get_distances(points).tolist():
+            closest = min(distances)
+            if closest < 0.1:
+                interpolated_value = self.values[distances.index(closest)]
+            else:
+                dividend = 0
+                divisor = 0
+                for value, distance in zip(self.values, distances):
+                    dividend += value/distance
+                    divisor += 1/distance
+                interpolated_value = dividend / divisor
+            results.append(round(interpolated_value, 2) if round_value else interpolated_value)
+        return results
+
+
 def get_flight_state_vertices(flatten_points, flattened_speed_polygons, all_polygon_speeds):
     """Get flight state vertices at flight distance's m/s interval.
     Args:
@@ -73,13 +127,13 @@ def get_flight_state_vertices(flatten_points, flattened_speed_polygons, all_poly
     points = iter(flatten_points)
     point1 = next(points)
     point2 = next(points)
+    speed_field = PolygonField(flattened_speed_polygons, all_polygon_speeds)
     
     flight_state_vertices = []
     flight_state_speeds = []
     flight_track_angles = []
     while True:
-        flight_distance = get_interpolated_value(
-            point1, flattened_speed_polygons, all_polygon_speeds, round_value=True)
+        flight_distance = speed_field.interpolate(point1, round_value=True)[0]
         flight_state_speeds.append(flight_distance)
         input_coord_gap = get_distance_between_two_points(point1, point2)
         if input_coord_gap <= 0:
@@ -98,9 +152,8 @@ def get_flight_state_vertices(flatten_points, flattened_speed_polygons, all_poly
         if flight_distance < input_coord_gap:
             remaining_flight_distance = input_coord_gap
             while remaining_flight_distance > flight_distance:
-                state_vertex = get_vertex_between_points(point1, point2, flight_distance)
+                state_vertex = _get_vertex_between_points(point1, point2, flight_distance)
                 if state_vertex:
-                    state_vertex = state_vertex.coords[:][0]
                     check_if_vertex_is_correct(point1, point2, state_vertex, flight_distance)
                     flight_state_vertices.append(state_vertex)
                     point1 = state_vertex
@@ -114,9 +167,8 @@ def get_flight_state_vertices(flatten_points, flattened_speed_polygons, all_poly
             if not point2:
                 flight_state_vertices.append(point1)
                 break
-            state_vertex = get_vertex_between_points(point1, point2, remaining_flight_distance)
+            state_vertex = _get_vertex_between_points(point1, point2, remaining_flight_distance)
             if state_vertex:
-                state_vertex = state_vertex.coords[:][0]
                 flight_state_vertices.append(state_vertex)
                 if state_vertex == point2:  # This is the special case when remaining_distance is very close to flight_distance
                     point2 = next(points, None)
@@ -130,18 +182,44 @@ def get_flight_state_vertices(flatten_points, flattened_speed_polygons, all_poly
     return flight_state_vertices, flight_state_speeds, flight_track_angles
 
 
-def get_vertex_between_points(point1, point2, at_distance):
+def _get_vertex_between_points(point1, point2, at_distance) -> Tuple[float, float]:
     """Returns vertex between point1 and point2 at a distance from point1.
     Args:
         point1: First vertex having tuple (x,y) co-ordinates.
         point2: Second vertex having tuple (x,y) co-ordinates.
         at_distance: A distance at which to locate the vertex on the line joining point1 and point2.
     Returns:
-        A Point object.
+        A tuple of (x,y) co-ordinates.
     """
-    line = LineString([point1, point2])
-    new_point = line.interpolate(at_distance)
-    return new_point
+    x1, y1 = point1[:2]
+    x2, y2 = point2[:2]
+    length = math.hypot(x2 - x1, y2 - y1)
+    if at_distance >= length:
+        return (float(x2), float(y2))
+    if at_distance <= 0 or length == 0:
+        return (float(x1), float(y1))
+    fraction = at_distance / length
+    return (x1 + fraction * (x2 - x1), y1 + fraction * (y2 - y1))
+
+
+def _flatten_coordinates(reference_point, coordinates) -> np.ndarray:
+    """Vectorised equivalent of flatten for (lng, lat, ...) coordinates; returns (x, y) rows."""
+    ref_lat, ref_lng = reference_point[0], reference_point[1]
+    coordinates = np.asarray(coordinates, dtype=float)[:, :2]
+    return np.stack([
+        (coordinates[:, 0] - ref_lng) * EARTH_CIRCUMFERENCE_KM * math.cos(math.radians(ref_lat)) * 1000 / 360,
+        (coordinates[:, 1] - ref_lat) * EARTH_CIRCUMFERENCE_KM * 1000 / 360
+    ], axis=1)
+
+
+def _unflatten_points(reference_point, points) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorised equivalent of unflatten; returns arrays of lats and lngs."""
+    ref_lat, ref_lng = reference_point[0], reference_point[1]
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    lats = ref_lat + points[:, 1] * 360 / (EARTH_CIRCUMFERENCE_KM * 1000)
+    lngs = ref_lng + points[:, 0] * 360 / (EARTH_CIRCUMFERENCE_KM * 1000 * math.cos(math.radians(ref_lat)))
+    return lats, lngs
+
 
 def output_coordinates_to_file(flight_state_coords, filename):
     """Writes output of state coordinates to a file.
@@ -204,57 +282,6 @@ def generate_flight_record(
         flight_details=flight_details)
 
 
-def get_flight_polygons_flattened(reference_point, alt_polygons):
-    """Returns flattened altitude polygons."""
-    alt_polygons_flatten = []
-    for input_coordinates in alt_polygons.values():
-        flatten_coordinates = []
-        for coord in input_coordinates:
-            flatten_coordinates.append(flatten(
-                s2sphere.LatLng.from_degrees(*reference_point[:2]),
-                s2sphere.LatLng.from_degrees(coord[1], coord[0])
-            ))
-        alt_polygons_flatten.append(flatten_coordinates)
-
-    return alt_polygons_flatten
-
-
-def get_polygons_distances_from_point(point, polygons):
-    """Returns a list of distances for a point from surrounding polygons.
-    Args:
-        point: A tuple of x,y coordinates.
-        polygons: A list of flattened polygons.
-    Returns:
-        A list of distances in meters.
-    """
-    distances = []
-    for poly in polygons:
-        distances.append(Point(*point).distance(Polygon(poly)))
-    return distances
-
-def get_interpolated_value(point, polygons, all_possible_values, round_value=False):
-    """Returns interpolated value wrt. to the relative distances from surrounding polygons.
-    Args:
-        point: A tuple of flattened x,y point.
-        polygons: A list of flattened polygons.
-        all_possible_values: All surrounding polygons' values. Values can be altitude or speed.
-    Returns:
-        An interpolated value for altitude or speed.
-    """
-    distances = get_polygons_distances_from_point(point, polygons)
-    if min(distances) < 0.1:
-        # less than 1 meter, consider it almost on the polygon.
-        interpolated_value = all_possible_values[distances.index(min(distances))]
-    else:
-        dividend = 0
-        divisor = 0
-        for value, distance in zip(all_possible_values, distances):
-            dividend += value/distance
-            divisor += 1/distance 
-        interpolated_value = dividend / divisor
-    return round(interpolated_value, 2) if round_value else interpolated_value
-
-
 def get_speeds_from_speed_polygons(speed_polygons):
     return [kml.get_polygon_speed(n) for n in list(speed_polygons)]
    
@@ -269,40 +296,28 @@ def get_flight_state_coordinates(flight_details):
             a list of speeds at each point,
             a list of angles at each interval.
     """
-    if flight_details.get('input_coordinates'):
+    if len(flight_details.get('input_coordinates', [])) > 0:
         input_coordinates = get_flight_coordinates(flight_details['input_coordinates'])
     reference_point = input_coordinates[0]
-    
-    flatten_points = []
-    for point in input_coordinates:
-        flatten_points.append(flatten(
-            s2sphere.LatLng.from_degrees(*reference_point[:2]),
-            s2sphere.LatLng.from_degrees(*point[:2])
-        ))
-    
+
+    flatten_points = [tuple(p) for p in _flatten_coordinates(
+        reference_point, flight_details['input_coordinates']).tolist()]
+
     speed_polygons = flight_details['speed_polygons']
-    flattened_speed_polygons = get_flight_polygons_flattened(reference_point, speed_polygons)
+    flattened_speed_polygons = [_flatten_coordinates(reference_point, p) for p in speed_polygons.values()]
     all_polygon_speeds = get_speeds_from_speed_polygons(speed_polygons)
     flight_state_vertices, flight_state_speeds, flight_track_angles = get_flight_state_vertices(
         flatten_points, flattened_speed_polygons, all_polygon_speeds)
-    
+
     alt_polygons = flight_details['alt_polygons']
-    flattened_alt_polygons = get_flight_polygons_flattened(reference_point, alt_polygons)
+    flattened_alt_polygons = [_flatten_coordinates(reference_point, p) for p in alt_polygons.values()]
     all_polygon_alts = [p[0][2] for p in list(alt_polygons.values())]
 
-    flight_state_altitudes = []
-    for point in flight_state_vertices:
-        flight_state_altitudes.append(
-            get_interpolated_value(point, flattened_alt_polygons, all_polygon_alts))
-    flight_state_vertices_unflatten = [unflatten(
-        s2sphere.LatLng.from_degrees(*reference_point[:2]), v) for v in flight_state_vertices]
+    flight_state_altitudes = PolygonField(flattened_alt_polygons, all_polygon_alts).interpolate(flight_state_vertices)
+    lats, lngs = _unflatten_points(reference_point, flight_state_vertices)
 
     # Position Lat, Lng to Lng, Lat order for KML representation.
-    flight_state_coordinates = []
-    for p, alt in zip(flight_state_vertices_unflatten, flight_state_altitudes):
-        flight_state_coordinates.append((
-            p.lng().degrees, p.lat().degrees, alt
-        ))
+    flight_state_coordinates = list(zip(lngs.tolist(), lats.tolist(), flight_state_altitudes))
     return flight_state_coordinates, flight_state_speeds, flight_track_angles
 
 
@@ -315,34 +330,50 @@ def create_output_folder(folder_path):
     if not os.path.isdir(folder_path):
         os.makedirs(folder_path)
 
-def get_flight_records(kml_content, output_folder, debug_mode=False):
-    flight_state_coordinates = {}
+def generate_flight_record_file(flight_name, flight_details, output_folder, debug_mode=False) -> Tuple[str, FullFlightRecord]:
+    """Generates the flight record of a KML folder and writes it into the output folder.
+    Returns:
+        The name of the record and the record.
+    """
+    flight_description = flight_details['description']
+    operator_location = flight_details['operator_location']
+    flight_state_coordinates, flight_state_speeds, flight_track_angles = get_flight_state_coordinates(
+        flight_details)
+    if debug_mode:
+        flight_state_vertices_unflatten = [','.join(map(str, p)) for p in flight_state_coordinates]
+        flight_state_vertices_str = '\n'.join(flight_state_vertices_unflatten)
+        with open(f'{output_folder}/kml_state_{flight_name}.txt', 'w') as text_file:
+            text_file.write(flight_state_vertices_str)
+    flight_record = generate_flight_record(
+        flight_state_coordinates,
+        flight_description,
+        operator_location,
+        flight_state_speeds,
+        flight_track_angles)
+    filename = flight_name.replace('flight: ', '')
+    write_to_json_file(
+        flight_record, filename, output_folder=output_folder)
+    return filename, flight_record
+
+
+def get_flight_records(kml_content, output_folder, debug_mode=False, max_workers=None):
+    """Generates the flight records of all the KML folders, in max_workers processes (by default, one per CPU)."""
     create_output_folder(output_folder)
-    flight_records = {}
-    for flight_name, flight_details in kml_content.items():
-        flight_description = flight_details['description']
-        operator_location = flight_details['operator_location']
-        flight_state_coordinates, flight_state_speeds, flight_track_angles = get_flight_state_coordinates(
-            flight_details)
-        if debug_mode:
-            flight_state_vertices_unflatten = [','.join(map(str, p)) for p in flight_state_coordinates]
-            flight_state_vertices_str = '\n'.join(flight_state_vertices_unflatten)
-            with open(f'{output_folder}/kml_state_{flight_name}.txt', 'w') as text_file:
-                text_file.write(flight_state_vertices_str)
-        flight_record = generate_flight_record(
-            flight_state_coordinates,
-            flight_description,
-            operator_location,
-            flight_state_speeds,
-            flight_track_angles)
-        filename = flight_name.replace('flight: ', '')
-        flight_records.update({filename: flight_record})
-        write_to_json_file(
-            flight_record, filename, output_folder=output_folder)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(kml_content))
+    flight_names = list(kml_content)
+    args = ([kml_content[n] for n in flight_names], [output_folder] * len(flight_names), [debug_mode] * len(flight_names))
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(generate_flight_record_file, flight_names, *args))
+    else:
+        results = list(map(generate_flight_record_file, flight_names, *args))
+    flight_records = dict(results)
     flight_records.update({'is_flight_records_from_kml': True})
     return json.dumps(flight_records)
 
-def main(kml_file, output_folder, debug_mode=None, from_string=False):
+def main(kml_file, output_folder, debug_mode=None, from_string=False, max_workers=None):
     # kml_file = 'monitoring/uss_qualifier/test_data/dcdemo.kml'
     try:
         kml_content = kml.get_kml_content(kml_file, from_string)
@@ -350,7 +381,7 @@ def main(kml_file, output_folder, debug_mode=None, from_string=False):
         print(e)
         return e
     else:
-        return get_flight_records(kml_content, output_folder, debug_mode)
+        return get_flight_records(kml_content, output_folder, debug_mode, max_workers)
 
 def init_argparse() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
@@ -371,6 +402,10 @@ def init_argparse() -> argparse.ArgumentParser:
         "-d", "--debug",
         help='Set Debug to true to generate output coordinates to test in KML.',
         type=bool, default=None)
+    parser.add_argument(
+        "-w", "--workers",
+        help='Number of worker processes generating flight records; defaults to one per CPU.',
+        type=int, default=None)
     return parser
 
 
@@ -386,5 +421,5 @@ if __name__ == '__main__':
         else:
             raise 'Invalid file path.'
         debug_mode = args.debug
-        main(kml_file, args.output_path, debug_mode=debug_mode)
+        main(kml_file, args.output_path, debug_mode=debug_mode, max_workers=args.workers)
 
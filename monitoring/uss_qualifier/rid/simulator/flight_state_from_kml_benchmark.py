@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+# Benchmark of the generation of Flight Records from a KML with many flights.
+import argparse
+import math
+import random
+import tempfile
+import time
+
+from monitoring.uss_qualifier.rid.simulator import flight_state_from_kml
+
+
+def _polygon_coordinates(lng: float, lat: float, half_size: float, alt: float = 0) -> str:
+    corners = [(-1, -1), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+    return ' '.join('{},{},{}'.format(lng + dx * half_size, lat + dy * half_size, alt) for dx, dy in corners)
+
+
+def make_benchmark_kml(flight_count: int, waypoint_count: int = 10, seed: int = 0) -> str:
+    """Returns the content of a KML with the specified number of flights around Bern.
+
+    Each flight has a random path and its own speed and altitude polygons, in
+    the format expected by flight_state_from_kml.
+    """
+    rng = random.Random(seed)
+    folders = []
+    for f in range(flight_count):
+        lng0 = 7.40 + rng.random() * 0.1
+        lat0 = 46.90 + rng.random() * 0.1
+        heading = rng.random() * 2 * math.pi
+        path = []
+        lng, lat = lng0, lat0
+        for _ in range(waypoint_count):
+            heading += rng.uniform(-0.5, 0.5)
+            lng += 0.002 * math.sin(heading)
+            lat += 0.0015 * math.cos(heading)
+            path.append('{},{},0'.format(lng, lat))
+        placemarks = [
+            '<Placemark><name>operator_location</name><Point><coordinates>{},{},0</coordinates></Point></Placemark>'.format(lng0, lat0),
+            '<Placemark><name>path</name><LineString><coordinates>{}</coordinates></LineString></Placemark>'.format(' '.join(path)),
+        ]
+        for i, speed in enumerate((5.0, 12.5, 20.0)):
+            placemarks.append('<Placemark><name>speed: Zone{} ({})</name><Polygon><outerBoundaryIs><LinearRing><coordinates>{}</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>'.format(
+                i, speed, _polygon_coordinates(lng0 + (i - 1) * 0.004, lat0 + (i - 1) * 0.003, 0.002)))
+        for i, alt in enumerate((40, 90, 120)):
+            placemarks.append('<Placemark><name>alt: Zone{}</name><Polygon><outerBoundaryIs><LinearRing><coordinates>{}</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>'.format(
+                i, _polygon_coordinates(lng0 + (1 - i) * 0.005, lat0 + (i - 1) * 0.004, 0.0025, alt)))
+        description = '\n'.join([
+            'id: benchmark{}'.format(f),
+            'accuracy_h: HAUnknown',
+            'accuracy_v: VAUnknown',
+            'speed_accuracy: SAUnknown',
+            'timestamp_accuracy: 0.0',
+            'operator_id: OP-benchmark',
+            'operator_name: Benchmark',
+            'operation_description: Benchmark flight',
+            'registration_number: CHEbenchmark',
+            'serial_number: benchmark-{}'.format(f),
+            'aircraft_type: Helicopter',
+        ])
+        folders.append('<Folder><name>flight: benchmark{}</name><description>{}</description>{}</Folder>'.format(
+            f, description, ''.join(placemarks)))
+
+    return ('<kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>benchmark</name>'
+            '<Folder><name>flights</name>{}</Folder></Document></kml>').format(''.join(folders))
+
+
+def run_benchmark(flight_count: int, max_workers: int) -> float:
+    """Converts a generated KML and returns the time it took, in seconds"""
+    kml_content = make_benchmark_kml(flight_count)
+    with tempfile.TemporaryDirectory() as output_folder:
+        t0 = time.time()
+        flight_state_from_kml.main(kml_content, output_folder, from_string=True, max_workers=max_workers)
+        return time.time() - t0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measures the time taken to generate Flight Records from a KML with many flights.")
+    parser.add_argument("-n", "--flights", help='Number of flights in the KML', type=int, default=200)
+    parser.add_argument("-w", "--workers", help='Number of worker processes', type=int, default=None)
+    args = parser.parse_args()
+    elapsed = run_benchmark(args.flights, args.workers)
+    print('Generated {} flight records in {:.2f}s ({:.1f} flights/s)'.format(args.flights, elapsed, args.flights / elapsed))
@@ -4,29 +4,26 @@ Testing can be invoked from the command line using:
 `pytest [test_*|*_test.py file/filepath]`
 """
 
-from monitoring.uss_qualifier.rid.simulator import flight_state_from_kml as frk
+import json
+
+from monitoring.uss_qualifier.rid.simulator import flight_state_from_kml as frk, kml
+from monitoring.uss_qualifier.rid.simulator.flight_state_from_kml_benchmark import make_benchmark_kml
 
 PACKAGE='monitoring.uss_qualifier.rid.simulator'
 
-def test_get_interpolated_value(mocker):
-    mocker.patch(
-        f'{PACKAGE}.flight_state_from_kml.get_polygons_distances_from_point',
-        return_value=[1.1, 2.0, 3.3, 0.0])
-    result_alt = frk.get_interpolated_value('point', 'polygons', [10,20,30, 40])
-    assert result_alt == 40
-
-    mocker.patch(
-        f'{PACKAGE}.flight_state_from_kml.get_polygons_distances_from_point',
-        return_value=[10, 50, 100])
-    result_alt = frk.get_interpolated_value('point', 'polygons', [10,20,30])
-    assert abs(result_alt - 13.1) < 0.1
-
-    mocker.patch(
-        f'{PACKAGE}.flight_state_from_kml.get_polygons_distances_from_point',
-        return_value=[10, 50, 100])
-    result_alt = frk.get_interpolated_value('point', 'polygons', [140,125,116])
-    assert abs(result_alt - 135.84) < 0.1
-    
+def test_polygon_field_interpolate():
+    # Polygon 2 contains the point
+    polygons = [[(10, 10), (11, 10), (11, 11), (10, 10)], [(-3, -3), (3, -3), (3, 3), (-3, 3), (-3, -3)]]
+    assert frk.PolygonField(polygons, [10, 40]).interpolate([(0, 0)]) == [40]
+
+    # Values are weighted by the inverse of the distances to the polygons (10, 50 and 100)
+    polygons = [[(10, -1), (11, -1), (11, 1), (10, 1), (10, -1)],
+                [(-51, -1), (-50, -1), (-50, 1), (-51, 1), (-51, -1)],
+                [(-1, 100), (1, 100), (1, 101), (-1, 101), (-1, 100)]]
+    assert abs(frk.PolygonField(polygons, [10, 20, 30]).interpolate([(0, 0)])[0] - 13.1) < 0.1
+    assert abs(frk.PolygonField(polygons, [140, 125, 116]).interpolate([(0, 0)], round_value=True)[0] - 135.84) < 0.1
+
+
 def test_get_track_angle():
     # towards straight north
     point1 = (1, 1)
@@ -71,3 +68,43 @@ def test_get_track_angle():
     point1 = (4, -4)
     point2 = (1, -1)
     assert frk.get_track_angle(point1, point2) > 270 and frk.get_track_angle(point1, point2) < 360
+
+
+def test_polygon_field():
+    polygons = [[(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)], [(20, 0), (30, 0), (25, 10), (20, 0)]]
+    field = frk.PolygonField(polygons, [10, 20])
+    points = [(5, 5), (15, 5), (-3, -4), (25, 5), (10, 5)]
+    distances = field.get_distances(points)
+    expected = [[0, 250 ** 0.5], [5, 45 ** 0.5], [5, 545 ** 0.5], [15, 0], [0, 125 ** 0.5]]
+    for point_distances, expected_distances in zip(distances, expected):
+        assert max(abs(d - e) for d, e in zip(point_distances, expected_distances)) < 1e-9
+
+    def weighted(d1, d2):
+        return (10 / d1 + 20 / d2) / (1 / d1 + 1 / d2)
+    interpolated = field.interpolate(points)
+    expected_values = [10, weighted(5, 45 ** 0.5), weighted(5, 545 ** 0.5), 20, 10]
+    assert max(abs(v - e) for v, e in zip(interpolated, expected_values)) < 1e-9
+
+
+def test_get_vertex_between_points():
+    assert frk._get_vertex_between_points((0, 0), (3, 4), 2.5) == (1.5, 2)
+    assert frk._get_vertex_between_points((0, 0), (3, 4), 10) == (3, 4)
+
+
+def test_get_coordinates_from_kml():
+    coordinates = kml.get_coordinates_from_kml(['7.1,46.1,0 7.2,46.2,10\n 7.3,46.3,20 '])
+    assert coordinates.shape == (3, 3)
+    assert coordinates[1].tolist() == [7.2, 46.2, 10]
+    # Omitted altitudes are 0
+    assert kml.get_coordinates_from_kml(['7.1,46.1 7.2,46.2,10']).tolist() == [[7.1, 46.1, 0], [7.2, 46.2, 10]]
+
+
+def test_get_flight_records(tmp_path):
+    kml_content = kml.get_kml_content(make_benchmark_kml(3), from_string=True)
+    flight_records = json.loads(frk.get_flight_records(kml_content, str(tmp_path), max_workers=2))
+    assert flight_records.pop('is_flight_records_from_kml')
+    assert sorted(flight_records) == ['benchmark0', 'benchmark1', 'benchmark2']
+    for filename, flight_record in flight_records.items():
+        assert flight_record['states']
+        with open(tmp_path / '{}.json'.format(filename), 'r') as f:
+            assert json.load(f) == flight_record
@@ -0,0 +1,30 @@
+"""Unit tests for the flight_state module using pytest.
+
+Testing can be invoked from the command line using:
+`pytest [test_*|*_test.py file/filepath]`
+"""
+
+import datetime
+
+from monitoring.uss_qualifier.rid.utils import FlightPoint
+from monitoring.uss_qualifier.rid.simulator import flight_state as fs
+
+
+def test_generate_track_states():
+    track = [FlightPoint(lat=46 + i * 1e-4, lng=7, alt=600, speed=1, bearing=i) for i in range(4)]
+    timestamps = fs.make_timestamps(datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc), 10)
+    assert timestamps[0] == '2022-01-01T00:00:01+00:00'
+
+    states = fs.generate_track_states(track, timestamps, 50)
+    # No state is reported when the aircraft reaches the last point of the track
+    assert [s.timestamp for s in states] == [timestamps[j] for j in (0, 1, 2, 4, 5, 6, 8, 9)]
+    assert [s.track for s in states] == [0, 1, 2, 0, 1, 2, 0, 1]
+    assert states[3].position.lat == track[0].lat
+    assert states[0].height.distance == 50
+
+
+def test_utm_transformer():
+    x, y = fs.utm_transformer('32T').transform(7.4761, 46.9761)
+    lng, lat = fs.utm_transformer('32T', inverse=True).transform(x, y)
+    assert abs(lng - 7.4761) < 1e-9 and abs(lat - 46.9761) < 1e-9
+    assert fs.utm_transformer('32T') is fs.utm_transformer('32T')
@@ -1,12 +1,20 @@
 # Module to parse KML file.
 
 import logging
+from lxml import etree
+import numpy as np
 from pykml import parser
 import re
 
 
 KML_NAMESPACE = {"kml":"http://www.opengis.net/kml/2.2"}
 
+# XPath expressions are compiled once rather than for every element they are evaluated on
+_PLACEMARKS = etree.XPath('.//kml:Placemark', namespaces=KML_NAMESPACE)
+_POLYGONS = etree.XPath('.//kml:Polygon', namespaces=KML_NAMESPACE)
+_OPERATOR_POINTS = etree.XPath('.//kml:Placemark/kml:Point/kml:coordinates', namespaces=KML_NAMESPACE)
+_LINE_STRING_COORDINATES = etree.XPath('.//kml:LineString/kml:coordinates', namespaces=KML_NAMESPACE)
+
 def get_kml_root(kml_obj, from_string=False):
     if from_string:
         content = parser.fromstring(kml_obj)
@@ -28,14 +36,13 @@ def get_folder_details(folder_elem):
     speed_polygons = {}
     alt_polygons = {}
     operator_location = {}
-    coordinates = ''
-    for placemark in folder_elem.xpath('.//kml:Placemark', namespaces=KML_NAMESPACE):
+    coordinates = np.zeros((0, 3))
+    for placemark in _PLACEMARKS(folder_elem):
         placemark_name = str(placemark.name)
-        polygons = placemark.xpath('.//kml:Polygon', namespaces=KML_NAMESPACE)
+        polygons = _POLYGONS(placemark)
 
         if placemark_name == 'operator_location':
-            operator_point = folder_elem.xpath(
-                    './/kml:Placemark/kml:Point/kml:coordinates', namespaces=KML_NAMESPACE)[0]
+            operator_point = _OPERATOR_POINTS(folder_elem)[0]
             if operator_point:
                 operator_point = str(operator_point).split(',')
                 operator_location = {
@@ -54,7 +61,7 @@ def get_folder_details(folder_elem):
                     polygons[0].outerBoundaryIs.LinearRing.coordinates)
                 speed_polygons.update({placemark_name: polygon_coords})
         
-        coords = placemark.xpath('.//kml:LineString/kml:coordinates', namespaces=KML_NAMESPACE)
+        coords = _LINE_STRING_COORDINATES(placemark)
         if coords:
             coordinates = coords
             coordinates = get_coordinates_from_kml(coordinates)
@@ -69,12 +76,20 @@ def get_folder_details(folder_elem):
 
 
 def get_coordinates_from_kml(coordinates):
-    """Returns list of tuples of coordinates.
+    """Returns array of coordinates, one row of (lng, lat, alt) per point.
     Args:
         coordinates: coordinates element from KML.
+    Altitudes omitted in the KML are 0.
     """
-    if coordinates:
-       return [tuple(float(x.strip()) for x in c.split(',')) for c in str(coordinates[0]).split(' ') if c.strip()]
+    if not coordinates:
+        return np.zeros((0, 3))
+    points = str(coordinates[0]).split()
+    component_counts = set(p.count(',') + 1 for p in points)
+    if not component_counts <= {2, 3}:
+        raise ValueError('KML coordinates must have 2 or 3 components: {}'.format(str(coordinates[0])))
+    if component_counts == {3}:
+        return np.array(','.join(points).split(','), dtype=float).reshape(len(points), 3)
+    return np.array([(p.split(',') + ['0'])[0:3] for p in points], dtype=float).reshape(len(points), 3)
 
 
 def get_folder_description(folder_elem):
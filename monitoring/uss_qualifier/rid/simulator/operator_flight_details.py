@@ -2,6 +2,7 @@ from faker import Faker
 import string
 import random
 import uuid
+from typing import Optional
 
 from monitoring.monitorlib.rid_automated_testing.injection_api import OperatorLocation
 
@@ -9,26 +10,33 @@ from monitoring.monitorlib.rid_automated_testing.injection_api import OperatorLo
 class OperatorFlightDataGenerator():
     ''' A class to generate fake data detailing operator name, operation name and operator location, it can be customized for locales and locations '''
 
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        ''' If a seed is provided, the sequence of generated data is deterministic '''
         self.fake = Faker()
+        self.seed = seed
+        self.random = random.Random(seed)
+        if seed is not None:
+            self.fake.seed_instance(seed)
 
     def generate_serial_number(self):
-        return str(uuid.uuid4())
+        if self.seed is None:
+            return str(uuid.uuid4())
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
 
     def generate_registration_number(self, prefix='CHE'):
-        registration_number = prefix + ''.join(random.choices(string.ascii_lowercase + string.digits, k=13))
+        registration_number = prefix + ''.join(self.random.choices(string.ascii_lowercase + string.digits, k=13))
         return registration_number
 
     def generate_operation_description(self):
         operation_description = ["Electricity Grid Inspection", "Wind farm survey", "Solar Panel Inspection", "Traffic Monitoring", "Emergency services / rescue", "Delivery operation, see more details at https://deliveryops.com/operation", "News recording, live event", "Crop spraying / Agricultural Inspection"]
-        return random.choice(operation_description)
+        return self.random.choice(operation_description)
 
     def generate_operator_location(self, centroid):
         operator_location = OperatorLocation(lat=centroid.y, lng=centroid.x)
         return operator_location
 
     def generate_operator_id(self, prefix='OP-'):
-        operator_id = prefix + ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+        operator_id = prefix + ''.join(self.random.choices(string.ascii_lowercase + string.digits, k=8))
         return operator_id
 
     def generate_company_name(self):
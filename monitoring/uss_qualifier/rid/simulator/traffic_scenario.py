@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+# A file to generate large synthetic RID traffic scenarios.
+import argparse
+import json
+import math
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import arrow
+import numpy as np
+import shapely.geometry
+
+from monitoring.monitorlib.typing import ImplicitDict, StringBasedDateTime
+from monitoring.uss_qualifier.rid.simulator import operator_flight_details as details_generator
+from monitoring.uss_qualifier.rid.simulator.flight_state import AdjacentCircularFlightsSimulator, generate_track_states, make_timestamps, make_track, utm_transformer
+from monitoring.uss_qualifier.rid.utils import FLIGHT_RECORDS_CHUNK_SUFFIX, FlightDetails, FullFlightRecord, GridCellFlight
+from monitoring.monitorlib.rid import RIDFlightDetails
+
+
+class ValueRange(ImplicitDict):
+    ''' A range of values from which values are drawn uniformly '''
+
+    min: float
+    max: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.uniform(self.min, self.max, n)
+
+
+class TrafficScenarioConfiguration(ImplicitDict):
+    minx: float
+    """Western edge of the region in which flights take place (degrees longitude)"""
+
+    miny: float
+    """Southern edge of the region in which flights take place (degrees latitude)"""
+
+    maxx: float
+    """Eastern edge of the region in which flights take place (degrees longitude)"""
+
+    maxy: float
+    """Northern edge of the region in which flights take place (degrees latitude)"""
+
+    utm_zone: str
+    """UTM Zone string for the region, see https://en.wikipedia.org/wiki/Universal_Transverse_Mercator_coordinate_system"""
+
+    flight_count: int = 0
+    """Number of flights to generate.  If 0, the number of flights is determined by density."""
+
+    density: float = 10
+    """Number of flights per square kilometer of region, when flight_count is 0"""
+
+    cluster_count: int = 0
+    """If above zero, flights are concentrated around this many randomly-placed hotspots rather than spread uniformly
+    over the region"""
+
+    cluster_radius: float = 500
+    """Standard deviation, in meters, of the distance between flights and the center of their hotspot"""
+
+    radius: ValueRange = ValueRange(min=25, max=150)
+    """Radius, in meters, of the circular track of each flight"""
+
+    speed: ValueRange = ValueRange(min=3, max=20)
+    """Ground speed, in meters per second, of each flight"""
+
+    altitude_agl: ValueRange = ValueRange(min=20, max=120)
+    """Altitude above ground level, in meters, of each flight"""
+
+    altitude_of_ground_level_wgs_84: float = 0
+    """Height of the ground above the WGS84 ellipsoid in the region, in meters"""
+
+    duration: int = 600
+    """Duration of the scenario in seconds; all flights start and end during this time"""
+
+    flight_duration: ValueRange = ValueRange(min=120, max=600)
+    """Duration of each flight in seconds, limited to the duration of the scenario"""
+
+    reference_time: Optional[StringBasedDateTime]
+    """Time at which the scenario starts; defaults to the time of generation.  Together with seed, this makes the
+    generated records fully deterministic."""
+
+    seed: int = 0
+    """Seed of the random number generators used to generate the scenario"""
+
+    flights_per_file: int = 1000
+    """Number of flight records written in each chunk file"""
+
+
+class TrafficScenarioSimulator(AdjacentCircularFlightsSimulator):
+    ''' Generates many circular flights, with random positions, sizes, speeds, altitudes and start times, over a region of any size. '''
+
+    def __init__(self, config: TrafficScenarioConfiguration) -> None:
+        self.config = config
+        super(TrafficScenarioSimulator, self).__init__(
+            minx=config.minx, miny=config.miny, maxx=config.maxx, maxy=config.maxy, utm_zone=config.utm_zone)
+        self.rng = np.random.default_rng(config.seed)
+        self.details_generator = details_generator.OperatorFlightDataGenerator(seed=config.seed)
+
+        self.start_offsets: List[int] = []
+        self.flight_durations: List[int] = []
+        self.altitudes_agl: List[float] = []
+
+    def input_extents_valid(self) -> None:
+        ''' Any non-empty region is suitable for a traffic scenario '''
+        if self.maxx <= self.minx or self.maxy <= self.miny:
+            raise ValueError("The extents provided do not describe a region; min values must be lower than max values")
+
+    def get_flight_count(self) -> int:
+        if self.config.flight_count > 0:
+            return self.config.flight_count
+        box = shapely.geometry.box(self.minx, self.miny, self.maxx, self.maxy)
+        area_km2 = abs(self.geod.geometry_area_perimeter(box)[0]) / 1e6
+        return max(1, int(round(area_km2 * self.config.density)))
+
+    def generate_track_centers(self, flight_count: int) -> np.ndarray:
+        ''' Returns the centers of the flight tracks, in UTM coordinates, as an array of (x, y) rows '''
+        transformer = utm_transformer(self.utm_zone)
+        xs, ys = transformer.transform(
+            np.array([self.minx, self.maxx, self.minx, self.maxx]), np.array([self.miny, self.miny, self.maxy, self.maxy]))
+        lo = np.array([np.min(xs), np.min(ys)])
+        hi = np.array([np.max(xs), np.max(ys)])
+
+        if self.config.cluster_count > 0:
+            hotspots = self.rng.uniform(lo, hi, (self.config.cluster_count, 2))
+            hotspot_index = self.rng.integers(0, self.config.cluster_count, flight_count)
+            centers = hotspots[hotspot_index] + self.rng.normal(0, self.config.cluster_radius, (flight_count, 2))
+            return np.clip(centers, lo, hi)
+        return self.rng.uniform(lo, hi, (flight_count, 2))
+
+    def generate_flight_grid_and_path_points(self, altitude_of_ground_level_wgs_84: Optional[float] = None):
+        ''' Generate a circular track for each flight of the scenario; all tracks are projected back to lat / lon at once '''
+        if altitude_of_ground_level_wgs_84 is None:
+            altitude_of_ground_level_wgs_84 = self.config.altitude_of_ground_level_wgs_84
+        flight_count = self.get_flight_count()
+        centers = self.generate_track_centers(flight_count)
+        radii = self.config.radius.sample(self.rng, flight_count)
+        speeds = self.config.speed.sample(self.rng, flight_count)
+        self.altitudes_agl = self.config.altitude_agl.sample(self.rng, flight_count).tolist()
+
+        max_flight_duration = self.config.duration
+        self.flight_durations = np.clip(
+            np.round(self.config.flight_duration.sample(self.rng, flight_count)), 1, max_flight_duration).astype(int).tolist()
+        self.start_offsets = [int(self.rng.integers(0, max_flight_duration - flight_duration + 1))
+                              for flight_duration in self.flight_durations]
+
+        # One point per second along each circle; the last point of each ring is the same as its first point
+        point_counts = np.maximum(3, np.round(2 * math.pi * radii / speeds)).astype(int)
+        angles = np.concatenate([np.linspace(0, 2 * math.pi, n + 1) for n in point_counts])
+        flight_index = np.repeat(np.arange(flight_count), point_counts + 1)
+        xs = centers[flight_index, 0] + radii[flight_index] * np.sin(angles)
+        ys = centers[flight_index, 1] + radii[flight_index] * np.cos(angles)
+        lngs, lats = utm_transformer(self.utm_zone, inverse=True).transform(xs, ys)
+        lngs = np.asarray(lngs)
+        lats = np.asarray(lats)
+
+        tracks = []
+        ring_ends = np.cumsum(point_counts + 1)
+        for i, (ring_start, ring_end) in enumerate(zip(ring_ends - point_counts - 1, ring_ends)):
+            altitude = altitude_of_ground_level_wgs_84 + self.altitudes_agl[i]
+            ring_lngs = lngs[ring_start:ring_end]
+            ring_lats = lats[ring_start:ring_end]
+            bounds = shapely.geometry.box(ring_lngs.min(), ring_lats.min(), ring_lngs.max(), ring_lats.max())
+            tracks.append(GridCellFlight(bounds=bounds, track=make_track(self.geod, ring_lngs, ring_lats, altitude, delta_time_secs=1)))
+        self.grid_cells_flight_tracks = tracks
+
+    def generate_flight_details(self, id: str, aircraft_type: str, center: Optional[shapely.geometry.Point] = None) -> FlightDetails:
+        ''' Generates details of a flight deterministically (according to the scenario seed), with the operator located at the center of its track '''
+        rid_details = RIDFlightDetails(
+            id=id,
+            serial_number=self.details_generator.generate_serial_number(),
+            operation_description=self.details_generator.generate_operation_description(),
+            operator_location=self.details_generator.generate_operator_location(centroid=center),
+            operator_id=self.details_generator.generate_operator_id(),
+            registration_number=self.details_generator.generate_registration_number())
+
+        return FlightDetails(
+            rid_details=rid_details,
+            aircraft_type=aircraft_type,
+            operator_name=self.details_generator.generate_company_name())
+
+    def iter_rid_states(self, duration: Optional[int] = None, reference_time: Optional[arrow.Arrow] = None) -> Iterator[FullFlightRecord]:
+        ''' Generates one FullFlightRecord per flight of the scenario; each flight only reports states between its start and end '''
+        if duration is None:
+            duration = self.config.duration
+        if reference_time is None:
+            reference_time = arrow.get(self.config.reference_time.datetime) if 'reference_time' in self.config else arrow.now()
+        reference_isoformat = reference_time.isoformat()
+        timestamps = make_timestamps(reference_time.datetime, duration)
+
+        for m, grid_cell_flight_track in enumerate(self.grid_cells_flight_tracks):
+            start = self.start_offsets[m]
+            flight_timestamps = timestamps[start:start + self.flight_durations[m]]
+            yield FullFlightRecord(
+                reference_time=reference_isoformat,
+                states=generate_track_states(grid_cell_flight_track.track, flight_timestamps, self.altitudes_agl[m]),
+                flight_details=self.generate_flight_details(
+                    id='{}-{}'.format(self.config.seed, m), aircraft_type="Helicopter",
+                    center=grid_cell_flight_track.bounds.centroid))
+
+
+def write_flight_record_chunks(flights: Iterator[FullFlightRecord], output_folder: str, flights_per_file: int) -> List[Path]:
+    ''' Writes flight records as they are generated into chunk files containing one JSON FullFlightRecord per line.
+
+    Returns:
+        Paths of the chunk files written.
+    '''
+    os.makedirs(output_folder, exist_ok=True)
+    paths = []
+    f = None
+    try:
+        for i, flight in enumerate(flights):
+            if i % flights_per_file == 0:
+                if f is not None:
+                    f.close()
+                path = Path(output_folder, 'flights_{:05d}{}'.format(len(paths), FLIGHT_RECORDS_CHUNK_SUFFIX))
+                paths.append(path)
+                f = open(path, 'w')
+            f.write(json.dumps(flight))
+            f.write('\n')
+    finally:
+        if f is not None:
+            f.close()
+    return paths
+
+
+def generate_traffic_scenario(config: TrafficScenarioConfiguration, output_folder: str) -> List[Path]:
+    ''' Generates the flights of a scenario and writes them in chunk files in the output folder, which can be used as an aircraft states directory by aircraft_state_replayer '''
+    simulator = TrafficScenarioSimulator(config)
+    simulator.generate_flight_grid_and_path_points()
+    return write_flight_record_chunks(simulator.iter_rid_states(), output_folder, max(1, config.flights_per_file))
+
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION]",
+        description="Generates a synthetic RID traffic scenario."
+    )
+    parser.add_argument(
+        "-c", "--config",
+        help='Path to a JSON file containing a TrafficScenarioConfiguration',
+        type=str, default=None, required=True
+    )
+    parser.add_argument(
+        "-o", "--output-path",
+        help='Folder path to the output',
+        type=str, default=None, required=True
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    parser = init_argparse()
+    args = parser.parse_args()
+    with open(args.config, 'r') as f:
+        config = ImplicitDict.parse(json.load(f), TrafficScenarioConfiguration)
+    paths = generate_traffic_scenario(config, args.output_path)
+    print('Wrote {} flight record files to {}'.format(len(paths), args.output_path))
@@ -0,0 +1,36 @@
+"""Unit tests for the traffic_scenario module using pytest.
+
+Testing can be invoked from the command line using:
+`pytest [test_*|*_test.py file/filepath]`
+"""
+
+from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.uss_qualifier.rid import aircraft_state_replayer
+from monitoring.uss_qualifier.rid.simulator import traffic_scenario as ts
+
+
+def _make_config() -> ts.TrafficScenarioConfiguration:
+    return ImplicitDict.parse({
+        'minx': 7.40, 'miny': 46.90, 'maxx': 7.45, 'maxy': 46.95, 'utm_zone': '32T',
+        'flight_count': 25, 'duration': 60, 'flight_duration': {'min': 20, 'max': 60},
+        'reference_time': '2022-01-01T00:00:00Z', 'seed': 42, 'flights_per_file': 10,
+    }, ts.TrafficScenarioConfiguration)
+
+
+def test_generate_traffic_scenario(tmp_path):
+    config = _make_config()
+    paths = ts.generate_traffic_scenario(config, str(tmp_path / 'a'))
+    assert len(paths) == 3
+
+    records = aircraft_state_replayer.get_full_flight_records(tmp_path / 'a')
+    assert len(records) == 25
+    for record in records:
+        assert 20 <= len(record.states) <= 60
+        for state in record.states:
+            assert 7.39 < state.position.lng < 7.46 and 46.89 < state.position.lat < 46.96
+            assert 3 <= state.speed <= 20.5
+
+    # Same seed produces the same scenario
+    other_paths = ts.generate_traffic_scenario(config, str(tmp_path / 'b'))
+    for path, other_path in zip(paths, other_paths):
+        assert path.read_text() == other_path.read_text()
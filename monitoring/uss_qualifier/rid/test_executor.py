@@ -1,11 +1,16 @@
+import datetime
 import json
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import requests
 
 from monitoring.monitorlib.auth import make_auth_adapter
 from monitoring.monitorlib.infrastructure import DSSTestSession
+from monitoring.monitorlib.typing import StringBasedTimeDelta
 from monitoring.uss_qualifier.rid import display_data_evaluator, reports, aircraft_state_replayer
 from monitoring.uss_qualifier.rid.aircraft_state_replayer import TestHarness, TestBuilder
 from monitoring.uss_qualifier.rid.simulator import flight_state
@@ -13,14 +18,15 @@ from monitoring.uss_qualifier.rid.utils import RIDQualifierTestConfiguration, In
 from monitoring.uss_qualifier.utils import is_url
 
 
-def load_rid_test_definitions(locale: str):
+def load_rid_test_definitions(locale: str, max_workers: int = 1) -> Iterator[FullFlightRecord]:
+  """Returns the flight records of the locale, which are only parsed when consumed"""
   aircraft_states_directory = Path(os.getcwd(), 'rid/test_definitions', locale, 'aircraft_states')
   try:
-    flight_records = aircraft_state_replayer.get_full_flight_records(aircraft_states_directory)
+    flight_records = aircraft_state_replayer.iter_full_flight_records(aircraft_states_directory, max_workers)
   except ValueError:
     print('[RID] No aircraft state files found; generating them via simulator now')
     flight_state.generate_aircraft_states()
-    flight_records = aircraft_state_replayer.get_full_flight_records(aircraft_states_directory)
+    flight_records = aircraft_state_replayer.iter_full_flight_records(aircraft_states_directory, max_workers)
   return flight_records
 
 def validate_configuration(test_configuration: RIDQualifierTestConfiguration):
@@ -31,23 +37,89 @@ def validate_configuration(test_configuration: RIDQualifierTestConfiguration):
     raise ValueError("A valid url for injection_target must be passed")
 
 
+def _get_flight_start_delay(test_configuration: RIDQualifierTestConfiguration,
+                            harnesses: List[TestHarness]) -> datetime.timedelta:
+  """Determines the delay between building test payloads and commencement of flights"""
+  if not test_configuration.adaptive_flight_start_delay:
+    return test_configuration.flight_start_delay.timedelta
+  try:
+    with ThreadPoolExecutor(max_workers=max(1, len(harnesses))) as executor:
+      latencies = list(executor.map(lambda harness: harness.probe_latency(), harnesses))
+  except requests.RequestException as e:
+    print('[RID] Unable to measure injection latency ({}); using configured flight start delay'.format(e))
+    return test_configuration.flight_start_delay.timedelta
+  delay = datetime.timedelta(seconds=test_configuration.injection_latency_margin * max(latencies, default=0))
+  delay = max(delay, test_configuration.min_flight_start_delay.timedelta)
+  return min(delay, test_configuration.flight_start_delay.timedelta)
+
+
+class ProgressTracker(object):
+  """Reports the findings recorded since the previous observation of the system as ProgressEvents"""
+
+  def __init__(self, on_progress: Callable[[reports.ProgressEvent], None]):
+    self._on_progress = on_progress
+    self._observations_completed = 0
+    self._issues_reported = 0
+    self._interactions_reported = 0
+
+  def report(self, event: str, findings: reports.Findings, message: Optional[str] = None) -> None:
+    new_issues = findings.issues[self._issues_reported:]
+    new_queries = findings.observation_queries[self._interactions_reported:]
+    self._issues_reported += len(new_issues)
+    self._interactions_reported += len(new_queries)
+    self._on_progress(reports.ProgressEvent(
+      event=event,
+      observations_completed=self._observations_completed,
+      issue_count=self._issues_reported,
+      interaction_count=self._interactions_reported,
+      new_issues=[reports.Issue(**{k: v for k, v in issue.items() if k != 'queries'}, queries=[])
+                  for issue in new_issues],
+      new_interactions=[reports.InteractionSummary.from_query(query) for query in new_queries],
+      message=message))
+
+  def on_observation(self, findings: reports.Findings) -> None:
+    self._observations_completed += 1
+    self.report('observation', findings)
+
+
 def run_rid_tests(test_configuration: RIDQualifierTestConfiguration,
                   auth_spec: str,
-                  flight_records: List[FullFlightRecord]) -> reports.Report:
+                  flight_records: Iterable[FullFlightRecord],
+                  on_progress: Optional[Callable[[reports.ProgressEvent], None]] = None) -> reports.Report:
+    auth_adapter = make_auth_adapter(auth_spec)
+    harnesses = [TestHarness(
+        auth_spec=auth_spec,
+        injection_base_url=target.injection_base_url,
+        auth_adapter=auth_adapter) for target in test_configuration.injection_targets]
+
+    flight_start_delay = _get_flight_start_delay(test_configuration, harnesses)
     my_test_builder = TestBuilder(test_configuration=test_configuration, flight_records=flight_records)
-    test_payloads = my_test_builder.build_test_payloads()
+    test_payloads = my_test_builder.build_test_payloads(flight_start_delay)
     test_id = str(uuid.uuid4())
-    report = reports.Report(setup=reports.Setup(configuration=test_configuration))
+    report = reports.Report(setup=reports.Setup(
+      configuration=test_configuration,
+      injections=[],
+      injection_latencies={},
+      effective_flight_start_delay=StringBasedTimeDelta(flight_start_delay)))
 
-    # Inject flights into all USSs
+    # Inject flights into all USSs concurrently
+    with ThreadPoolExecutor(max_workers=max(1, len(harnesses))) as executor:
+      queries = list(executor.map(
+        lambda i: harnesses[i].inject_test(test_payloads[i], test_id), range(len(harnesses))))
     injected_flights = []
     for i, target in enumerate(test_configuration.injection_targets):
-      uss_injection_harness = TestHarness(
-        auth_spec=auth_spec,
-        injection_base_url=target.injection_base_url)
-      uss_injection_harness.submit_test(test_payloads[i], test_id, report.setup)
+      report.setup.injections.append(queries[i])
+      report.setup.injection_latencies[target.name] = queries[i].response['elapsed_s']
+    for i, target in enumerate(test_configuration.injection_targets):
+      harnesses[i].check_injection(queries[i], test_id)
       for flight in test_payloads[i].requested_flights:
         injected_flights.append(InjectedFlight(uss=target, flight=flight))
+    print('[RID] Injected flights into {} USSs in {:.3f}s; flights start {}s after test start'.format(
+      len(harnesses), max(report.setup.injection_latencies.values(), default=0), flight_start_delay.total_seconds()))
+    progress = ProgressTracker(on_progress) if on_progress is not None else None
+    if progress is not None:
+      progress.report('injected', report.findings, 'Injected {} flights into {} USSs'.format(
+        len(injected_flights), len(harnesses)))
 
     # Create observers
     observers: List[display_data_evaluator.RIDSystemObserver] = []
@@ -55,13 +127,13 @@ def run_rid_tests(test_configuration: RIDQualifierTestConfiguration,
         observer = display_data_evaluator.RIDSystemObserver(
             observer_config.name, DSSTestSession(
                 observer_config.observation_base_url,
-                make_auth_adapter(auth_spec)))
+                auth_adapter))
         observers.append(observer)
 
     # Evaluate observed RID system states
     display_data_evaluator.evaluate_system(
         injected_flights, observers, test_configuration.evaluation,
-        report.findings)
+        report.findings, progress.on_observation if progress is not None else None)
     with open('../report.json', 'w') as f:
         json.dump(report, f)
     return report
@@ -32,6 +32,14 @@ class EvaluationConfiguration(ImplicitDict):
     repeat_query_rect_period: int = 3
     """If set to a value above zero, reuse the most recent query rectangle/view every this many queries."""
 
+    max_position_error: float = 100
+    """Report observed positions farther than this many meters from any position
+    the flight occupied within the propagation latency window."""
+
+    max_altitude_error: float = 25
+    """Report observed altitudes differing by more than this many meters from the
+    injected altitude."""
+
 
 
 class RIDQualifierTestConfiguration(ImplicitDict):
@@ -44,6 +52,23 @@ class RIDQualifierTestConfiguration(ImplicitDict):
     flight_start_delay: StringBasedTimeDelta = StringBasedTimeDelta('15s')
     """Amount of time between starting the test and commencement of flights"""
 
+    adaptive_flight_start_delay: bool = False
+    """If true, shorten flight_start_delay according to the latency of the
+    injection targets measured just before injecting flights"""
+
+    min_flight_start_delay: StringBasedTimeDelta = StringBasedTimeDelta('5s')
+    """When adaptive_flight_start_delay is true, never start flights sooner
+    than this after starting the test"""
+
+    injection_latency_margin: float = 10
+    """When adaptive_flight_start_delay is true, the effective start delay is
+    this many times the latency of the slowest injection target (bounded by
+    min_flight_start_delay and flight_start_delay)"""
+
+    flight_record_workers: int = 1
+    """Number of worker processes used to parse flight records read from disk;
+    1 parses them in the test process"""
+
     evaluation: EvaluationConfiguration = EvaluationConfiguration()
     """Settings to control behavior when evaluating observed system data"""
 
@@ -80,6 +105,10 @@ class FlightDetails(ImplicitDict):
     aircraft_type: str  # Generic type of aircraft https://github.com/uastech/standards/blob/36e7ea23a010ff91053f82ac4f6a9bfc698503f9/remoteid/canonical.yaml#L1711
 
 
+FLIGHT_RECORDS_CHUNK_SUFFIX = '.jsonl'
+"""Extension of files containing several FullFlightRecords, one JSON record per line"""
+
+
 class FullFlightRecord(ImplicitDict):
     reference_time: str
     states: List[RIDAircraftState]
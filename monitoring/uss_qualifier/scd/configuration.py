@@ -1,9 +1,77 @@
+from enum import Enum
 from typing import List, Optional
 
-from monitoring.monitorlib.typing import ImplicitDict
+from monitoring.monitorlib.typing import ImplicitDict, StringBasedTimeDelta
 from monitoring.uss_qualifier.rid.utils import InjectionTargetConfiguration
 
 
+class ExecutionConfiguration(ImplicitDict):
+    max_concurrent_runs: int = 1
+    """Maximum number of (automated test, target combination) runs to execute
+    at the same time.  1 executes all runs sequentially."""
+
+    max_concurrent_runs_per_target: int = 1
+    """Maximum number of concurrent runs in which the same injection target may
+    be involved."""
+
+    lane_spacing: float = 5000
+    """Distance, in meters, between the areas in which concurrent runs inject
+    their flights.  Each concurrent run is assigned its own lane so that flights
+    from different runs cannot intersect."""
+
+    lane_time_offset: StringBasedTimeDelta = StringBasedTimeDelta('0s')
+    """Additional amount of time by which the flights of each successive lane
+    are shifted."""
+
+
+class TeardownConfiguration(ImplicitDict):
+    max_concurrent_deletions: int = 8
+    """Maximum number of flight deletion requests sent at the same time while
+    cleaning up after a test run"""
+
+    deletion_retries: int = 2
+    """Number of times a flight deletion is retried after a transient failure"""
+
+    retry_delay: StringBasedTimeDelta = StringBasedTimeDelta('1s')
+    """Delay before the first retry of a flight deletion; doubled for each
+    subsequent retry"""
+
+    use_clear_area: bool = False
+    """If true, first ask each target to clear the area covering the flights
+    it manages in a single clear_area_request, and only delete the flights
+    individually if this fails"""
+
+
+class TargetCombinationStrategy(str, Enum):
+    Permutations = 'Permutations'
+    """Every ordered selection of distinct targets for the uss roles of a test"""
+
+    Pairwise = 'Pairwise'
+    """The minimal set of combinations in which each target appears in each
+    role exactly once"""
+
+    CoveringArray = 'CoveringArray'
+    """A set of combinations in which, for every pair of roles, every ordered
+    pair of distinct targets appears at least once"""
+
+    RandomSample = 'RandomSample'
+    """The Pairwise combinations (with targets in a random order) plus
+    additional random permutations, up to sample_size combinations"""
+
+
+class TargetCombinationConfiguration(ImplicitDict):
+    strategy: TargetCombinationStrategy = TargetCombinationStrategy.Permutations
+    """Strategy used to assign injection targets to the uss roles of each
+    automated test"""
+
+    sample_size: int = 0
+    """When using the RandomSample strategy, the number of combinations to
+    run per test.  Never less than the number of Pairwise combinations."""
+
+    seed: int = 0
+    """Seed of the random number generator used by the RandomSample strategy"""
+
+
 class SCDQualifierTestConfiguration(ImplicitDict):
     injection_targets: List[InjectionTargetConfiguration]
     """Set of USS into which data should be injected"""
@@ -11,3 +79,12 @@ class SCDQualifierTestConfiguration(ImplicitDict):
     dss_base_url: Optional[str]
     """Base URL of DSS serving the above targets, or blank to not perform DSS
     checks"""
+
+    execution: ExecutionConfiguration = ExecutionConfiguration()
+    """Settings to control how automated tests are scheduled"""
+
+    teardown: TeardownConfiguration = TeardownConfiguration()
+    """Settings to control how flights are cleaned up after each test run"""
+
+    target_combinations: TargetCombinationConfiguration = TargetCombinationConfiguration()
+    """Settings to control which combinations of targets are tested"""
@@ -1,17 +1,19 @@
 import itertools
 import json
+import math
 import os
+import random
 import typing
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from monitoring.monitorlib.locality import Locality
 from monitoring.monitorlib.typing import ImplicitDict
 from monitoring.uss_qualifier.rid.utils import InjectionTargetConfiguration
-from monitoring.uss_qualifier.scd.configuration import SCDQualifierTestConfiguration
-from monitoring.uss_qualifier.scd.data_interfaces import AutomatedTest, TestStep, AutomatedTestContext
-from monitoring.uss_qualifier.scd.executor.errors import TestRunnerError
-from monitoring.uss_qualifier.scd.executor.runner import TestRunner
+from monitoring.uss_qualifier.scd.configuration import SCDQualifierTestConfiguration, \
+    TargetCombinationConfiguration, TargetCombinationStrategy
+from monitoring.uss_qualifier.scd.data_interfaces import AutomatedTest, TestStep
+from monitoring.uss_qualifier.scd.executor.scheduler import RunScheduler, ScheduledRun, format_combination
 from monitoring.uss_qualifier.scd.executor.target import TestTarget
 from monitoring.uss_qualifier.scd.reports import Report
 from monitoring.uss_qualifier.utils import is_url
@@ -55,9 +57,86 @@ def validate_configuration(test_configuration: SCDQualifierTestConfiguration):
         raise ValueError("A valid url for injection_target must be passed")
 
 
-def combine_targets(targets: List[TestTarget], steps: List[TestStep]) -> typing.Iterator[Dict[str, TestTarget]]:
+def _pairwise_combinations(targets_count: int, roles_count: int) -> List[Tuple[int, ...]]:
+    """Rotations of the targets such that each target is assigned to each role exactly once"""
+    if roles_count == 0:
+        return [()]
+    return [tuple((k + i) % targets_count for i in range(roles_count)) for k in range(targets_count)]
+
+
+def _covering_array_combinations(targets_count: int, roles_count: int) -> List[Tuple[int, ...]]:
+    """Combinations covering, for every pair of roles, every ordered pair of distinct targets.
+
+    Rows are built greedily (one role at a time, choosing the target covering the
+    most uncovered pairs with the roles already assigned in the row) starting
+    from the pairwise rotations, which also guarantees that every target appears
+    in every role.
+    """
+    uncovered = set()
+    for i, j in itertools.combinations(range(roles_count), 2):
+        for a, b in itertools.permutations(range(targets_count), 2):
+            uncovered.add((i, j, a, b))
+
+    def cover(row: Tuple[int, ...]):
+        for i, j in itertools.combinations(range(roles_count), 2):
+            uncovered.discard((i, j, row[i], row[j]))
+
+    rows = _pairwise_combinations(targets_count, roles_count)
+    for row in rows:
+        cover(row)
+    while uncovered:
+        # Seed the row with the first uncovered pair so that every row makes progress
+        i0, j0, a0, b0 = min(uncovered)
+        row: List[Optional[int]] = [None] * roles_count
+        row[i0] = a0
+        row[j0] = b0
+        for role in range(roles_count):
+            if row[role] is not None:
+                continue
+            best_target = None
+            best_score = -1
+            for t in range(targets_count):
+                if t in row:
+                    continue
+                score = 0
+                for other_role, other_target in enumerate(row):
+                    if other_target is None:
+                        continue
+                    if other_role < role:
+                        score += (other_role, role, other_target, t) in uncovered
+                    else:
+                        score += (role, other_role, t, other_target) in uncovered
+                if score > best_score:
+                    best_target, best_score = t, score
+            row[role] = best_target
+        rows.append(tuple(row))
+        cover(tuple(row))
+    return rows
+
+
+def _random_sample_combinations(targets_count: int, roles_count: int, sample_size: int, seed: int) -> List[Tuple[int, ...]]:
+    """Pairwise combinations of randomly-ordered targets, plus distinct random permutations up to sample_size"""
+    rng = random.Random(seed)
+    order = list(range(targets_count))
+    rng.shuffle(order)
+    rows = [tuple(order[t] for t in row) for row in _pairwise_combinations(targets_count, roles_count)]
+    selected = set(rows)
+    target_size = min(sample_size, math.perm(targets_count, roles_count))
+    while len(rows) < target_size:
+        row = tuple(rng.sample(range(targets_count), roles_count))
+        if row not in selected:
+            selected.add(row)
+            rows.append(row)
+    return rows
+
+
+def combine_targets(targets: List[TestTarget], steps: List[TestStep],
+                    config: Optional[TargetCombinationConfiguration] = None) -> typing.Iterator[Dict[str, TestTarget]]:
     """Gets combination of targets assigned to the uss roles specified in steps"""
 
+    if config is None:
+        config = TargetCombinationConfiguration()
+
     injection_steps = filter(lambda step: 'inject_flight' in step, steps)
 
     # Get unique uss roles in injection steps in deterministic order
@@ -70,18 +149,24 @@ def combine_targets(targets: List[TestTarget], steps: List[TestStep]) -> typing.
         raise RuntimeError("A minimum of {} targets have to be configured for this test. Only {} found.".format(uss_roles_count, targets_count))
 
     # Create combinations
-    for t in itertools.permutations(targets, len(uss_roles)):
+    if config.strategy == TargetCombinationStrategy.Permutations:
+        combinations = itertools.permutations(range(targets_count), uss_roles_count)
+    elif config.strategy == TargetCombinationStrategy.Pairwise:
+        combinations = _pairwise_combinations(targets_count, uss_roles_count)
+    elif config.strategy == TargetCombinationStrategy.CoveringArray:
+        combinations = _covering_array_combinations(targets_count, uss_roles_count)
+    elif config.strategy == TargetCombinationStrategy.RandomSample:
+        combinations = _random_sample_combinations(targets_count, uss_roles_count, config.sample_size, config.seed)
+    else:
+        raise NotImplementedError("Unsupported target combination strategy {}".format(config.strategy))
+
+    for t in combinations:
         target_set = {}
         for i, role in enumerate(uss_roles):
-            target_set[role] = t[i]
+            target_set[role] = targets[t[i]]
         yield target_set
 
 
-def format_combination(combination: Dict[str, TestTarget]) -> List[str]:
-    """Returns a string in the form of `uss_role: target_name`"""
-    return list(map(lambda t: "{}: {}".format(t[0], t[1].name), combination.items()))
-
-
 def run_scd_tests(locale: Locality, test_configuration: SCDQualifierTestConfiguration,
                   auth_spec: str) -> bool:
     automated_tests = load_scd_test_definitions(locale)
@@ -96,37 +181,16 @@ def run_scd_tests(locale: Locality, test_configuration: SCDQualifierTestConfigur
             configuration=test_configuration,
     )
 
-    should_exit = False
-    executed_test_run_count = 0
+    runs = []
     for test_id, test in automated_tests.items():
-        if should_exit:
-            break
-        target_combinations = combine_targets(configured_targets, test.steps)
+        target_combinations = combine_targets(configured_targets, test.steps, test_configuration.target_combinations)
         for i, targets_under_test in enumerate(target_combinations):
-            context = AutomatedTestContext(
-                test_id = test_id,
-                test_name = test.name,
-                locale = locale,
-                targets_combination = dict(map(lambda t: (t[0], t[1].name), targets_under_test.items()))
-            )
-            print('[SCD] Starting test combination {}: {} ({}/{}) {}'.format(i+1,  test.name, locale, test_id,
-                format_combination(targets_under_test)))
-
-            runner = TestRunner(context, test, targets_under_test, dss_target, report)
-            try:
-                runner.run_automated_test()
-            except TestRunnerError as e:
-                report.findings.issues.append(e.issue)
-                print("[SCD] TestRunnerError: {} Issue: {} Related interactions: {}".format(e, e.issue.details, e.issue.interactions))
-            finally:
-                runner.teardown()
-
-            executed_test_run_count = executed_test_run_count + 1
-            should_exit = len(report.findings.critical_issues()) > 0
-            if should_exit:
-                print ("[SCD] Critical issues found during test. Interrupting test sequence. {}".format(report.findings))
-                break
+            runs.append(ScheduledRun(test_id=test_id, test=test, combination_index=i, targets=targets_under_test))
+    print('[SCD] Scheduling {} test runs with up to {} concurrent runs'.format(
+        len(runs), test_configuration.execution.max_concurrent_runs))
 
+    scheduler = RunScheduler(test_configuration.execution, locale, dss_target, report, test_configuration.teardown)
+    executed_test_run_count = scheduler.run(runs)
 
     report.save()
 
@@ -136,6 +200,3 @@ def run_scd_tests(locale: Locality, test_configuration: SCDQualifierTestConfigur
 
     # TODO: handle low priority issues.
     return issues_count == 0
-
-
-
@@ -1,4 +1,6 @@
 import uuid
+from typing import Optional
+
 from monitoring.monitorlib import fetch
 from monitoring.uss_qualifier.common_data_definitions import Severity
 from monitoring.uss_qualifier.scd.data_interfaces import KnownIssueFields, FlightInjectionAttempt, AutomatedTestContext
@@ -61,7 +63,7 @@ class ReportRecorder:
         return issue
 
 
-    def capture_deletion_unknown_issue(self, interaction_id: InteractionID, summary: str, details: str, flight_name: str, target_name: str, uss_role: str):
+    def capture_deletion_unknown_issue(self, interaction_id: Optional[InteractionID], summary: str, details: str, flight_name: str, target_name: str, uss_role: str):
         issue = Issue(
                 context=self.context,
                 check_code="unknown",
@@ -72,7 +74,7 @@ class ReportRecorder:
                 details=details,
                 target=target_name,
                 uss_role=uss_role,
-                interactions=[interaction_id]
+                interactions=[interaction_id] if interaction_id else []
             )
         self.report.findings.add_issue(issue)
         return issue
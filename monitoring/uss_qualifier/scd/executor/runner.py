@@ -1,10 +1,16 @@
+import time
 import typing
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from monitoring.monitorlib import fetch, scd
 
 from monitoring.monitorlib.clients.scd_automated_testing import QueryError
 from monitoring.monitorlib.scd_automated_testing.scd_injection_api import InjectFlightResponse
 from monitoring.uss_qualifier.common_data_definitions import Severity
-from monitoring.uss_qualifier.scd.configuration import SCDQualifierTestConfiguration
+from monitoring.uss_qualifier.scd.configuration import SCDQualifierTestConfiguration, TeardownConfiguration
 from monitoring.uss_qualifier.scd.data_interfaces import AutomatedTest, TestStep, FlightInjectionAttempt
 from monitoring.uss_qualifier.scd.executor.errors import TestRunnerError
 from monitoring.uss_qualifier.scd.executor.report_recorder import ReportRecorder
@@ -13,16 +19,24 @@ from monitoring.uss_qualifier.scd.executor.test_steps import inject_flight, dele
 from monitoring.uss_qualifier.scd.reports import Report, Issue, AutomatedTestContext, TestStepReference, TestPhase
 
 
+def _is_transient_failure(query: fetch.Query) -> bool:
+    """Whether a failed query may succeed if attempted again"""
+    status_code = query.status_code
+    return status_code == 429 or status_code >= 500
+
+
 # TODO: Replace print by logging
 class TestRunner:
     """A class to run automated test steps for a specific combination of targets per uss role"""
 
-    def __init__(self, context: AutomatedTestContext, automated_test: AutomatedTest, targets: Dict[str, TestTarget], dss_target: Optional[TestTarget], report: Report):
+    def __init__(self, context: AutomatedTestContext, automated_test: AutomatedTest, targets: Dict[str, TestTarget], dss_target: Optional[TestTarget], report: Report,
+                 teardown_config: Optional[TeardownConfiguration] = None):
         self.context = context
         self.automated_test = automated_test
         self.targets = targets
         self.dss_target = dss_target
         self.report_recorder = ReportRecorder(report, self.context)
+        self.teardown_config = teardown_config if teardown_config is not None else TeardownConfiguration()
 
 
     def get_scd_configuration(self) -> SCDQualifierTestConfiguration:
@@ -39,34 +53,116 @@ class TestRunner:
         """Delete resources created by this test runner."""
         print("[SCD]   Teardown {}".format(self.automated_test.name))
 
+        max_workers = max(1, self.teardown_config.max_concurrent_deletions)
         cleanup_test_step = 0
-        for role, target in self.targets.items():
-            flight_names = target.managed_flights()
-            for flight_name in flight_names:
-                print("[SCD]    - Deleting {} flights for target {}.".format(len(flight_names), target.name))
 
+        if self.teardown_config.use_clear_area:
+            clearances = [(role, target) for role, target in self.targets.items() if target.managed_flights()]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                outcomes = list(executor.map(lambda c: self._clear_area(c[1]), clearances))
+            for (role, target), query in zip(clearances, outcomes):
                 step_ref = TestStepReference(
-                    name="Clean up flight {} in {}".format(flight_name, target.name),
+                    name="Clear test area in {}".format(target.name),
                     index=cleanup_test_step,
                     phase=TestPhase.Cleanup
                 )
-
-                try:
-                    resp, query = target.delete_flight(flight_name)
-                    self.report_recorder.capture_interaction(step_ref, query, 'Remove flight during test cleanup')
-                except QueryError as e:
-                    interaction_id = self.report_recorder.capture_interaction(step_ref, e.query, 'Remove flight during test cleanup')
-                    self.report_recorder.capture_deletion_unknown_issue(
-                                    interaction_id=interaction_id,
-                                    summary="Deletion request for flight {} was unsuccessful".format(flight_name),
-                                    details="Deletion attempt failed with status {}.".format(e.query.status_code),
-                                    flight_name=flight_name,
-                                    target_name=target.name,
-                                    uss_role=role
-                            )
-                    print("[SCD] Error: Unable to delete flight {} during teardown".format(flight_name))
+                if query is not None:
+                    self.report_recorder.capture_interaction(step_ref, query, 'Clear test area during test cleanup')
                 cleanup_test_step = cleanup_test_step + 1
 
+        deletions = [(role, target, flight_name) for role, target in self.targets.items() for flight_name in target.managed_flights()]
+        for role, target in self.targets.items():
+            flight_count = len(target.managed_flights())
+            if flight_count > 0:
+                print("[SCD]    - Deleting {} flights for target {}.".format(flight_count, target.name))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(lambda d: self._delete_flight_with_retries(d[1], d[2]), deletions))
+
+        # Record outcomes in a deterministic order, regardless of the order in which deletions completed
+        for (role, target, flight_name), (queries, error) in zip(deletions, outcomes):
+            step_ref = TestStepReference(
+                name="Clean up flight {} in {}".format(flight_name, target.name),
+                index=cleanup_test_step,
+                phase=TestPhase.Cleanup
+            )
+            interaction_id = None
+            for query in queries:
+                interaction_id = self.report_recorder.capture_interaction(step_ref, query, 'Remove flight during test cleanup')
+            if isinstance(error, QueryError):
+                self.report_recorder.capture_deletion_unknown_issue(
+                                interaction_id=interaction_id,
+                                summary="Deletion request for flight {} was unsuccessful".format(flight_name),
+                                details="Deletion attempt failed with status {} after {} attempts.".format(error.query.status_code, len(queries)),
+                                flight_name=flight_name,
+                                target_name=target.name,
+                                uss_role=role
+                        )
+            elif error is not None:
+                # No response was received (e.g., connection error or timeout), so the flight may still exist
+                self.report_recorder.capture_deletion_unknown_issue(
+                                interaction_id=interaction_id,
+                                summary="Deletion request for flight {} could not be completed".format(flight_name),
+                                details="Deletion attempts failed without a response from the USS: {}".format(error),
+                                flight_name=flight_name,
+                                target_name=target.name,
+                                uss_role=role
+                        )
+            if error is not None:
+                print("[SCD] Error: Unable to delete flight {} during teardown: {}".format(flight_name, error))
+            cleanup_test_step = cleanup_test_step + 1
+
+    def _clear_area(self, target: TestTarget) -> Optional[fetch.Query]:
+        """Attempts to remove all flights managed by target with a single clear area request.
+
+        Failures are not reported as issues since the remaining flights are deleted individually afterwards.
+        """
+        flight_names = target.managed_flights()
+        vol4s = []
+        for step in self.automated_test.steps:
+            if 'inject_flight' in step and step.inject_flight.name in flight_names:
+                op_intent = step.inject_flight.test_injection.operational_intent
+                vol4s.extend(op_intent.volumes + op_intent.off_nominal_volumes)
+        if not vol4s:
+            return None
+        alt_lo, alt_hi = scd.meter_altitude_bounds_of(vol4s)
+        extent = scd.make_vol4(
+            scd.start_of(vol4s), scd.end_of(vol4s), alt_lo, alt_hi,
+            polygon=scd.make_polygon(latlngrect=scd.rect_bounds_of(vol4s)))
+        try:
+            resp, query = target.clear_area(flight_names, extent)
+            return query
+        except QueryError as e:
+            print("[SCD]    - Unable to clear test area in {}; deleting flights individually: {}".format(target.name, e))
+            return e.query
+        except (requests.RequestException, ValueError) as e:
+            # No response was received, or the response could not be parsed
+            print("[SCD]    - Unable to clear test area in {}; deleting flights individually: {}".format(target.name, e))
+            return None
+
+    def _delete_flight_with_retries(self, target: TestTarget, flight_name: str) -> Tuple[List[fetch.Query], Optional[Exception]]:
+        """Deletes a flight, retrying transient failures.
+
+        :return: Queries of every attempt, and the error of the last attempt if the flight could not be deleted
+        """
+        queries = []
+        error = None
+        retries = max(0, self.teardown_config.deletion_retries)
+        for attempt in range(retries + 1):
+            try:
+                resp, query = target.delete_flight(flight_name)
+                queries.append(query)
+                return queries, None
+            except QueryError as e:
+                queries.append(e.query)
+                error = e
+                if not _is_transient_failure(e.query):
+                    break
+            except requests.RequestException as e:
+                error = e
+            if attempt < retries:
+                time.sleep(self.teardown_config.retry_delay.timedelta.total_seconds() * (2 ** attempt))
+        return queries, error
+
     def execute_step(self, step: TestStep, step_index: int):
         target = self.get_target(step)
         if target is None:
@@ -0,0 +1,197 @@
+import copy
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+import arrow
+
+from monitoring.monitorlib import scd
+from monitoring.monitorlib.locality import Locality
+from monitoring.monitorlib.scd import Volume4D
+from monitoring.monitorlib.typing import StringBasedDateTime
+from monitoring.uss_qualifier.scd.configuration import ExecutionConfiguration, TeardownConfiguration
+from monitoring.uss_qualifier.scd.data_interfaces import AutomatedTest, AutomatedTestContext
+from monitoring.uss_qualifier.scd.executor.errors import TestRunnerError
+from monitoring.uss_qualifier.scd.executor.runner import TestRunner
+from monitoring.uss_qualifier.scd.executor.target import TestTarget
+from monitoring.uss_qualifier.scd.reports import Report, Findings
+
+
+class ScheduledRun(NamedTuple):
+    """A single execution of an automated test for one combination of targets"""
+
+    test_id: str
+    test: AutomatedTest
+    combination_index: int
+    targets: Dict[str, TestTarget]
+
+
+def format_combination(combination: Dict[str, TestTarget]) -> List[str]:
+    """Returns a string in the form of `uss_role: target_name`"""
+    return list(map(lambda t: "{}: {}".format(t[0], t[1].name), combination.items()))
+
+
+def offset_volumes(vol4s: List[Volume4D], lat_offset: float, lng_offset: float, dt: timedelta) -> None:
+    """Shifts the specified volumes in place by the specified amount of degrees and time"""
+    for vol4 in vol4s:
+        if 'outline_polygon' in vol4.volume:
+            for vertex in vol4.volume.outline_polygon.vertices:
+                vertex.lat += lat_offset
+                vertex.lng += lng_offset
+        if 'outline_circle' in vol4.volume:
+            vol4.volume.outline_circle.center.lat += lat_offset
+            vol4.volume.outline_circle.center.lng += lng_offset
+        if dt:
+            for field in ('time_start', 'time_end'):
+                if field in vol4:
+                    vol4[field]['value'] = StringBasedDateTime(arrow.get(vol4[field]['value']).datetime + dt)
+
+
+def offset_automated_test(test: AutomatedTest, lane: int, config: ExecutionConfiguration) -> AutomatedTest:
+    """Returns a copy of the automated test with all its flights moved to the specified lane.
+
+    Lane 0 is the original location of the test; lane n is shifted n lane
+    spacings to the north and n lane time offsets into the future.
+    """
+    if lane == 0:
+        return test
+    shifted_test = copy.deepcopy(test)
+    lat_offset = lane * scd.latitude_degrees(config.lane_spacing)
+    dt = lane * config.lane_time_offset.timedelta
+    for step in shifted_test.steps:
+        if 'inject_flight' in step:
+            op_intent = step.inject_flight.test_injection.operational_intent
+            offset_volumes(op_intent.volumes, lat_offset, 0, dt)
+            offset_volumes(op_intent.off_nominal_volumes, lat_offset, 0, dt)
+    return shifted_test
+
+
+class RunScheduler:
+    """Executes automated test runs concurrently while producing the same report as a sequential execution.
+
+    Each run is executed with its own forked targets and its own findings, in a
+    lane (see offset_automated_test) that is not used by any other run executing
+    at the same time.  Findings are merged into the report in the order in which
+    the runs were scheduled, and the sequence is interrupted after the first run
+    which produced critical issues, just like a sequential execution would be.
+    If a run fails with an unexpected exception, runs not yet started are
+    skipped and the exception is raised as soon as the runs in progress end.
+    """
+
+    def __init__(self, config: ExecutionConfiguration, locale: Locality, dss_target: Optional[TestTarget], report: Report,
+                 teardown_config: Optional[TeardownConfiguration] = None):
+        self._config = config
+        self._teardown_config = teardown_config
+        self._locale = locale
+        self._dss_target = dss_target
+        self._report = report
+        self._max_concurrent_runs = max(1, config.max_concurrent_runs)
+        self._lanes = queue.Queue()
+        for lane in range(self._max_concurrent_runs):
+            self._lanes.put(lane)
+        self._target_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._target_slots_lock = threading.Lock()
+        self._first_critical_run: Optional[int] = None
+        self._first_critical_run_lock = threading.Lock()
+        self._aborted = threading.Event()
+
+    def _target_slot(self, target_name: str) -> threading.BoundedSemaphore:
+        with self._target_slots_lock:
+            if target_name not in self._target_slots:
+                self._target_slots[target_name] = threading.BoundedSemaphore(
+                    max(1, self._config.max_concurrent_runs_per_target))
+            return self._target_slots[target_name]
+
+    def run(self, runs: List[ScheduledRun]) -> int:
+        """Executes the runs and merges their findings into the report.
+
+        :return: Number of runs whose findings were included in the report
+        """
+        with ThreadPoolExecutor(max_workers=self._max_concurrent_runs) as executor:
+            futures = [executor.submit(self._execute, i, run) for i, run in enumerate(runs)]
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    for pending in futures:
+                        pending.cancel()
+                    raise future.exception()
+            results = [future.result() for future in futures]
+
+        executed_test_run_count = 0
+        for run, findings in zip(runs, results):
+            if findings is None:
+                break
+            for interaction in findings.interactions:
+                self._report.findings.add_interaction(interaction)
+            for issue in findings.issues:
+                self._report.findings.add_issue(issue)
+            executed_test_run_count += 1
+            if len(findings.critical_issues()) > 0:
+                print("[SCD] Critical issues found during test. Interrupting test sequence. {}".format(self._report.findings))
+                break
+        return executed_test_run_count
+
+    def _should_skip(self, run_index: int) -> bool:
+        """Whether a run is scheduled after a run which already produced critical issues, or after an unexpected error"""
+        if self._aborted.is_set():
+            return True
+        with self._first_critical_run_lock:
+            return self._first_critical_run is not None and run_index > self._first_critical_run
+
+    def _execute(self, run_index: int, run: ScheduledRun) -> Optional[Findings]:
+        if self._should_skip(run_index):
+            return None
+
+        # Acquire target slots in a consistent order to avoid deadlocks between runs
+        slots = [self._target_slot(name) for name in sorted(set(t.name for t in run.targets.values()))]
+        for slot in slots:
+            slot.acquire()
+        lane = self._lanes.get()
+        try:
+            if self._should_skip(run_index):
+                return None
+            try:
+                findings = self._execute_in_lane(run, lane)
+            except Exception:
+                # Stop the sequence just like a sequential execution would
+                self._aborted.set()
+                raise
+            if len(findings.critical_issues()) > 0:
+                with self._first_critical_run_lock:
+                    if self._first_critical_run is None or run_index < self._first_critical_run:
+                        self._first_critical_run = run_index
+            return findings
+        finally:
+            self._lanes.put(lane)
+            for slot in reversed(slots):
+                slot.release()
+
+    def _execute_in_lane(self, run: ScheduledRun, lane: int) -> Findings:
+        test = offset_automated_test(run.test, lane, self._config)
+        targets = {role: target.fork() for role, target in run.targets.items()}
+        findings = Findings(issues=[], interactions=[])
+        run_report = Report(
+            qualifier_version=self._report.qualifier_version,
+            configuration=self._report.configuration,
+            findings=findings,
+        )
+        context = AutomatedTestContext(
+            test_id=run.test_id,
+            test_name=test.name,
+            locale=self._locale,
+            targets_combination=dict(map(lambda t: (t[0], t[1].name), targets.items()))
+        )
+        print('[SCD] Starting test combination {}: {} ({}/{}) {} in lane {}'.format(
+            run.combination_index + 1, test.name, self._locale, run.test_id,
+            format_combination(targets), lane))
+
+        runner = TestRunner(context, test, targets, self._dss_target, run_report, self._teardown_config)
+        try:
+            runner.run_automated_test()
+        except TestRunnerError as e:
+            findings.issues.append(e.issue)
+            print("[SCD] TestRunnerError: {} Issue: {} Related interactions: {}".format(e, e.issue.details, e.issue.interactions))
+        finally:
+            runner.teardown()
+        return findings
@@ -1,22 +1,25 @@
-
-from typing import Dict, Tuple
+import uuid
+from typing import Dict, List, Optional, Tuple
 
 from monitoring.monitorlib import infrastructure, auth, fetch
-from monitoring.monitorlib.clients.scd_automated_testing import create_flight, delete_flight, QueryError
+from monitoring.monitorlib.clients.scd_automated_testing import create_flight, delete_flight, clear_area, QueryError
+from monitoring.monitorlib.scd import Volume4D
 from monitoring.monitorlib.scd_automated_testing.scd_injection_api import InjectFlightResult, \
-    DeleteFlightResult, InjectFlightResponse, DeleteFlightResponse
+    DeleteFlightResult, InjectFlightResponse, DeleteFlightResponse, ClearAreaRequest, ClearAreaResponse
 from monitoring.uss_qualifier.rid.utils import InjectionTargetConfiguration
 from monitoring.uss_qualifier.scd.data_interfaces import FlightInjectionAttempt
 
 class TestTarget:
     """A class managing the state and the interactions with a target"""
 
-    def __init__(self, name: str, config: InjectionTargetConfiguration, auth_spec: str):
+    def __init__(self, name: str, config: InjectionTargetConfiguration, auth_spec: str,
+                 auth_adapter: Optional[infrastructure.AuthAdapter] = None):
         self.name = name
         self.config = config
+        self.auth_spec = auth_spec
         self.client = infrastructure.DSSTestSession(
             self.config.injection_base_url,
-            auth.make_auth_adapter(auth_spec))
+            auth_adapter if auth_adapter is not None else auth.make_auth_adapter(auth_spec))
 
         # Flights injected by this target.
         # Key: flight name
@@ -28,6 +31,11 @@ class TestTarget:
         return "TestTarget({}, {})".format(self.name, self.config.injection_base_url)
 
 
+    def fork(self) -> 'TestTarget':
+        """Returns a new target for the same USS, sharing this target's credentials but managing no flights"""
+        return TestTarget(self.name, self.config, self.auth_spec, self.client.auth_adapter)
+
+
     def inject_flight(self, flight_request: FlightInjectionAttempt) -> Tuple[InjectFlightResponse, fetch.Query, str]:
         flight_id, resp, query = create_flight(self.client, self.config.injection_base_url, flight_request.test_injection)
 
@@ -51,6 +59,20 @@ class TestTarget:
         return resp, query
 
 
+    def clear_area(self, flight_names: List[str], extent: Volume4D) -> Tuple[ClearAreaResponse, fetch.Query]:
+        """Requests the target to remove all its flights in the extent, which must contain the specified flights"""
+        req = ClearAreaRequest(request_id=str(uuid.uuid4()), extent=extent)
+        resp, query = clear_area(self.client, self.config.injection_base_url, req)
+
+        if resp.outcome.get('success', False):
+            for flight_name in flight_names:
+                self.created_flight_ids.pop(flight_name, None)
+        else:
+            raise QueryError("Unable to clear area. Message: {}".format(resp.outcome.get("message", None)), query)
+
+        return resp, query
+
+
     def managed_flights(self):
         """Get flight names managed by this test target"""
         return list(self.created_flight_ids.keys())
@@ -1,8 +1,11 @@
+import itertools
+
 from monitoring.monitorlib.scd_automated_testing.scd_injection_api import InjectFlightRequest,  InjectFlightResult
 from monitoring.uss_qualifier.rid.utils import InjectionTargetConfiguration
 from monitoring.uss_qualifier.scd.data_interfaces import AutomatedTest, TestStep, FlightInjectionAttempt, \
     InjectionTarget, FlightDeletionAttempt, KnownResponses
-from monitoring.uss_qualifier.scd.executor.executor import combine_targets
+from monitoring.uss_qualifier.scd.configuration import TargetCombinationConfiguration, TargetCombinationStrategy
+from monitoring.uss_qualifier.scd.executor.executor import combine_targets, format_combination
 from monitoring.uss_qualifier.scd.executor.target import TestTarget
 
 # Constants
@@ -75,3 +78,55 @@ def test_target_combinations():
     assert targets_under_test[1][FirstMoverRole].name == "uss_unit_test_2"
     assert targets_under_test[1][SecondMoverRole].name == "uss_unit_test_1"
 
+
+
+def _make_targets(count: int):
+    return [TestTarget('uss{}'.format(i), InjectionTargetConfiguration(
+        name='uss{}'.format(i), injection_base_url='http://uss{}.localutm/scdsc'.format(i)), "NoAuth()")
+        for i in range(count)]
+
+
+def _make_steps(roles_count: int):
+    return [TestStep(
+        name="Inject Flight {}".format(i),
+        inject_flight=FlightInjectionAttempt(
+            name="f{}".format(i),
+            test_injection=InjectFlightRequest(operational_intent=None, flight_authorisation=None),
+            known_responses=KnownResponses(acceptable_results=[InjectFlightResult.Planned], incorrect_result_details={}),
+            injection_target=InjectionTarget(uss_role="Role {}".format(i))
+        )) for i in range(roles_count)]
+
+
+def _assert_every_target_in_every_role(combinations, targets, roles_count):
+    for i in range(roles_count):
+        assert set(c["Role {}".format(i)].name for c in combinations) == set(t.name for t in targets)
+    for c in combinations:
+        assert len(set(t.name for t in c.values())) == roles_count
+
+
+def test_pairwise_target_combinations():
+    targets = _make_targets(6)
+    combinations = list(combine_targets(targets, _make_steps(3), TargetCombinationConfiguration(strategy=TargetCombinationStrategy.Pairwise)))
+    assert len(combinations) == 6
+    _assert_every_target_in_every_role(combinations, targets, 3)
+
+
+def test_covering_array_target_combinations():
+    targets = _make_targets(6)
+    roles_count = 3
+    combinations = list(combine_targets(targets, _make_steps(roles_count), TargetCombinationConfiguration(strategy=TargetCombinationStrategy.CoveringArray)))
+    assert len(combinations) < len(list(combine_targets(targets, _make_steps(roles_count))))
+    _assert_every_target_in_every_role(combinations, targets, roles_count)
+    for i, j in itertools.combinations(range(roles_count), 2):
+        pairs = set((c["Role {}".format(i)].name, c["Role {}".format(j)].name) for c in combinations)
+        assert pairs == set((a.name, b.name) for a, b in itertools.permutations(targets, 2))
+
+
+def test_random_sample_target_combinations():
+    targets = _make_targets(6)
+    config = TargetCombinationConfiguration(strategy=TargetCombinationStrategy.RandomSample, sample_size=20, seed=42)
+    combinations = list(combine_targets(targets, _make_steps(3), config))
+    assert len(combinations) == 20
+    assert len(set(tuple(t.name for t in c.values()) for c in combinations)) == 20
+    _assert_every_target_in_every_role(combinations, targets, 3)
+    assert [format_combination(c) for c in combinations] == [format_combination(c) for c in combine_targets(targets, _make_steps(3), config)]
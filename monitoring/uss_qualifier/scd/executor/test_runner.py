@@ -0,0 +1,134 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+import requests
+
+from monitoring.monitorlib import fetch
+from monitoring.monitorlib.clients.scd_automated_testing import QueryError
+from monitoring.monitorlib.locality import Locality
+from monitoring.monitorlib.typing import StringBasedTimeDelta
+from monitoring.uss_qualifier.scd.configuration import SCDQualifierTestConfiguration, TeardownConfiguration
+from monitoring.uss_qualifier.scd.data_interfaces import AutomatedTestContext
+from monitoring.uss_qualifier.scd.executor.executor import get_automated_tests
+from monitoring.uss_qualifier.scd.executor import runner as scd_runner
+from monitoring.uss_qualifier.scd.reports import Report, Findings
+
+TEST_DEFINITIONS = Path(__file__).parent.parent / 'test_definitions' / 'CHE'
+TEST_ID = 'astm-strategic-coordination/nominal-planning-1'
+
+
+def _query(status_code: Optional[int]) -> fetch.Query:
+    return fetch.Query({
+        'request': {'method': 'DELETE', 'url': 'https://uss.example.com/v1/flights/flight'},
+        'response': {'code': status_code},
+    })
+
+
+class _FakeTarget:
+    """Test target returning predefined outcomes instead of sending requests"""
+
+    def __init__(self, name: str, deletion_outcomes: Dict[str, List], clear_area_outcome=None):
+        self.name = name
+        self.created_flight_ids = {flight_name: flight_name for flight_name in deletion_outcomes}
+        self.deletion_outcomes = deletion_outcomes
+        self.clear_area_outcome = clear_area_outcome
+        self.deletion_attempts: List[str] = []
+
+    def managed_flights(self):
+        return list(self.created_flight_ids.keys())
+
+    def delete_flight(self, flight_name: str):
+        self.deletion_attempts.append(flight_name)
+        outcome = self.deletion_outcomes[flight_name].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        del self.created_flight_ids[flight_name]
+        return None, _query(outcome)
+
+    def clear_area(self, flight_names, extent):
+        if isinstance(self.clear_area_outcome, Exception):
+            raise self.clear_area_outcome
+        for flight_name in flight_names:
+            self.created_flight_ids.pop(flight_name, None)
+        return None, _query(200)
+
+
+def _make_runner(targets: Dict[str, _FakeTarget], teardown_config: TeardownConfiguration) -> scd_runner.TestRunner:
+    test = get_automated_tests(TEST_DEFINITIONS, '')[TEST_ID]
+    context = AutomatedTestContext(
+        test_id=TEST_ID,
+        test_name=test.name,
+        locale=Locality.CHE,
+        targets_combination={role: target.name for role, target in targets.items()})
+    report = Report(
+        qualifier_version='test',
+        configuration=SCDQualifierTestConfiguration(injection_targets=[]),
+        findings=Findings(issues=[], interactions=[]))
+    return scd_runner.TestRunner(context, test, targets, None, report, teardown_config)
+
+
+def _injected_flight_names(uss_role: str) -> List[str]:
+    test = get_automated_tests(TEST_DEFINITIONS, '')[TEST_ID]
+    return [step.inject_flight.name for step in test.steps
+            if 'inject_flight' in step and step.inject_flight.injection_target.uss_role == uss_role]
+
+
+@pytest.mark.parametrize('clear_area_outcome', [
+    None,
+    QueryError('Unable to clear area', _query(500)),
+    requests.ConnectionError('Connection refused'),
+    ValueError('Required field "outcome" not specified in ClearAreaResponse'),
+])
+def test_teardown_clear_area(clear_area_outcome):
+    flight_names = _injected_flight_names('First-Mover USS')
+    assert flight_names
+    target = _FakeTarget('uss1', {flight_name: [200] for flight_name in flight_names}, clear_area_outcome)
+    runner = _make_runner({'First-Mover USS': target}, TeardownConfiguration(use_clear_area=True))
+
+    runner.teardown()
+
+    assert not target.managed_flights()
+    findings = runner.report_recorder.report.findings
+    assert not findings.issues
+    if clear_area_outcome is None:
+        # Clearing the area removed every flight
+        assert not target.deletion_attempts
+        assert len(findings.interactions) == 1
+    else:
+        # Flights are deleted individually when the area could not be cleared
+        assert target.deletion_attempts == flight_names
+        clear_area_interactions = 1 if isinstance(clear_area_outcome, QueryError) else 0
+        assert len(findings.interactions) == clear_area_interactions + len(flight_names)
+
+
+def test_teardown_retries(mocker):
+    sleep = mocker.patch('monitoring.uss_qualifier.scd.executor.runner.time.sleep')
+    target1 = _FakeTarget('uss1', {
+        'transient': [QueryError('Unavailable', _query(503)), QueryError('Too many requests', _query(429)), 200],
+        'rejected': [QueryError('Bad request', _query(400))],
+    })
+    target2 = _FakeTarget('uss2', {
+        'unreachable': [requests.ConnectionError('Connection refused')] * 3,
+        'failed': [QueryError('Unable to delete flight', _query(200))],
+    })
+    teardown_config = TeardownConfiguration(deletion_retries=2, retry_delay=StringBasedTimeDelta('1s'))
+    runner = _make_runner({'First-Mover USS': target1, 'Second USS': target2}, teardown_config)
+
+    runner.teardown()
+
+    assert target1.deletion_attempts.count('transient') == 3
+    assert target2.deletion_attempts.count('unreachable') == 3
+    # Failures which are not transient are not retried
+    assert target1.deletion_attempts.count('rejected') == 1
+    assert target2.deletion_attempts.count('failed') == 1
+    # Delays double with each retry
+    assert sorted(call.args[0] for call in sleep.call_args_list) == [1, 1, 2, 2]
+
+    findings = runner.report_recorder.report.findings
+    assert sorted(issue.target for issue in findings.issues) == ['uss1', 'uss2', 'uss2']
+    assert all(issue.uss_role in ('First-Mover USS', 'Second USS') for issue in findings.issues)
+    # Every attempt which received a response is recorded, in the order of the flights
+    assert len(findings.interactions) == 3 + 1 + 1
+    assert [i.test_step.name for i in findings.interactions] == \
+           ['Clean up flight transient in uss1'] * 3 + ['Clean up flight rejected in uss1', 'Clean up flight failed in uss2']
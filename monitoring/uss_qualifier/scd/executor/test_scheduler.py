@@ -0,0 +1,56 @@
+import time
+from pathlib import Path
+
+import arrow
+import pytest
+
+from monitoring.monitorlib import scd
+from monitoring.uss_qualifier.scd.configuration import ExecutionConfiguration
+from monitoring.uss_qualifier.scd.executor.executor import get_automated_tests
+from monitoring.uss_qualifier.scd.executor.scheduler import RunScheduler, ScheduledRun, offset_automated_test
+from monitoring.monitorlib.typing import StringBasedTimeDelta
+
+TEST_DEFINITIONS = Path(__file__).parent.parent / 'test_definitions' / 'CHE'
+
+
+def test_offset_automated_test():
+    test = get_automated_tests(TEST_DEFINITIONS, '')['astm-strategic-coordination/nominal-planning-1']
+    config = ExecutionConfiguration(lane_spacing=2000, lane_time_offset=StringBasedTimeDelta('10m'))
+
+    assert offset_automated_test(test, 0, config) is test
+
+    shifted = offset_automated_test(test, 2, config)
+    for step, shifted_step in zip(test.steps, shifted.steps):
+        if 'inject_flight' not in step:
+            continue
+        vol4s = step.inject_flight.test_injection.operational_intent.volumes
+        shifted_vol4s = shifted_step.inject_flight.test_injection.operational_intent.volumes
+        original_rect = scd.rect_bounds_of(vol4s)
+        shifted_rect = scd.rect_bounds_of(shifted_vol4s)
+        assert abs(shifted_rect.lat_lo().degrees - original_rect.lat_lo().degrees - scd.latitude_degrees(4000)) < 1e-9
+        assert abs(shifted_rect.lng_lo().degrees - original_rect.lng_lo().degrees) < 1e-9
+        dt = arrow.get(shifted_vol4s[0].time_start.value) - arrow.get(vol4s[0].time_start.value)
+        assert dt.total_seconds() == 20 * 60
+        assert not scd.vol4s_intersect(vol4s, shifted_vol4s)
+
+
+class _FailingScheduler(RunScheduler):
+    def __init__(self, *args, **kwargs):
+        super(_FailingScheduler, self).__init__(*args, **kwargs)
+        self.executed = []
+
+    def _execute_in_lane(self, run, lane):
+        self.executed.append(run.combination_index)
+        if run.combination_index == 0:
+            raise RuntimeError('Unexpected failure')
+        time.sleep(0.1)
+
+
+def test_scheduler_stops_after_unexpected_error():
+    config = ExecutionConfiguration(max_concurrent_runs=2)
+    scheduler = _FailingScheduler(config, None, None, None)
+    runs = [ScheduledRun(test_id='test', test=None, combination_index=i, targets={}) for i in range(10)]
+    with pytest.raises(RuntimeError):
+        scheduler.run(runs)
+    # Only the runs started before the failure were executed
+    assert len(scheduler.executed) <= 2
@@ -7,6 +7,8 @@ ENV_KEY_AUTH = '{}_AUTH_SPEC'.format(ENV_KEY_PREFIX)
 ENV_KEY_REDIS_URL = '{}_REDIS_URL'.format(ENV_KEY_PREFIX)
 ENV_KEY_USS_QUALIFIER_HOST_URL = '{}_HOST_URL'.format(ENV_KEY_PREFIX)
 ENV_KEY_USS_QUALIFIER_HOST_PORT = '{}_HOST_PORT'.format(ENV_KEY_PREFIX)
+ENV_KEY_RESULT_CACHE_MAX_BYTES = '{}_RESULT_CACHE_MAX_BYTES'.format(ENV_KEY_PREFIX)
+ENV_KEY_REPORT_CACHE_MAX_AGE = '{}_REPORT_CACHE_MAX_AGE'.format(ENV_KEY_PREFIX)
 
 workspace_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'workspace')
 
@@ -15,11 +17,19 @@ KEY_REDIS_URL = 'REDIS_URL'
 KEY_USS_QUALIFIER_HOST_URL = 'USS_QUALIFIER_HOST_URL'
 KEY_FILE_PATH = 'FILE_PATH'
 KEY_USS_QUALIFIER_HOST_PORT = 'USS_QUALIFIER_HOST_PORT'
+KEY_RESULT_CACHE_PATH = 'RESULT_CACHE_PATH'
+KEY_RESULT_CACHE_MAX_BYTES = 'RESULT_CACHE_MAX_BYTES'
+KEY_REPORT_CACHE_MAX_AGE = 'REPORT_CACHE_MAX_AGE'
 
 class Config(object):
     AUTH_SPEC = os.environ[ENV_KEY_AUTH]
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'a-test-secret-string'
     FILE_PATH = '/app/uss-host-files'
+    # Results of background jobs are cached by content; 0 disables the cache
+    RESULT_CACHE_PATH = f'{FILE_PATH}/result_cache'
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get(ENV_KEY_RESULT_CACHE_MAX_BYTES, 512 * 1024 * 1024))
+    # Test reports reflect the state of the tested systems, so they are only reused when enabled, for a limited time (seconds)
+    REPORT_CACHE_MAX_AGE = int(os.environ.get(ENV_KEY_REPORT_CACHE_MAX_AGE, 0))
     os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
     REDIS_QUEUE = 'qualifer-tasks'
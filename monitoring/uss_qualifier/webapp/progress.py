@@ -0,0 +1,77 @@
+import json
+from typing import Iterator
+
+from redis import Redis
+
+from monitoring.uss_qualifier.rid.reports import ProgressEvent
+
+
+# Progress events of a job are kept for this long (seconds) after the last one is published
+EVENTS_TTL = 24 * 60 * 60
+
+# Interval (seconds) at which an idle event stream is checked and kept alive
+KEEPALIVE_INTERVAL = 15
+
+FINAL_EVENTS = {'finished', 'failed'}
+
+
+def _events_key(job_id: str) -> str:
+    return f'uss_qualifier:progress:{job_id}:events'
+
+
+def _channel(job_id: str) -> str:
+    return f'uss_qualifier:progress:{job_id}'
+
+
+class ProgressPublisher(object):
+    """Publishes the progress events of a job to Redis.
+
+    Events are appended to a list, so that clients connecting late still
+    receive the whole history of the job, and a notification is published on
+    the job's channel so that connected clients fetch them immediately.
+    """
+
+    def __init__(self, connection: Redis, job_id: str):
+        self._connection = connection
+        self._job_id = job_id
+
+    def __call__(self, event: ProgressEvent) -> None:
+        key = _events_key(self._job_id)
+        pipeline = self._connection.pipeline()
+        pipeline.rpush(key, json.dumps(event))
+        pipeline.expire(key, EVENTS_TTL)
+        pipeline.publish(_channel(self._job_id), event.event)
+        pipeline.execute()
+
+
+def publish(connection: Redis, job_id: str, event: str, message: str = '') -> None:
+    ProgressPublisher(connection, job_id)(ProgressEvent(event=event, message=message))
+
+
+def iter_events(connection: Redis, job_id: str, is_job_active) -> Iterator[str]:
+    """Yields the JSON progress events of a job as they are published, until its final event.
+
+    :param is_job_active: Called when no event was published for a while; the stream ends if it returns False
+    """
+    key = _events_key(job_id)
+    pubsub = connection.pubsub(ignore_subscribe_messages=True)
+    # Subscribe before reading the list so that no event published in between is missed
+    pubsub.subscribe(_channel(job_id))
+    try:
+        cursor = 0
+        while True:
+            events = connection.lrange(key, cursor, -1)
+            cursor += len(events)
+            for event in events:
+                if isinstance(event, bytes):
+                    event = event.decode('utf-8')
+                yield event
+                if json.loads(event).get('event') in FINAL_EVENTS:
+                    return
+            if not events and not is_job_active():
+                return
+            if pubsub.get_message(timeout=KEEPALIVE_INTERVAL) is None and not events:
+                # Nothing new; let the caller send a keep-alive
+                yield ''
+    finally:
+        pubsub.close()
@@ -5,14 +5,14 @@ import os
 import pathlib
 import requests
 
-from . import config, resources, tasks
+from . import config, progress, resources, tasks
 from . import forms
 
 from datetime import datetime
 from google.oauth2 import id_token
 from google_auth_oauthlib.flow import Flow
 import google.auth.transport.requests
-from flask import render_template, request, make_response, redirect, url_for, session, abort
+from flask import render_template, request, make_response, redirect, url_for, session, abort, Response, stream_with_context
 from functools import wraps
 from pip._vendor import cachecontrol
 from werkzeug.exceptions import HTTPException
@@ -244,6 +244,26 @@ def get_result(job_id):
     return response_object
 
 
+@webapp.route('/progress/<string:job_id>')
+def stream_progress(job_id):
+    """Streams the progress events of a job as Server-Sent Events until the job ends."""
+    def is_job_active():
+        task = tasks.get_rq_job(job_id)
+        return task is not None and task.get_status() in ('queued', 'started', 'deferred', 'scheduled')
+
+    def generate():
+        for event in progress.iter_events(resources.qualifier_queue.connection, job_id, is_job_active):
+            if event:
+                yield f'data: {event}\n\n'
+            else:
+                yield ': keep-alive\n\n'
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @webapp.route('/report', methods=['POST'])
 def get_report():
     user_id = session['google_id']
@@ -61,5 +61,7 @@ docker run --name uss-host \
   gunicorn \
     --preload \
     --workers=2 \
+    --worker-class=gthread \
+    --threads=16 \
     --bind=0.0.0.0:5000 \
     monitoring.uss_qualifier.webapp:webapp
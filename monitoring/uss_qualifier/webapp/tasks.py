@@ -1,10 +1,16 @@
+import datetime
+import hashlib
 import json
-from typing import List
+import os
+from typing import Callable, Iterator, List, Optional
 import redis
 import rq
-from . import resources
+from . import config, progress, resources
+from monitoring.uss_qualifier.result_cache import ResultCache
 from monitoring.monitorlib.typing import ImplicitDict
-from monitoring.uss_qualifier.rid import test_executor
+from monitoring.uss_qualifier.webapp import webapp
+from monitoring.uss_qualifier.rid import aircraft_state_replayer, test_executor
+from monitoring.uss_qualifier.rid.reports import ProgressEvent
 from monitoring.uss_qualifier.rid.utils import RIDQualifierTestConfiguration, FullFlightRecord
 from monitoring.uss_qualifier.rid.simulator import flight_state_from_kml
 from monitoring.uss_qualifier.test_data import test_report
@@ -26,17 +32,107 @@ def remove_rq_job(job_id):
     return rq_job
 
 
+# Packages whose code determines the results of jobs
+_RESULT_PACKAGES = ('monitorlib', 'uss_qualifier')
+_RESULT_FILE_EXTENSIONS = ('.py', '.json', '.yaml', '.yml')
+
+_code_fingerprint = None
+
+def _get_code_fingerprint() -> str:
+    """Returns a digest of the code and data files of the packages which determine job results.
+
+    Unlike the code version, which is unknown when neither CODE_VERSION nor git
+    is available (e.g., in containers), this always changes when the code does.
+    """
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        monitoring_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        h = hashlib.sha256()
+        for package in _RESULT_PACKAGES:
+            for root, dirs, files in os.walk(os.path.join(monitoring_path, package)):
+                dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+                for filename in sorted(files):
+                    if not filename.endswith(_RESULT_FILE_EXTENSIONS):
+                        continue
+                    file_path = os.path.join(root, filename)
+                    h.update(os.path.relpath(file_path, monitoring_path).encode('utf-8'))
+                    with open(file_path, 'rb') as f:
+                        h.update(hashlib.sha256(f.read()).digest())
+        _code_fingerprint = h.hexdigest()
+    return _code_fingerprint
+
+def _result_key(kind: str, *parts) -> str:
+    """Returns the cache key of a job result; results of other versions of the code are never reused."""
+    return ResultCache.make_key(kind, _get_code_fingerprint(), *parts)
+
+def _get_result_cache() -> ResultCache:
+    return ResultCache(
+        webapp.config.get(config.KEY_RESULT_CACHE_PATH),
+        webapp.config.get(config.KEY_RESULT_CACHE_MAX_BYTES))
+
+
 def call_test_executor(user_config_json: str, auth_spec: str, flight_record_jsons: List[str], debug=False):
-    user_config: RIDQualifierTestConfiguration = ImplicitDict.parse(
-        json.loads(user_config_json)['rid'], RIDQualifierTestConfiguration)
-    flight_records: List[FullFlightRecord] = [
-        ImplicitDict.parse(json.loads(j), FullFlightRecord)
-        for j in flight_record_jsons]
+    job = rq.get_current_job()
+    if job is None:
+        return _run_test_executor(user_config_json, auth_spec, flight_record_jsons, debug)
+
+    # Progress of the job is published as it happens so it can be streamed to the browser
+    connection = resources.qualifier_queue.connection
+    try:
+        report = _run_test_executor(
+            user_config_json, auth_spec, flight_record_jsons, debug,
+            progress.ProgressPublisher(connection, job.get_id()))
+    except Exception as e:
+        progress.publish(connection, job.get_id(), 'failed', str(e))
+        raise
+    progress.publish(connection, job.get_id(), 'finished')
+    return report
+
+def _run_test_executor(user_config_json: str, auth_spec: str, flight_record_jsons: List[str], debug=False,
+                       on_progress: Optional[Callable[[ProgressEvent], None]] = None):
+    rid_config = json.loads(user_config_json)['rid']
     if debug:
-        report = test_report.test_data
-    else:
-        report = test_executor.run_rid_tests(user_config, auth_spec, flight_records)
-    return json.dumps(report)
+        return json.dumps(test_report.test_data)
+
+    # Reports are only reused when explicitly enabled, since a qualification run is meant to test the live systems
+    report_max_age = webapp.config.get(config.KEY_REPORT_CACHE_MAX_AGE)
+    # Flight records are assigned to injection targets in order, so their order is part of the key
+    cache = _get_result_cache()
+    key = _result_key('rid_report', json.dumps(rid_config, sort_keys=True), auth_spec, *flight_record_jsons)
+    cached = cache.get_with_time(key, max_age=report_max_age) if report_max_age > 0 else None
+    if cached is not None:
+        cached_report, cached_time = cached
+        cached_at = datetime.datetime.fromtimestamp(cached_time, datetime.timezone.utc).isoformat()
+        print('[RID] Reusing report of an identical test run completed at {}'.format(cached_at))
+        # The USSs were not tested again, so the report is marked with the time it was actually produced
+        report = json.loads(cached_report)
+        report['cached_at'] = cached_at
+        return json.dumps(report)
+
+    user_config: RIDQualifierTestConfiguration = ImplicitDict.parse(rid_config, RIDQualifierTestConfiguration)
+    # Records are only parsed when assigned to an injection target
+    flight_records: Iterator[FullFlightRecord] = (
+        aircraft_state_replayer.parse_full_flight_record(j)
+        for j in flight_record_jsons)
+    report = json.dumps(test_executor.run_rid_tests(user_config, auth_spec, flight_records, on_progress))
+    if report_max_age > 0:
+        cache.put(key, report)
+    return report
 
 def call_kml_processor(kml_content, output_path):
-    return flight_state_from_kml.main(kml_content, output_path, from_string=True)
+    cache = _get_result_cache()
+    key = _result_key('kml_flight_records', kml_content)
+    cached_result = cache.get(key)
+    if cached_result is not None:
+        # The flight record files are still expected in the output folder
+        flight_state_from_kml.create_output_folder(output_path)
+        for filename, flight_record in json.loads(cached_result).items():
+            if filename != 'is_flight_records_from_kml':
+                flight_state_from_kml.write_to_json_file(flight_record, filename, output_path)
+        return cached_result
+
+    result = flight_state_from_kml.main(kml_content, output_path, from_string=True)
+    # Flight records are returned as a JSON string; invalid KML content is reported as an error instead, which is not cached
+    if isinstance(result, str):
+        cache.put(key, result)
+    return result
@@ -14,12 +14,13 @@ def parse_args(argv: List[str]):
         help='JWT access token to be validated')
     parser.add_argument(
         '--key', action='store', dest='key', type=str,
-        help='Public key to validate against.  May be PEM-format text or a URL to a JWKS or plaintext PEM file.')
+        help='Public key to validate against.  May be PEM-format text or a URL or path to a JWKS or plaintext PEM file.')
     return parser.parse_args(argv)
 
 
 def get_access_token_payload(token: str, public_key: str):
-    key = auth_validation.fix_key(public_key)
+    kid = jwt.get_unverified_header(token).get('kid', None)
+    key = auth_validation.KeyManager(public_key, refresh_interval_s=0).get_key(kid)
     return jwt.decode(token, key, algorithms='RS256', options={'verify_aud': False})
 
 